@@ -1,44 +1,143 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, Response
-from models import db, Application, Contact, Update, AnalysisHistory
-from datetime import datetime, date
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, Response, stream_with_context, make_response
+from models import db, Application, Contact, Update, AnalysisHistory, AnalysisJob, JobSkills, JobTerm, JobDocument, TermTotal, PdfTextCache, Resume, LlmCache, ArchivedApplication, DataGeneration
+from skills import skill_taxonomy, score_matrix
+from ranking import bm25_scores
+import metrics
+from pdf_extract import PdfExtractor, PdfExtractionError, PdfTimeoutError, PdfCancelledError
+from job_queue import JobQueue, AnalysisJobError, fail_interrupted_jobs, process_owner, serialize_job
+from llm import (LLM_MODEL, LLM_PROMPT_VERSION, analyze_with_llm, analyze_with_llm_batched,
+                 stream_llm_analysis, summarize_job_analyses, llm_unavailable_reason,
+                 prepare_resume, fits_single_prompt, estimate_llm_tokens)
+from llm_backends import get_backend
+from migrations import migrate
+from sqlite_config import configure_sqlite
+from search import ranked_matches, search_snippets
+from tags import parse_tags, filter_by_tag, tag_counts
+from pagination import InvalidCursor, encode_cursor, decode_cursor, keyset_page
+from funnel import funnel_metrics, status_history
+from timeseries import application_timeseries, parse_range
+from archive import closed_before, to_archive, from_archive, archived_counts, archived_selection, filter_archived
+from datetime import datetime, date, timedelta
+import base64
 import csv
 import io
 import re
 import json
 from collections import Counter
-import PyPDF2  # pip install PyPDF2
-import os
-import anthropic  # pip install anthropic
+import time
+import hashlib
+import atexit
+import click
+import threading
+from itertools import chain
+from sqlalchemy import event
+from sqlalchemy.orm import Session, selectinload, defer, load_only
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-change-in-production'
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///tracker.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'pool_size': 10,  # Connections kept open: request threads plus analysis workers
+    'max_overflow': 10,  # Extra connections opened under bursts, closed when returned
+    'pool_timeout': 30,  # Seconds to wait for a free connection
+}
+app.config['SQLITE_BUSY_TIMEOUT'] = 15000  # Milliseconds a write waits for the lock before "database is locked"
+app.config['SQLITE_CACHE_SIZE_KB'] = 16384  # Page cache per connection
+app.config['SQLITE_MMAP_SIZE'] = 256 * 1024 * 1024  # Bytes of the database file read through mmap
+app.config['PDF_CACHE_MAX_BYTES'] = 32 * 1024 * 1024  # Extracted resume text kept for repeat analyses
+app.config['PDF_EXTRACT_WORKERS'] = 2
+app.config['PDF_EXTRACT_TIMEOUT'] = 20  # Seconds per document
+app.config['PDF_MAX_PAGES'] = 50  # Pages past this are ignored
+app.config['LLM_CACHE_TTL'] = 7 * 24 * 3600  # Seconds an identical LLM analysis is reused
+app.config['LLM_BATCH_SIZE'] = 5  # Jobs per prompt when a selection is analyzed in batches
+app.config['LLM_MAX_CONCURRENCY'] = 4  # Batches in flight at once
+app.config['LLM_MAX_RETRIES'] = 2  # Extra attempts for a failed batch
+app.config['ANALYSIS_WORKERS'] = 2  # Background threads running queued analyses
+app.config['APPLICATIONS_PAGE_SIZE'] = 50  # Cards per page of the applications list
+app.config['API_PAGE_SIZE'] = 200  # Default page size of paginated API lists
+app.config['API_MAX_PAGE_SIZE'] = 1000  # Largest ?limit= a paginated API list accepts
+app.config['TIMESERIES_CACHE_SIZE'] = 64  # Date ranges of counts over time kept with the statistics
+app.config['ARCHIVE_AFTER_DAYS'] = 90  # Rejected/withdrawn applications not updated for this long get archived
+app.config['ARCHIVE_BATCH_SIZE'] = 200  # Applications moved to the archive per transaction
 
 db.init_app(app)
 
-# Create tables on first run
 with app.app_context():
-    db.create_all()
+    # WAL and the other per-connection pragmas, before the first connection is opened
+    configure_sqlite(db.engine, busy_timeout_ms=app.config['SQLITE_BUSY_TIMEOUT'],
+                     cache_size_kb=app.config['SQLITE_CACHE_SIZE_KB'], mmap_size=app.config['SQLITE_MMAP_SIZE'])
+
+_db_ready = False
+_db_ready_lock = threading.Lock()
+
+
+def init_db():
+    """Create and upgrade the tables, and fail the jobs of server processes that have gone.
+    
+    Runs once per process, before its first request or maintenance command,
+    rather than on import: the PDF worker processes import this module too,
+    and must not touch the database.
+    """
+    global _db_ready
+    with _db_ready_lock:
+        if _db_ready:
+            return
+        db.create_all()
+        
+        # create_all() never alters existing tables; migrations upgrade them in place
+        migrate(db.engine)
+        
+        # Queued jobs live only in the process that queued them
+        fail_interrupted_jobs()
+        _db_ready = True
+
+
+@app.before_request
+def ensure_db():
+    init_db()
+
+# PDF parsing runs in worker processes, off the request thread
+pdf_extractor = PdfExtractor(
+    workers=app.config['PDF_EXTRACT_WORKERS'],
+    timeout=app.config['PDF_EXTRACT_TIMEOUT'],
+    max_pages=app.config['PDF_MAX_PAGES']
+)
+atexit.register(pdf_extractor.shutdown)
+
+# Queued analyses run on background threads, off the request thread
+analysis_queue = JobQueue(app, workers=app.config['ANALYSIS_WORKERS'])
+atexit.register(analysis_queue.shutdown)
 
 
 # ============== HELPER FUNCTIONS ==============
 
-def get_statistics():
-    """Calculate dashboard statistics."""
-    total = Application.query.count()
-    saved = Application.query.filter_by(status='saved').count()
-    applied = Application.query.filter_by(status='applied').count()
-    interviewing = Application.query.filter_by(status='interviewing').count()
-    offers = Application.query.filter_by(status='offer').count()
-    rejected = Application.query.filter_by(status='rejected').count()
+# Dashboard statistics and counts over time, kept until a committed change touches an application.
+# 'applications_generation' is the DataGeneration they were computed at: a change committed by
+# another process (another server worker, or a maintenance command) bumps it.
+_statistics_cache = {'stats': None, 'series': {}, 'generation': 0, 'applications_generation': None}
+_statistics_lock = threading.Lock()
+
+
+def compute_statistics():
+    """Count applications by status in one aggregate query."""
+    counts = dict(
+        db.session.query(Application.status, db.func.count(Application.id))
+        .group_by(Application.status).all()
+    )
+    saved = counts.get('saved', 0)
+    applied = counts.get('applied', 0)
+    interviewing = counts.get('interviewing', 0)
+    offers = counts.get('offer', 0)
+    rejected = counts.get('rejected', 0)
     
     # Response rate (interviews / applied)
     total_applied = applied + interviewing + offers + rejected
     response_rate = round((interviewing + offers) / total_applied * 100, 1) if total_applied > 0 else 0
     
     return {
-        'total': total,
+        'total': sum(counts.values()),
         'saved': saved,
         'applied': applied,
         'interviewing': interviewing,
@@ -47,90 +146,302 @@ def get_statistics():
         'response_rate': response_rate
     }
 
-def extract_text_from_pdf(pdf_file):
-    """Extract text content from uploaded PDF file."""
-    try:
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() or ""
-        return text.lower()
-    except Exception as e:
-        print(f"Error extracting PDF: {e}")
-        return ""
+
+def check_statistics_generation():
+    """Drop the cached statistics if any process has changed applications since they were computed."""
+    current = db.session.query(DataGeneration.generation).filter_by(name='applications').scalar()
+    with _statistics_lock:
+        if _statistics_cache['applications_generation'] != current:
+            _statistics_cache['stats'] = None
+            _statistics_cache['series'] = {}
+            _statistics_cache['generation'] += 1
+            _statistics_cache['applications_generation'] = current
+
+
+def get_statistics():
+    """Dashboard statistics, from the cache unless applications changed since."""
+    check_statistics_generation()
+    with _statistics_lock:
+        stats, generation = _statistics_cache['stats'], _statistics_cache['generation']
+    if stats is not None:
+        metrics.incr('stats_cache.hit')
+        return dict(stats)
+    metrics.incr('stats_cache.miss')
+    
+    stats = compute_statistics()
+    with _statistics_lock:
+        # Don't keep counts that an invalidation made stale while they were computed
+        if _statistics_cache['generation'] == generation:
+            _statistics_cache['stats'] = stats
+    return dict(stats)
+
+
+def get_timeseries(interval, start, end):
+    """Counts over time for a date range, from the cache unless applications changed since."""
+    key = (interval, start, end)
+    check_statistics_generation()
+    with _statistics_lock:
+        series, generation = _statistics_cache['series'].get(key), _statistics_cache['generation']
+    if series is not None:
+        metrics.incr('timeseries_cache.hit')
+        return series
+    metrics.incr('timeseries_cache.miss')
+    
+    series = application_timeseries(interval, start, end)
+    with _statistics_lock:
+        if _statistics_cache['generation'] == generation:
+            cached = _statistics_cache['series']
+            cached[key] = series
+            # Drop the oldest ranges past the limit
+            while len(cached) > app.config['TIMESERIES_CACHE_SIZE']:
+                cached.pop(next(iter(cached)))
+    return series
 
 
-def extract_text_from_pdf(pdf_file):
-    """Extract text content from uploaded PDF file."""
+def invalidate_statistics():
+    with _statistics_lock:
+        _statistics_cache['stats'] = None
+        _statistics_cache['series'] = {}
+        _statistics_cache['generation'] += 1
+
+
+def bump_applications_generation(session):
+    """Count this transaction's change to applications, once, in the transaction itself."""
+    if session.info.get('statistics_stale') == 'counted':
+        return
+    stmt = sqlite_insert(DataGeneration).values(name='applications', generation=1)
+    session.connection().execute(stmt.on_conflict_do_update(
+        index_elements=['name'],
+        set_={'generation': DataGeneration.generation + 1}
+    ))
+    session.info['statistics_stale'] = 'counted'
+
+
+@event.listens_for(Session, 'before_flush')
+def note_application_changes(session, flush_context, instances):
+    """Remember that this transaction inserts, updates or deletes applications."""
+    if any(isinstance(obj, Application) for obj in chain(session.new, session.dirty, session.deleted)):
+        session.info.setdefault('statistics_stale', True)
+
+
+@event.listens_for(Session, 'after_flush')
+def count_application_changes(session, flush_context):
+    if session.info.get('statistics_stale'):
+        bump_applications_generation(session)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def note_bulk_application_changes(orm_execute_state):
+    """Same for bulk UPDATE/DELETE statements on applications."""
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and \
+            any(mapper.class_ is Application for mapper in orm_execute_state.all_mappers):
+        bump_applications_generation(orm_execute_state.session)
+
+
+@event.listens_for(Session, 'after_commit')
+def invalidate_statistics_on_commit(session):
+    if session.info.pop('statistics_stale', False):
+        invalidate_statistics()
+
+
+@event.listens_for(Session, 'after_rollback')
+def forget_application_changes(session):
+    session.info.pop('statistics_stale', None)
+
+
+def extract_text_from_pdf(pdf_file, cancel_event=None):
+    """Extract text content from uploaded PDF file, using the text cache.
+    
+    Setting `cancel_event` stops the parsing with PdfCancelledError.
+    """
+    data = pdf_file.read()
+    content_hash = hashlib.sha256(data).hexdigest()
+    
+    cached = get_cached_pdf_text(content_hash)
+    if cached is not None:
+        metrics.incr('pdf_cache.hit')
+        return cached
+    metrics.incr('pdf_cache.miss')
+    
     try:
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() or ""
-        return text.lower()
-    except Exception as e:
+        started = time.perf_counter()
+        text, page_count = pdf_extractor.extract(data, cancel_event)
+        text = text.lower()
+        metrics.observe('pdf.parse_seconds', time.perf_counter() - started)
+        if page_count > pdf_extractor.max_pages:
+            metrics.incr('pdf.truncated')
+    except PdfCancelledError:
+        metrics.incr('pdf.cancelled')
+        raise
+    except PdfTimeoutError as e:
+        metrics.incr('pdf.timeout')
+        print(f"Error extracting PDF: {e}")
+        return ""
+    except PdfExtractionError as e:
         print(f"Error extracting PDF: {e}")
         return ""
+    
+    store_pdf_text(content_hash, text)
+    return text
+
+
+# The PDF text cache is read and written on connections of its own, in their own
+# transactions, so a cache lookup never flushes or commits the caller's session.
+# PDFs are parsed before a request writes anything, so the cache's writes do not
+# wait on the caller's own transaction.
+
+def get_cached_pdf_text(content_hash):
+    """The cached text of a PDF, or None; a hit is marked as just used."""
+    with db.engine.begin() as conn:
+        text = conn.execute(
+            db.select(PdfTextCache.text).where(PdfTextCache.content_hash == content_hash)
+        ).scalar()
+        if text is not None:
+            conn.execute(db.update(PdfTextCache).where(PdfTextCache.content_hash == content_hash)
+                         .values(last_used_at=datetime.utcnow()))
+    return text
+
+
+def store_pdf_text(content_hash, text):
+    """Add extracted PDF text to the cache, evicting least recently used entries."""
+    now = datetime.utcnow()
+    stmt = sqlite_insert(PdfTextCache).values(
+        content_hash=content_hash, text=text, size=len(text), created_at=now, last_used_at=now
+    )
+    with db.engine.begin() as conn:
+        conn.execute(stmt.on_conflict_do_update(
+            index_elements=['content_hash'], set_={'last_used_at': now}
+        ))
+        
+        max_bytes = app.config['PDF_CACHE_MAX_BYTES']
+        total = conn.execute(db.select(db.func.coalesce(db.func.sum(PdfTextCache.size), 0))).scalar()
+        if total > max_bytes:
+            evict = []
+            entries = conn.execute(db.select(PdfTextCache.content_hash, PdfTextCache.size)
+                                   .order_by(PdfTextCache.last_used_at)).all()
+            for entry_hash, size in entries:
+                if total <= max_bytes or entry_hash == content_hash:
+                    break
+                evict.append(entry_hash)
+                total -= size
+            conn.execute(db.delete(PdfTextCache).where(PdfTextCache.content_hash.in_(evict)))
+            metrics.incr('pdf_cache.evicted', len(evict))
 
 
 def extract_skills_from_text(text):
     """Extract potential skills/keywords from text."""
-    # Common tech/business skills to look for
-    skill_patterns = [
-        # Programming languages
-        r'\bpython\b', r'\bjava\b', r'\bjavascript\b', r'\btypescript\b', r'\bc\+\+\b',
-        r'\bc#\b', r'\bruby\b', r'\bgo\b', r'\brust\b', r'\bswift\b', r'\bkotlin\b',
-        r'\bphp\b', r'\br\b', r'\bscala\b', r'\bmatlab\b', r'\bjulia\b', r'\bsas\b',
-        r'\bstata\b', r'\bspss\b',
-        
-        # Data & ML
-        r'\bsql\b', r'\bnosql\b', r'\bmongodb\b', r'\bpostgresql\b', r'\bmysql\b',
-        r'\bpandas\b', r'\bnumpy\b', r'\bscikit-learn\b', r'\btensorflow\b', r'\bpytorch\b',
-        r'\bkeras\b', r'\bmachine learning\b', r'\bdeep learning\b', r'\bdata analysis\b',
-        r'\bdata science\b', r'\bstatistics\b', r'\beconometrics\b', r'\bcausal inference\b',
-        r'\ba/b testing\b', r'\bexperimentation\b', r'\bregression\b', r'\bforecasting\b',
-        r'\btime series\b', r'\bnlp\b', r'\bnatural language\b', r'\bcomputer vision\b',
-        
-        # Cloud & DevOps
-        r'\baws\b', r'\bazure\b', r'\bgcp\b', r'\bgoogle cloud\b', r'\bdocker\b',
-        r'\bkubernetes\b', r'\bci/cd\b', r'\bgit\b', r'\blinux\b', r'\bterraform\b',
-        
-        # Web & Frameworks
-        r'\breact\b', r'\bangular\b', r'\bvue\b', r'\bnode\.js\b', r'\bdjango\b',
-        r'\bflask\b', r'\bfastapi\b', r'\bspring\b', r'\brest api\b', r'\bgraphql\b',
-        
-        # Business & Analytics
-        r'\bexcel\b', r'\btableau\b', r'\bpower bi\b', r'\blooker\b', r'\bfinancial modeling\b',
-        r'\bfinancial analysis\b', r'\bvaluation\b', r'\baccounting\b', r'\bbudgeting\b',
-        r'\bproject management\b', r'\bagile\b', r'\bscrum\b', r'\bjira\b',
-        
-        # Soft skills
-        r'\bcommunication\b', r'\bleadership\b', r'\bteamwork\b', r'\bpresentation\b',
-        r'\bproblem solving\b', r'\bcritical thinking\b', r'\banalytical\b',
-        
-        # Economics specific
-        r'\bmicroeconomics\b', r'\bmacroeconomics\b', r'\beconometrics\b',
-        r'\bgame theory\b', r'\bbehavioral economics\b', r'\bmarket research\b',
-        r'\bpricing\b', r'\bstrategy\b', r'\bconsulting\b',
-        
-        # Engineering
-        r'\bcad\b', r'\bautocad\b', r'\bsolidworks\b', r'\bsimulation\b',
-        r'\boptimization\b', r'\boperations research\b', r'\bsupply chain\b',
-        r'\blogistics\b', r'\bmanufacturing\b', r'\bquality\b', r'\blean\b',
-        r'\bsix sigma\b',
-    ]
-    
-    found_skills = set()
-    text_lower = text.lower()
-    
-    for pattern in skill_patterns:
-        if re.search(pattern, text_lower):
-            # Clean up the skill name
-            skill = pattern.replace(r'\b', '').replace('\\', '')
-            skill = skill.replace('+', ' plus').replace('.', ' ')
-            found_skills.add(skill.strip())
-    
-    return found_skills
+    return skill_taxonomy.matcher.find(text)
+
+
+def get_job_text(app_entry):
+    """Text of an application that the ATS analysis looks at."""
+    return f"{app_entry.requirements or ''} {app_entry.job_title or ''} {app_entry.tags or ''}"
+
+
+def index_job_skills(app_entry):
+    """Extract and store the skills of an application. Call before committing."""
+    matcher = skill_taxonomy.matcher
+    skills = sorted(matcher.find(get_job_text(app_entry)))
+    
+    if app_entry.skill_index is None:
+        app_entry.skill_index = JobSkills()
+    app_entry.skill_index.taxonomy_version = matcher.version
+    app_entry.skill_index.skills = json.dumps(skills)
+    app_entry.skill_index.indexed_at = datetime.utcnow()
+    
+    return set(skills)
+
+
+def index_job_terms(app_entry):
+    """Store the word counts of an application and apply the change to the totals."""
+    new_counts = Counter(tokenize_text(get_job_text(app_entry)))
+    delta = Counter(new_counts)
+    
+    for row in list(app_entry.terms):
+        delta[row.term] -= row.count
+        if row.term in new_counts:
+            row.count = new_counts.pop(row.term)
+        else:
+            app_entry.terms.remove(row)
+    
+    for term, count in new_counts.items():
+        app_entry.terms.append(JobTerm(term=term, count=count))
+    
+    if app_entry.document is None:
+        app_entry.document = JobDocument()
+    app_entry.document.length = sum(row.count for row in app_entry.terms)
+    
+    apply_term_deltas(delta)
+
+
+def unindex_job_terms(app_entry):
+    """Remove the word counts of an application from the totals. Call before deleting it."""
+    apply_term_deltas(Counter({row.term: -row.count for row in app_entry.terms}))
+
+
+def apply_term_deltas(delta):
+    """Add per-term count changes to the global word totals."""
+    rows = [{'term': term, 'count': change} for term, change in delta.items() if change]
+    if not rows:
+        return
+    
+    stmt = sqlite_insert(TermTotal)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['term'],
+        set_={'count': TermTotal.count + stmt.excluded.count}
+    )
+    db.session.execute(stmt, rows)
+    
+    # Drop words that no application uses any more
+    shrunk = [row['term'] for row in rows if row['count'] < 0]
+    if shrunk:
+        db.session.execute(
+            db.delete(TermTotal).where(TermTotal.term.in_(shrunk), TermTotal.count <= 0)
+        )
+
+
+def index_job(app_entry):
+    """Store skills and word counts for an application. Call before committing."""
+    index_job_terms(app_entry)
+    return index_job_skills(app_entry)
+
+
+def get_job_skills(app_entry):
+    """Return the stored skills of an application, re-indexing stale entries."""
+    if getattr(app_entry, 'archived', False):
+        # Archived applications have no stored skills (and must not get any)
+        return set(skill_taxonomy.matcher.find(get_job_text(app_entry)))
+    index = app_entry.skill_index
+    if index is None:
+        return index_job(app_entry)
+    if index.taxonomy_version != skill_taxonomy.matcher.version:
+        return index_job_skills(app_entry)
+    return index.get_skills()
+
+
+def get_word_frequency(app_ids=None, limit=40, archived=()):
+    """Most common job-text words over the given applications, or all of them.
+    
+    `archived` applications (which have no stored counts) are counted from their text.
+    """
+    if app_ids is None:
+        rows = db.session.query(TermTotal.term, TermTotal.count) \
+            .order_by(TermTotal.count.desc(), TermTotal.term).limit(limit).all()
+    else:
+        total = db.func.sum(JobTerm.count)
+        query = db.session.query(JobTerm.term, total) \
+            .filter(JobTerm.application_id.in_(app_ids)) \
+            .group_by(JobTerm.term) \
+            .order_by(total.desc(), JobTerm.term)
+        rows = query.all() if archived else query.limit(limit).all()
+    
+    if archived:
+        counts = Counter(dict(rows))
+        for app_entry in archived:
+            counts.update(tokenize_text(get_job_text(app_entry)))
+        rows = sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]
+    
+    return [{'word': term, 'count': count} for term, count in rows]
 
 
 def tokenize_text(text):
@@ -162,6 +473,46 @@ def tokenize_text(text):
     return [w for w in words if len(w) > 2 and w not in stop_words]
 
 
+def get_resume_skills(resume):
+    """Return the stored skills of a resume, re-extracting them for a newer taxonomy."""
+    matcher = skill_taxonomy.matcher
+    if resume.taxonomy_version != matcher.version:
+        resume.skills = json.dumps(sorted(matcher.find(resume.text or '')))
+        resume.taxonomy_version = matcher.version
+        db.session.commit()
+    return resume.get_skills()
+
+
+def get_request_resume():
+    """Resolve the resume of an analysis request: a stored resume_id or an uploaded file.
+    
+    Returns (stored resume or None, resume text, error message or None).
+    """
+    resume_id = request.form.get('resume_id', type=int)
+    if resume_id:
+        resume = db.session.get(Resume, resume_id)
+        if resume is None:
+            return None, '', 'Resume not found'
+        return resume, resume.text or '', None
+    
+    resume_file = request.files.get('resume')
+    if not resume_file:
+        return None, '', 'No resume uploaded'
+    resume_text = extract_text_from_pdf(resume_file)
+    if not resume_text:
+        return None, '', 'Could not extract text from resume'
+    return None, resume_text, None
+
+
+def serialize_resume(resume):
+    return {
+        'id': resume.id,
+        'name': resume.name,
+        'created_at': resume.created_at.isoformat(),
+        'skills_count': len(resume.get_skills())
+    }
+
+
 def calculate_match_score(resume_skills, job_skills):
     """Calculate percentage match between resume and job skills."""
     if not job_skills:
@@ -174,112 +525,486 @@ def calculate_match_score(resume_skills, job_skills):
     
     return score, list(matched), list(missing)
     
-def analyze_with_llm(resume_text, jobs_data):
+def llm_cache_key(resume_text, jobs_data, variant='single'):
+    """Hash of everything that goes into the LLM prompt(s)."""
+    payload = json.dumps({
+        'model': LLM_MODEL,
+        'prompt_version': LLM_PROMPT_VERSION,
+        'variant': variant,
+        'offline': get_backend().offline,  # Never mix replayed answers with real ones
+        'resume': prepare_resume(resume_text),
+        'jobs': [[job['company'], job['job_title'], job['requirements'], job['tags']] for job in jobs_data]
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def get_cached_llm_analysis(cache_key):
+    """Return a stored, unexpired LLM analysis and when it was made, or (None, None)."""
+    entry = db.session.get(LlmCache, cache_key)
+    if entry is None or (entry.expires_at and entry.expires_at <= datetime.utcnow()):
+        metrics.incr('llm_cache.miss')
+        return None, None
+    metrics.incr('llm_cache.hit')
+    return json.loads(entry.response), entry.created_at
+
+
+def store_llm_analysis(cache_key, analysis):
+    """Store an LLM analysis for reuse until the cache TTL runs out."""
+    now = datetime.utcnow()
+    db.session.merge(LlmCache(
+        cache_key=cache_key,
+        model=LLM_MODEL,
+        prompt_version=LLM_PROMPT_VERSION,
+        response=json.dumps(analysis),
+        created_at=now,
+        expires_at=now + timedelta(seconds=app.config['LLM_CACHE_TTL'])
+    ))
+    db.session.commit()
+
+
+def archive_closed_applications(older_than_days=None, batch_size=None):
+    """Move closed applications not updated for `older_than_days` to the archive.
+    
+    Commits a batch at a time; returns the number of applications moved.
     """
-    Use Claude to analyze resume against jobs.
-    Returns detailed analysis with semantic matching.
+    older_than_days = app.config['ARCHIVE_AFTER_DAYS'] if older_than_days is None else older_than_days
+    batch_size = batch_size or app.config['ARCHIVE_BATCH_SIZE']
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    moved = 0
+    while True:
+        batch = closed_before(cutoff, batch_size)
+        if not batch:
+            break
+        
+        for app_entry in batch:
+            db.session.add(to_archive(app_entry))
+            unindex_job_terms(app_entry)
+            db.session.delete(app_entry)
+        
+        db.session.commit()
+        moved += len(batch)
+        metrics.incr('archive.moved', len(batch))
+    return moved
+
+
+def restore_application(archived):
+    """Move an application back from the archive, re-indexed. Call before committing."""
+    app_entry = from_archive(archived)
+    # A fresh start before it can be archived again
+    app_entry.updated_at = datetime.utcnow()
+    index_job(app_entry)
+    db.session.add(app_entry)
+    db.session.delete(archived)
+    metrics.incr('archive.restored')
+    return app_entry
+
+
+# Cursor sort of pages that go on from the active applications into the archive,
+# and the key that starts the archive
+ARCHIVE_CURSOR_SORT = 'archived_at:desc'
+ARCHIVE_START = [None, None]
+
+
+def archive_cursor_key(cursor):
+    """The archive key in an include_archived cursor that points into the archive, or None."""
+    try:
+        return decode_cursor(cursor, ARCHIVE_CURSOR_SORT) if cursor else None
+    except InvalidCursor:
+        return None
+
+
+def archived_page(query, served, next_cursor, page_size, after=None):
+    """The archived rows that fill a page once the active applications run out.
+    
+    With include_archived, a list goes on into the archive, most recently
+    archived first, after its last active application. `query` selects the
+    matching ArchivedApplication rows; `served` active rows are on the page
+    already, followed by `next_cursor` (None once they ran out). `after` is
+    the archive_cursor_key() of a page that starts in the archive.
+    Returns (archived rows, cursor of the next page or None).
     """
-    api_key = os.environ.get('ANTHROPIC_API_KEY')
-    if not api_key:
-        return None, "ANTHROPIC_API_KEY environment variable not set"
-    
-    client = anthropic.Anthropic(api_key=api_key)
-    
-    # Build job descriptions summary
-    jobs_summary = ""
-    for i, job in enumerate(jobs_data, 1):
-        jobs_summary += f"""
-### Job {i}: {job['company']} - {job['job_title']}
-Requirements: {job['requirements']}
-Tags: {job['tags']}
----
-"""
-    
-    prompt = f"""You are an expert career advisor and ATS (Applicant Tracking System) analyst. 
-Analyze how well this resume matches the following job positions.
-
-## RESUME:
-{resume_text[:8000]}
-
-## JOB POSITIONS TO ANALYZE:
-{jobs_summary}
-
-## YOUR TASK:
-Provide a comprehensive analysis in the following JSON format (respond ONLY with valid JSON, no markdown):
-
-{{
-    "overall_summary": "2-3 sentence overview of the candidate's fit across all positions",
-    "resume_strengths": ["strength1", "strength2", "strength3"],
-    "resume_weaknesses": ["weakness1", "weakness2"],
-    "top_skills_from_resume": ["skill1", "skill2", "skill3", "skill4", "skill5"],
-    "job_analyses": [
-        {{
-            "company": "Company Name",
-            "job_title": "Job Title",
-            "match_score": 75,
-            "match_level": "Strong Match",
-            "matched_skills": ["skill1", "skill2"],
-            "missing_skills": ["skill1", "skill2"],
-            "transferable_skills": ["skill from resume that applies but wasn't explicitly listed"],
-            "recommendations": "Specific advice to improve match for this role",
-            "key_insight": "One unique observation about fit"
-        }}
-    ],
-    "general_recommendations": [
-        "Actionable advice 1 to improve resume",
-        "Actionable advice 2",
-        "Actionable advice 3"
-    ],
-    "skills_to_learn": ["High-priority skill 1", "Skill 2", "Skill 3"],
-    "strongest_match": {{
-        "company": "Best matching company",
-        "job_title": "Best matching job",
-        "why": "Brief explanation"
-    }}
-}}
-
-IMPORTANT:
-- Match scores should be 0-100 based on realistic ATS scoring
-- Be specific and actionable in recommendations
-- Identify transferable skills the ATS might miss
-- Consider both hard skills and soft skills
-- Match level should be: "Excellent Match" (80+), "Strong Match" (60-79), "Moderate Match" (40-59), "Weak Match" (<40)
-"""
+    if next_cursor:
+        return [], next_cursor
+    if served >= page_size:
+        # The active rows ended with this page: the next one starts the archive, if it has anything
+        more = db.session.query(query.exists()).scalar()
+        return [], encode_cursor(ARCHIVE_CURSOR_SORT, ARCHIVE_START) if more else None
+    rows, next_key = keyset_page(query, ArchivedApplication.archived_at, ArchivedApplication.id,
+                                 None if after == ARCHIVE_START else after, page_size - served,
+                                 descending=True, nullable=True)
+    return rows, encode_cursor(ARCHIVE_CURSOR_SORT, next_key) if next_key else None
+
+
+def clear_llm_cache(expired_only=False):
+    """Delete cached LLM analyses. Returns the number of entries removed."""
+    query = LlmCache.query
+    if expired_only:
+        query = query.filter(LlmCache.expires_at <= datetime.utcnow())
+    removed = query.delete(synchronize_session=False)
+    db.session.commit()
+    return removed
 
+
+def get_selected_applications(job_ids, include_archived=False, options=()):
+    """The selected applications, or all of them if none are selected.
+    
+    With include_archived, archived ones are selected too: selected ids that
+    are not active applications are looked up among the archived ones. They
+    come back as archive.as_application() objects, marked `archived`.
+    """
+    query = Application.query.options(*options)
+    apps = query.filter(Application.id.in_(job_ids)).all() if job_ids else query.all()
+    if include_archived:
+        if job_ids:
+            apps += archived_selection(set(job_ids) - {app_entry.id for app_entry in apps})
+        else:
+            apps += archived_selection()
+    return apps
+
+
+def get_llm_jobs(job_ids, include_archived=False):
+    """Load the selected applications (all if none are selected) and their prompt data.
+    
+    Returns (applications, jobs data for the prompt).
+    """
+    apps = get_selected_applications(job_ids, include_archived)
+    
+    jobs_data = [{
+        'id': app.id,
+        'company': app.company,
+        'job_title': app.job_title,
+        'requirements': app.requirements or '',
+        'tags': app.tags or ''
+    } for app in apps]
+    return apps, jobs_data
+
+
+def get_llm_request():
+    """Read the resume, cover letter and selected jobs of an LLM analysis request.
+    
+    Returns (stored resume or None, resume text, applications, jobs data
+    for the prompt, error message or None).
+    """
+    # Check API key (or that an offline backend is configured)
+    reason = llm_unavailable_reason()
+    if reason:
+        return None, '', [], [], reason
+    
+    # Get the stored or uploaded resume
+    resume, resume_text, error = get_request_resume()
+    if error:
+        return None, '', [], [], error
+    
+    # Parse job IDs
     try:
-        message = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=16000,
-            temperature=0.5,  # (lower = more consistent)
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
-        )
+        job_ids = json.loads(request.form.get('job_ids', '[]'))
+    except:
+        job_ids = []
+    
+    # Add cover letter if provided
+    cover_letter_file = request.files.get('cover_letter')
+    if cover_letter_file:
+        cover_letter_text = extract_text_from_pdf(cover_letter_file)
+        resume_text += "\n\nCOVER LETTER:\n" + cover_letter_text
+    
+    # Get selected applications
+    apps, jobs_data = get_llm_jobs(job_ids, request.form.get('include_archived') == '1')
+    if not apps:
+        return resume, resume_text, [], [], 'No applications found'
+    return resume, resume_text, apps, jobs_data, None
+
+
+def run_llm_analysis(resume_text, jobs_data, mode='auto', batch_size=None, refresh=False, on_progress=None):
+    """Analyze a resume against jobs with Claude, reusing a cached identical analysis.
+    
+    'single' sends one prompt, 'batched' concurrent batches of jobs; 'auto'
+    batches selections larger than one batch or too large for one prompt's
+    token budget. Returns (results, error message or None);
+    `on_progress(done, total)` is called as batches finish.
+    """
+    batch_size = batch_size or app.config['LLM_BATCH_SIZE']
+    if mode == 'auto':
+        single = len(jobs_data) <= batch_size and fits_single_prompt(resume_text, jobs_data)
+        mode = 'single' if single else 'batched'
+    if mode not in ('single', 'batched') or batch_size < 1:
+        return None, 'Invalid analysis mode'
+    token_estimate = estimate_llm_tokens(resume_text, jobs_data, mode, batch_size)
+    if mode == 'single' and token_estimate['over_budget']:
+        return None, 'The selection is too large for one prompt; analyze it in batches'
+    variant = f'batched:{batch_size}' if mode == 'batched' else 'single'
+    
+    # Reuse an identical earlier analysis unless a refresh is requested
+    cache_key = llm_cache_key(resume_text, jobs_data, variant)
+    analysis, cached_at = (None, None)
+    if not refresh:
+        analysis, cached_at = get_cached_llm_analysis(cache_key)
+    
+    if analysis is None:
+        metrics.incr('llm.estimated_input_tokens', token_estimate['input_tokens'])
+        metrics.incr('llm.estimated_output_tokens', token_estimate['output_tokens'])
         
-        response_text = message.content[0].text
+        # Run LLM analysis
+        if mode == 'batched':
+            analysis, error = analyze_with_llm_batched(
+                resume_text, jobs_data,
+                batch_size=batch_size,
+                max_concurrency=app.config['LLM_MAX_CONCURRENCY'],
+                max_retries=app.config['LLM_MAX_RETRIES'],
+                on_progress=on_progress
+            )
+        else:
+            analysis, error = analyze_with_llm(resume_text, jobs_data)
         
-        # Parse JSON response
-        import json
-        # Clean up response if needed
-        response_text = response_text.strip()
-        if response_text.startswith("```"):
-            response_text = response_text.split("```")[1]
-            if response_text.startswith("json"):
-                response_text = response_text[4:]
+        if error:
+            return None, error
         
-        analysis = json.loads(response_text)
-        return analysis, None
+        store_llm_analysis(cache_key, analysis)
+    
+    # Add job IDs to analysis results (batched results already have them)
+    if mode == 'single':
+        for i, job_analysis in enumerate(analysis.get('job_analyses', [])):
+            if i < len(jobs_data):
+                job_analysis['id'] = jobs_data[i]['id']
+    
+    return {
+        'success': True,
+        'analysis': analysis,
+        'jobs_analyzed': len(jobs_data),
+        'mode': mode,
+        'token_estimate': token_estimate,
+        'cached': cached_at is not None,
+        'cached_at': cached_at.isoformat() if cached_at else None
+    }, None
+
+
+def sse_event(event, data):
+    """Format one Server-Sent Events message with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def run_ats_analysis(resume, resume_text, cover_letter_text, job_ids, scoring='skills', include_archived=False):
+    """Score a resume (plus optional cover letter) against the selected jobs.
+    
+    `resume` is the stored Resume, or None for an uploaded one. Returns
+    (results, error message or None).
+    """
+    # Combine resume and cover letter for analysis
+    combined_text = resume_text + " " + cover_letter_text
+    
+    # Extract skills from resume (stored resumes already have theirs)
+    if resume is not None:
+        resume_skills = get_resume_skills(resume) | extract_skills_from_text(cover_letter_text)
+    else:
+        resume_skills = extract_skills_from_text(combined_text)
+    
+    # 'skills' scores by skill overlap, 'bm25' by text relevance
+    if scoring not in ('skills', 'bm25'):
+        return None, f'Unknown scoring mode: {scoring}'
+    
+    # Get selected applications, with their stored skills
+    apps = get_selected_applications(job_ids, include_archived, options=(selectinload(Application.skill_index),))
+    
+    if not apps:
+        return None, 'No applications found'
+    if scoring == 'bm25' and any(getattr(app_entry, 'archived', False) for app_entry in apps):
+        return None, 'Relevance scoring reads the index of active applications; score archived ones by skill overlap'
+    
+    # Analyze each job
+    job_results = []
+    all_job_skills = Counter()
+    all_matched_skills = set()
+    all_missing_skills = set()
+    total_score = 0
+    
+    for app_entry in apps:
+        job_skills = get_job_skills(app_entry)
         
-    except anthropic.APIError as e:
-        return None, f"API Error: {str(e)}"
-    except json.JSONDecodeError as e:
-        return None, f"Failed to parse response: {str(e)}"
-    except Exception as e:
-        return None, f"Error: {str(e)}"
+        # Count skill frequency across all jobs
+        for skill in job_skills:
+            all_job_skills[skill] += 1
+        
+        # Calculate match
+        score, matched, missing = calculate_match_score(resume_skills, job_skills)
+        total_score += score
+        
+        all_matched_skills.update(matched)
+        all_missing_skills.update(missing)
+        
+        job_results.append({
+            'id': app_entry.id,
+            'company': app_entry.company,
+            'job_title': app_entry.job_title,
+            'match_score': score,
+            'matched_keywords': matched,
+            'missing_keywords': missing
+        })
+    
+    # Persist any entries that had to be re-indexed
+    if db.session.new or db.session.dirty:
+        db.session.commit()
+    
+    # Relevance mode: rank by BM25 over the stored term index, shown as
+    # a percentage of the best-matching job
+    if scoring == 'bm25':
+        relevance = bm25_scores(tokenize_text(combined_text), [app_entry.id for app_entry in apps])
+        top_relevance = max(relevance.values(), default=0)
+        total_score = 0
+        for result in job_results:
+            job_relevance = relevance.get(result['id'], 0.0)
+            result['relevance'] = round(job_relevance, 3)
+            result['match_score'] = int(job_relevance / top_relevance * 100) if top_relevance else 0
+            total_score += result['match_score']
+    
+    # Sort by match score (highest first)
+    job_results.sort(key=lambda x: x.get('relevance', x['match_score']), reverse=True)
+    
+    # Calculate averages
+    avg_match = int(total_score / len(apps)) if apps else 0
+    
+    # Get top skills (most requested)
+    top_skills = []
+    max_count = max(all_job_skills.values()) if all_job_skills else 1
+    for skill, count in all_job_skills.most_common(15):
+        top_skills.append({
+            'name': skill,
+            'count': count,
+            'percentage': int(count / max_count * 100)
+        })
+    
+    # Word frequency for word cloud, merged from the stored counts
+    archived = [app_entry for app_entry in apps if getattr(app_entry, 'archived', False)]
+    if not archived and len(apps) == Application.query.count():
+        word_frequency = get_word_frequency()
+    else:
+        word_frequency = get_word_frequency([app_entry.id for app_entry in apps
+                                             if not getattr(app_entry, 'archived', False)], archived=archived)
+    
+    return {
+        'success': True,
+        'scoring': scoring,
+        'jobs_analyzed': len(apps),
+        'avg_match_score': avg_match,
+        'total_skills_matched': len(all_matched_skills),
+        'total_skills_missing': len(all_missing_skills - all_matched_skills),
+        'top_skills': top_skills,
+        'matched_skills': list(all_matched_skills),
+        'missing_skills': list(all_missing_skills - all_matched_skills)[:20],
+        'job_results': job_results,
+        'word_frequency': word_frequency
+    }, None
+
+
+def record_analysis_history(analysis_type, results, job_ids, resume_name, resume_id=None, cover_letter_name=None):
+    """Write finished analysis results to the history. Returns the new entry."""
+    if analysis_type == 'llm':
+        analysis = results['analysis']
+        job_analyses = analysis.get('job_analyses') or []
+        scores = [job.get('match_score', 0) for job in job_analyses]
+        matched = {skill for job in job_analyses for skill in job.get('matched_skills') or []}
+        missing = {skill for job in job_analyses for skill in job.get('missing_skills') or []}
+        strongest = analysis.get('strongest_match') or {}
+        summary = {
+            'avg_match_score': int(sum(scores) / len(scores) + 0.5) if scores else 0,
+            'total_skills_matched': len(matched),
+            'total_skills_missing': len(missing),
+            'overall_summary': analysis.get('overall_summary'),
+            'best_match_company': strongest.get('company'),
+            'best_match_title': strongest.get('job_title')
+        }
+    else:
+        summary = {
+            'avg_match_score': results['avg_match_score'],
+            'total_skills_matched': results['total_skills_matched'],
+            'total_skills_missing': results['total_skills_missing']
+        }
+    
+    entry = AnalysisHistory(
+        resume_name=resume_name or 'Unknown',
+        resume_id=resume_id,
+        cover_letter_name=cover_letter_name,
+        analysis_type=analysis_type,
+        jobs_analyzed=results['jobs_analyzed'],
+        job_ids=json.dumps(job_ids),
+        full_results=json.dumps(results),
+        **summary
+    )
+    db.session.add(entry)
+    db.session.commit()
+    return entry
+
 
+def read_job_pdf(params, name, cancel_event):
+    """Text of the PDF uploaded with a queued analysis as params[name] (base64), or ''."""
+    if not params.get(name):
+        return ''
+    return extract_text_from_pdf(io.BytesIO(base64.b64decode(params[name])), cancel_event)
+
+
+def run_analysis_job(job, report, cancel_event):
+    """Worker for a queued analysis: run it and write the results to the history.
+    
+    Uploaded PDFs are parsed here rather than in the request that queued the
+    job, so cancelling the job stops their parsing too.
+    """
+    params = job.get_params()
+    resume = db.session.get(Resume, params['resume_id']) if params.get('resume_id') else None
+    if params.get('resume_id') and resume is None:
+        raise AnalysisJobError('Resume not found')
+    if params.get('resume_pdf') or params.get('cover_letter_pdf'):
+        report(5, 'Reading PDFs')
+    if resume is not None:
+        resume_text = resume.text or ''
+    else:
+        resume_text = read_job_pdf(params, 'resume_pdf', cancel_event)
+        if not resume_text:
+            raise AnalysisJobError('Could not extract text from resume')
+    cover_letter_text = read_job_pdf(params, 'cover_letter_pdf', cancel_event)
+    job_ids = params.get('job_ids', [])
     
+    report(10, 'Scoring jobs' if job.analysis_type == 'ats' else 'Waiting for Claude')
+    if job.analysis_type == 'ats':
+        results, error = run_ats_analysis(resume, resume_text, cover_letter_text, job_ids,
+                                          params.get('scoring', 'skills'), params.get('include_archived', False))
+    else:
+        if cover_letter_text:
+            resume_text += "\n\nCOVER LETTER:\n" + cover_letter_text
+        apps, jobs_data = get_llm_jobs(job_ids, params.get('include_archived', False))
+        if not apps:
+            raise AnalysisJobError('No applications found')
+        results, error = run_llm_analysis(
+            resume_text, jobs_data,
+            mode=params.get('mode', 'auto'),
+            batch_size=params.get('batch_size'),
+            refresh=params.get('refresh', False),
+            on_progress=lambda done, total: report(10 + 80 * done // total, f'{done} of {total} batches analyzed')
+        )
+    if error:
+        raise AnalysisJobError(error)
+    
+    report(90, 'Saving to history')
+    if not job_ids:
+        analyzed = results['job_results'] if job.analysis_type == 'ats' else results['analysis'].get('job_analyses', [])
+        job_ids = [entry['id'] for entry in analyzed if 'id' in entry]
+    entry = record_analysis_history(
+        job.analysis_type, results, job_ids,
+        resume_name=params.get('resume_name'),
+        resume_id=params.get('resume_id'),
+        cover_letter_name=params.get('cover_letter_name')
+    )
+    return entry.id
+
+
 # ============== ROUTES ==============
 
+# Sort options of the applications list: (column, whether it can be NULL)
+APPLICATION_SORTS = {
+    'updated_at': (Application.updated_at, True),
+    'created_at': (Application.created_at, True),
+    'company': (Application.company, False),
+    'deadline': (Application.deadline, True),
+}
+
+
 @app.route('/')
 def index():
     """Dashboard with statistics and recent applications."""
@@ -301,12 +1026,23 @@ def index():
 
 @app.route('/applications')
 def applications():
-    """List all applications with filtering."""
+    """List applications with filtering, a page at a time.
+    
+    ?cursor= continues after the previous page; ?partial=1 returns only the
+    cards, with the next cursor in the X-Next-Cursor header. With
+    ?include_archived=1 the matching archived applications follow the
+    active ones.
+    """
     # Get filter parameters
     status_filter = request.args.get('status', '')
+    tag_filter = request.args.get('tag', '')
     search_query = request.args.get('search', '')
-    sort_by = request.args.get('sort', 'updated_at')
+    # 'relevance' ranks search results; without a search it means last updated
+    sort_by = request.args.get('sort', 'relevance')
     sort_order = request.args.get('order', 'desc')
+    cursor = request.args.get('cursor', '')
+    partial = request.args.get('partial') == '1'
+    include_archived = request.args.get('include_archived') == '1'
     
     # Build query
     query = Application.query
@@ -314,28 +1050,75 @@ def applications():
     if status_filter:
         query = query.filter_by(status=status_filter)
     
-    if search_query:
-        search = f'%{search_query}%'
-        query = query.filter(
-            db.or_(
-                Application.company.ilike(search),
-                Application.job_title.ilike(search),
-                Application.tags.ilike(search)
-            )
-        )
+    if tag_filter:
+        query = filter_by_tag(query, tag_filter)
+    
+    matches = None
+    if search_query.strip():
+        # Full-text search over company, title, tags, requirements and notes
+        matches = ranked_matches(search_query)
+        if matches is None:
+            query = query.filter(db.false())
+        else:
+            query = query.join(matches, matches.c.application_id == Application.id)
     
-    # Sort
-    sort_column = getattr(Application, sort_by, Application.updated_at)
-    if sort_order == 'desc':
-        query = query.order_by(sort_column.desc())
+    # Sort (ties broken by id, which keyset pagination needs)
+    if sort_by == 'relevance' and matches is not None:
+        sort_column, nullable, descending = matches.c.rank, False, False
+        cursor_sort = 'relevance'
     else:
-        query = query.order_by(sort_column.asc())
+        sort_column, nullable = APPLICATION_SORTS.get(sort_by, APPLICATION_SORTS['updated_at'])
+        descending = sort_order == 'desc'
+        cursor_sort = f"{sort_column.key}:{'desc' if descending else 'asc'}"
     
-    apps = query.all()
+    page_size = app.config['APPLICATIONS_PAGE_SIZE']
+    archive_after = archive_cursor_key(cursor) if include_archived else None
+    if archive_after is not None:
+        # Past the active applications
+        after, apps, next_cursor = archive_after, [], None
+    else:
+        try:
+            after = decode_cursor(cursor, cursor_sort) if cursor else None
+        except InvalidCursor:
+            after = None  # Stale link: start from the first page
+        apps, next_key = keyset_page(query, sort_column, Application.id, after, page_size, descending, nullable)
+        next_cursor = encode_cursor(cursor_sort, next_key) if next_key else None
+    snippets = search_snippets(search_query, [app_entry.id for app_entry in apps]) if matches is not None else {}
+    
+    archived = []
+    if include_archived:
+        archived_query = filter_archived(
+            ArchivedApplication.query.options(defer(ArchivedApplication.contacts), defer(ArchivedApplication.updates)),
+            status_filter, tag_filter, search_query
+        )
+        archived, next_cursor = archived_page(archived_query, len(apps), next_cursor, page_size, archive_after)
+    
+    if partial:
+        response = make_response(
+            render_template('_application_cards.html', applications=apps, snippets=snippets, today=date.today()) +
+            render_template('_archived_cards.html', archived=archived)
+        )
+        response.headers['X-Next-Cursor'] = next_cursor or ''
+        return response
+    
+    if status_filter or tag_filter or search_query.strip():
+        total = None
+    else:
+        # Unfiltered total comes from the cached dashboard counts
+        total = get_statistics()['total'] + (sum(archived_counts().values()) if include_archived else 0)
     
     return render_template('applications.html', 
                          applications=apps,
+                         archived=archived,
+                         include_archived=include_archived,
+                         snippets=snippets,
+                         today=date.today(),
+                         next_cursor=next_cursor,
+                         first_page=after is None,
+                         total=total,
                          status_filter=status_filter,
+                         tag_filter=tag_filter,
+                         tag_facets=tag_counts(status_filter, limit=12),
                          search_query=search_query,
                          sort_by=sort_by,
                          sort_order=sort_order)
@@ -369,10 +1152,12 @@ def add_application():
             deadline=deadline,
             date_applied=date_applied,
             status=request.form.get('status', 'saved'),
-            tags=request.form.get('tags', ''),
+            tags=', '.join(parse_tags(request.form.get('tags', ''))),
             notes=request.form.get('notes', '')
         )
         
+        index_job(app_entry)
+        
         db.session.add(app_entry)
         db.session.commit()
         
@@ -386,7 +1171,8 @@ def add_application():
 def view_application(id):
     """View a single application with all details."""
     app_entry = Application.query.get_or_404(id)
-    return render_template('view.html', app=app_entry)
+    return render_template('view.html', app=app_entry, today=date.today(),
+                           status_history=status_history(id))
 
 
 @app.route('/application/<int:id>/edit', methods=['GET', 'POST'])
@@ -406,7 +1192,7 @@ def edit_application(id):
         app_entry.job_posting_url = request.form.get('job_posting_url', '')
         app_entry.salary_range = request.form.get('salary_range', '')
         app_entry.status = request.form.get('status', 'saved')
-        app_entry.tags = request.form.get('tags', '')
+        app_entry.tags = ', '.join(parse_tags(request.form.get('tags', '')))
         app_entry.notes = request.form.get('notes', '')
         
         if request.form.get('deadline'):
@@ -419,6 +1205,8 @@ def edit_application(id):
         else:
             app_entry.date_applied = None
         
+        index_job(app_entry)
+        
         db.session.commit()
         flash('Application updated successfully!', 'success')
         return redirect(url_for('view_application', id=id))
@@ -430,12 +1218,48 @@ def edit_application(id):
 def delete_application(id):
     """Delete an application."""
     app_entry = Application.query.get_or_404(id)
+    unindex_job_terms(app_entry)
     db.session.delete(app_entry)
     db.session.commit()
     flash('Application deleted.', 'info')
     return redirect(url_for('applications'))
 
 
+@app.route('/archive')
+def archived_applications():
+    """List archived applications, most recently archived first, a page at a time."""
+    cursor_sort = 'archived_at:desc'
+    try:
+        after = decode_cursor(request.args['cursor'], cursor_sort) if request.args.get('cursor') else None
+    except InvalidCursor:
+        after = None
+    
+    query = ArchivedApplication.query.options(defer(ArchivedApplication.data), defer(ArchivedApplication.contacts),
+                                              defer(ArchivedApplication.updates))
+    archived, next_key = keyset_page(query, ArchivedApplication.archived_at, ArchivedApplication.id, after,
+                                     app.config['APPLICATIONS_PAGE_SIZE'], descending=True, nullable=True)
+    counts = archived_counts()
+    return render_template('archive.html',
+                         archived=archived,
+                         total=sum(counts.values()),
+                         counts=counts,
+                         next_cursor=encode_cursor(cursor_sort, next_key) if next_key else None,
+                         archive_after_days=app.config['ARCHIVE_AFTER_DAYS'])
+
+
+@app.route('/archive/<int:id>/restore', methods=['POST'])
+def restore_archived_application(id):
+    """Move an archived application back to the active applications."""
+    archived = ArchivedApplication.query.get_or_404(id)
+    app_entry = restore_application(archived)
+    db.session.commit()
+    
+    if request.is_json:
+        return jsonify({'success': True, 'id': app_entry.id})
+    flash('Application restored from the archive.', 'success')
+    return redirect(url_for('view_application', id=app_entry.id))
+
+
 @app.route('/application/<int:id>/status', methods=['POST'])
 def update_status(id):
     """Quick status update via AJAX."""
@@ -462,27 +1286,77 @@ def analysis():
 
 @app.route('/api/jobs')
 def api_jobs():
-    """Return list of all jobs for selection."""
-    apps = Application.query.order_by(Application.updated_at.desc()).all()
-    return jsonify([{
+    """Return a page of jobs for selection, most recently updated first.
+    
+    Pass the returned next_cursor as ?cursor= for the next page; it is null
+    on the last one. ?limit= sets the page size. ?include_archived=1 adds
+    the archived applications after the active ones, marked "archived",
+    under the ids they had (which the analyses accept with include_archived).
+    """
+    limit = request.args.get('limit', app.config['API_PAGE_SIZE'], type=int)
+    limit = min(max(limit, 1), app.config['API_MAX_PAGE_SIZE'])
+    cursor = request.args.get('cursor', '')
+    include_archived = request.args.get('include_archived') == '1'
+    
+    archive_after = archive_cursor_key(cursor) if include_archived else None
+    if archive_after is not None:
+        apps, next_cursor = [], None
+    else:
+        try:
+            after = decode_cursor(cursor, 'updated_at:desc') if cursor else None
+        except InvalidCursor as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        query = Application.query.options(load_only(Application.id, Application.company, Application.job_title,
+                                                    Application.status, Application.updated_at))
+        apps, next_key = keyset_page(query, Application.updated_at, Application.id, after, limit,
+                                     descending=True, nullable=True)
+        next_cursor = encode_cursor('updated_at:desc', next_key) if next_key else None
+    
+    jobs = [{
         'id': app.id,
         'company': app.company,
         'job_title': app.job_title,
         'status': app.status
-    } for app in apps])
+    } for app in apps]
+    if include_archived:
+        query = ArchivedApplication.query.options(load_only(
+            ArchivedApplication.id, ArchivedApplication.original_id, ArchivedApplication.company,
+            ArchivedApplication.job_title, ArchivedApplication.status, ArchivedApplication.archived_at
+        ))
+        archived, next_cursor = archived_page(query, len(apps), next_cursor, limit, archive_after)
+        jobs += [{
+            'id': entry.original_id,
+            'company': entry.company,
+            'job_title': entry.job_title,
+            'status': entry.status,
+            'archived': True
+        } for entry in archived]
+    
+    return jsonify({
+        'jobs': jobs,
+        'next_cursor': next_cursor
+    })
+
+
+@app.route('/api/tags')
+def api_tags():
+    """Number of applications with each tag (optionally of one status), most used first."""
+    status = request.args.get('status', '')
+    return jsonify([{'tag': name, 'count': count} for name, count in tag_counts(status)])
 
 
 @app.route('/api/analyze', methods=['POST'])
 def api_analyze():
     """Analyze resume against selected job applications."""
     try:
-        # Get uploaded resume
-        resume_file = request.files.get('resume')
+        # Get the stored or uploaded resume
+        resume, resume_text, error = get_request_resume()
         cover_letter_file = request.files.get('cover_letter')
         job_ids_json = request.form.get('job_ids', '[]')
         
-        if not resume_file:
-            return jsonify({'success': False, 'error': 'No resume uploaded'})
+        if error:
+            return jsonify({'success': False, 'error': error})
         
         # Parse job IDs
         try:
@@ -490,118 +1364,138 @@ def api_analyze():
         except:
             job_ids = []
         
-        # Extract text from resume
-        resume_text = extract_text_from_pdf(resume_file)
-        if not resume_text:
-            return jsonify({'success': False, 'error': 'Could not extract text from resume'})
-        
         # Extract text from cover letter if provided
         cover_letter_text = ""
         if cover_letter_file:
             cover_letter_text = extract_text_from_pdf(cover_letter_file)
         
-        # Combine resume and cover letter for analysis
-        combined_text = resume_text + " " + cover_letter_text
+        results, error = run_ats_analysis(resume, resume_text, cover_letter_text, job_ids,
+                                          request.form.get('scoring', 'skills'),
+                                          request.form.get('include_archived') == '1')
+        if error:
+            return jsonify({'success': False, 'error': error})
+        return jsonify(results)
         
-        # Extract skills from resume
-        resume_skills = extract_skills_from_text(combined_text)
+    except Exception as e:
+        print(f"Analysis error: {e}")
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/api/analyze-batch', methods=['POST'])
+def api_analyze_batch():
+    """Score several resume versions against the selected jobs at once.
+    
+    Resumes are listed in the order given: the stored `resume_ids`, then the
+    uploaded `resumes`; each one's `rank` orders them by average match.
+    """
+    try:
+        resume_files = request.files.getlist('resumes')
+        job_ids_json = request.form.get('job_ids', '[]')
         
-        # Get selected applications
-        if job_ids:
-            apps = Application.query.filter(Application.id.in_(job_ids)).all()
-        else:
-            apps = Application.query.all()
+        # Parse job and stored resume IDs
+        try:
+            job_ids = json.loads(job_ids_json)
+        except:
+            job_ids = []
+        try:
+            resume_ids = [int(resume_id) for resume_id in json.loads(request.form.get('resume_ids', '[]'))]
+        except (ValueError, TypeError):
+            return jsonify({'success': False, 'error': 'resume_ids must be a JSON list of resume ids'}), 400
         
-        if not apps:
-            return jsonify({
-                'success': False, 
-                'error': 'No applications found'
-            })
+        if not resume_files and not resume_ids:
+            return jsonify({'success': False, 'error': 'No resumes uploaded'})
         
-        # Analyze each job
-        job_results = []
-        all_job_skills = Counter()
-        all_matched_skills = set()
-        all_missing_skills = set()
-        total_score = 0
+        # Skills of stored resumes were extracted on upload
+        stored = {resume.id: resume for resume in
+                  Resume.query.options(defer(Resume.file_data)).filter(Resume.id.in_(resume_ids))}
+        missing_ids = [resume_id for resume_id in resume_ids if resume_id not in stored]
+        if missing_ids:
+            return jsonify({'success': False, 'error': f"Resumes not found: {', '.join(map(str, missing_ids))}",
+                            'missing_resume_ids': missing_ids}), 404
+        resume_keys = list(resume_ids)
+        resume_names = [stored[resume_id].name for resume_id in resume_ids]
+        resume_skill_sets = [get_resume_skills(stored[resume_id]) for resume_id in resume_ids]
         
-        all_job_words = []
+        # Extract skills from every uploaded resume
+        for resume_file in resume_files:
+            resume_text = extract_text_from_pdf(resume_file)
+            if not resume_text:
+                return jsonify({'success': False, 'error': f'Could not extract text from {resume_file.filename}'})
+            resume_keys.append(None)
+            resume_names.append(resume_file.filename)
+            resume_skill_sets.append(extract_skills_from_text(resume_text))
         
-        for app_entry in apps:
-            # Combine job requirements and notes for analysis
-            job_text = f"{app_entry.requirements or ''} {app_entry.job_title or ''} {app_entry.tags or ''}"
-            job_skills = extract_skills_from_text(job_text)
-            
-            # Count skill frequency across all jobs
-            for skill in job_skills:
-                all_job_skills[skill] += 1
-            
-            # Calculate match
-            score, matched, missing = calculate_match_score(resume_skills, job_skills)
-            total_score += score
-            
-            all_matched_skills.update(matched)
-            all_missing_skills.update(missing)
-            
-            # Tokenize for word cloud
-            all_job_words.extend(tokenize_text(job_text))
-            
-            job_results.append({
-                'id': app_entry.id,
-                'company': app_entry.company,
-                'job_title': app_entry.job_title,
-                'match_score': score,
-                'matched_keywords': matched,
-                'missing_keywords': missing
-            })
+        # Get selected applications, with their stored skills
+        apps = get_selected_applications(job_ids, request.form.get('include_archived') == '1',
+                                         options=(selectinload(Application.skill_index),))
+        
+        if not apps:
+            return jsonify({'success': False, 'error': 'No applications found'})
         
-        # Sort by match score (highest first)
-        job_results.sort(key=lambda x: x['match_score'], reverse=True)
+        job_skill_sets = [get_job_skills(app_entry) for app_entry in apps]
+        if db.session.new or db.session.dirty:
+            db.session.commit()
         
-        # Calculate averages
-        avg_match = int(total_score / len(apps)) if apps else 0
+        # K x N scores in one pass
+        matrix = score_matrix(resume_skill_sets, job_skill_sets)
         
-        # Get top skills (most requested)
-        top_skills = []
-        max_count = max(all_job_skills.values()) if all_job_skills else 1
-        for skill, count in all_job_skills.most_common(15):
-            top_skills.append({
-                'name': skill,
-                'count': count,
-                'percentage': int(count / max_count * 100)
+        resumes = []
+        for resume_id, name, resume_skills, row in zip(resume_keys, resume_names, resume_skill_sets, matrix):
+            ranked_jobs = sorted((
+                {
+                    'id': app_entry.id,
+                    'company': app_entry.company,
+                    'job_title': app_entry.job_title,
+                    'match_score': score,
+                    'matched_keywords': matched,
+                    'missing_keywords': missing
+                }
+                for app_entry, (score, matched, missing) in zip(apps, row)
+            ), key=lambda x: x['match_score'], reverse=True)
+            
+            matched_skills = set().union(*(job['matched_keywords'] for job in ranked_jobs))
+            missing_skills = set().union(*(job['missing_keywords'] for job in ranked_jobs))
+            
+            resumes.append({
+                'id': resume_id,
+                'name': name,
+                'resume_skills': sorted(resume_skills),
+                'avg_match_score': int(sum(score for score, _, _ in row) / len(row)),
+                'total_skills_matched': len(matched_skills),
+                'total_skills_missing': len(missing_skills - matched_skills),
+                'best_match': ranked_jobs[0],
+                'scores': [score for score, _, _ in row],
+                'ranked_jobs': ranked_jobs
             })
         
-        # Word frequency for word cloud
-        word_counts = Counter(all_job_words)
-        word_frequency = [
-            {'word': word, 'count': count}
-            for word, count in word_counts.most_common(40)
-        ]
+        # Best resume version ranked first; the list keeps the request's order
+        for rank, entry in enumerate(sorted(resumes, key=lambda x: x['avg_match_score'], reverse=True), 1):
+            entry['rank'] = rank
         
         return jsonify({
             'success': True,
             'jobs_analyzed': len(apps),
-            'avg_match_score': avg_match,
-            'total_skills_matched': len(all_matched_skills),
-            'total_skills_missing': len(all_missing_skills - all_matched_skills),
-            'top_skills': top_skills,
-            'matched_skills': list(all_matched_skills),
-            'missing_skills': list(all_missing_skills - all_matched_skills)[:20],
-            'job_results': job_results,
-            'word_frequency': word_frequency
+            'resumes_analyzed': len(resumes),
+            'jobs': [{
+                'id': app_entry.id,
+                'company': app_entry.company,
+                'job_title': app_entry.job_title
+            } for app_entry in apps],
+            'resumes': resumes
         })
         
     except Exception as e:
-        print(f"Analysis error: {e}")
+        print(f"Batch analysis error: {e}")
         return jsonify({'success': False, 'error': str(e)})
 
 @app.route('/api/check-llm')
 def check_llm_available():
-    """Check if LLM API key is configured."""
-    api_key = os.environ.get('ANTHROPIC_API_KEY')
+    """Check if LLM API key (or an offline LLM backend) is configured."""
+    reason = llm_unavailable_reason()
+    backend = get_backend()
     return jsonify({
-        'available': bool(api_key),
-        'message': 'API key configured' if api_key else 'Set ANTHROPIC_API_KEY environment variable'
+        'available': reason is None,
+        'backend': backend.name,
+        'message': reason or ('API key configured' if not backend.offline else f'Using the offline {backend.name} backend')
     })
 
 
@@ -609,76 +1503,198 @@ def check_llm_available():
 def api_analyze_llm():
     """Analyze resume using Claude LLM for semantic matching."""
     try:
-        # Check API key
-        if not os.environ.get('ANTHROPIC_API_KEY'):
-            return jsonify({
-                'success': False, 
-                'error': 'ANTHROPIC_API_KEY not configured. Set it in your environment variables.'
-            })
-        
-        # Get uploaded resume
-        resume_file = request.files.get('resume')
-        cover_letter_file = request.files.get('cover_letter')
-        job_ids_json = request.form.get('job_ids', '[]')
-        
-        if not resume_file:
-            return jsonify({'success': False, 'error': 'No resume uploaded'})
-        
-        # Parse job IDs
-        try:
-            job_ids = json.loads(job_ids_json)
-        except:
-            job_ids = []
-        
-        # Extract text from resume
-        resume_text = extract_text_from_pdf(resume_file)
-        if not resume_text:
-            return jsonify({'success': False, 'error': 'Could not extract text from resume'})
-        
-        # Add cover letter if provided
-        if cover_letter_file:
-            cover_letter_text = extract_text_from_pdf(cover_letter_file)
-            resume_text += "\n\nCOVER LETTER:\n" + cover_letter_text
-        
-        # Get selected applications
-        if job_ids:
-            apps = Application.query.filter(Application.id.in_(job_ids)).all()
-        else:
-            apps = Application.query.all()
-        
-        if not apps:
-            return jsonify({'success': False, 'error': 'No applications found'})
-        
-        # Prepare jobs data
-        jobs_data = [{
-            'id': app.id,
-            'company': app.company,
-            'job_title': app.job_title,
-            'requirements': app.requirements or '',
-            'tags': app.tags or ''
-        } for app in apps]
-        
-        # Run LLM analysis
-        analysis, error = analyze_with_llm(resume_text, jobs_data)
-        
+        resume, resume_text, apps, jobs_data, error = get_llm_request()
         if error:
             return jsonify({'success': False, 'error': error})
         
-        # Add job IDs to analysis results
-        for i, job_analysis in enumerate(analysis.get('job_analyses', [])):
-            if i < len(apps):
-                job_analysis['id'] = apps[i].id
-        
-        return jsonify({
-            'success': True,
-            'analysis': analysis,
-            'jobs_analyzed': len(apps)
-        })
+        results, error = run_llm_analysis(
+            resume_text, jobs_data,
+            mode=request.form.get('mode', 'auto'),
+            batch_size=request.form.get('batch_size', type=int),
+            refresh=request.form.get('refresh') == '1'
+        )
+        if error:
+            return jsonify({'success': False, 'error': error})
+        return jsonify(results)
         
     except Exception as e:
         print(f"LLM Analysis error: {e}")
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/api/analyze-llm/stream', methods=['POST'])
+def api_analyze_llm_stream():
+    """Stream an LLM analysis as Server-Sent Events, one event per analyzed job.
+    
+    Events: 'meta' (jobs count, cached), 'job' (one job analysis), 'summary'
+    (resume-wide fields), then 'done' (timings) or 'error'. With save=1 the
+    finished analysis is written to the history and 'done' carries its id.
+    """
+    resume, resume_text, apps, jobs_data, error = get_llm_request()
+    if error:
+        return Response(sse_event('error', {'error': error}), mimetype='text/event-stream')
+    
+    cache_key = llm_cache_key(resume_text, jobs_data, 'stream')
+    cached, cached_at = (None, None)
+    if request.form.get('refresh') != '1':
+        cached, cached_at = get_cached_llm_analysis(cache_key)
+    
+    save = request.form.get('save') == '1'
+    cover_letter_file = request.files.get('cover_letter')
+    history_fields = {
+        'resume_name': resume.name if resume is not None else request.files['resume'].filename,
+        'resume_id': resume.id if resume is not None else None,
+        'cover_letter_name': cover_letter_file.filename if cover_letter_file else None
+    }
+    
+    def generate():
+        started = time.perf_counter()
+        first_result = None
+        yield sse_event('meta', {
+            'jobs_analyzed': len(apps),
+            'token_estimate': estimate_llm_tokens(resume_text, jobs_data, 'stream'),
+            'cached': cached is not None,
+            'cached_at': cached_at.isoformat() if cached_at else None
+        })
+        
+        if cached is not None:
+            analysis = cached
+            for job_analysis in analysis.get('job_analyses', []):
+                yield sse_event('job', job_analysis)
+            yield sse_event('summary', {k: v for k, v in analysis.items() if k != 'job_analyses'})
+            first_result = 0.0
+        else:
+            job_analyses = []
+            summary = None
+            try:
+                for kind, item in stream_llm_analysis(resume_text, jobs_data):
+                    if kind == 'job':
+                        if first_result is None:
+                            first_result = time.perf_counter() - started
+                            metrics.observe('llm.stream.first_result_seconds', first_result)
+                        job_analyses.append(item)
+                    else:
+                        summary = item
+                    yield sse_event(kind, item)
+            except Exception as e:
+                print(f"LLM stream error: {e}")
+                metrics.incr('llm.stream.errors')
+                yield sse_event('error', {'error': str(e)})
+                return
+            
+            analysis = dict(summary or {}, job_analyses=job_analyses)
+            if summary is None:
+                # Output was cut off before the overview line; derive it from the jobs
+                summarize_job_analyses(analysis)
+                yield sse_event('summary', {k: v for k, v in analysis.items() if k != 'job_analyses'})
+            elif len(job_analyses) == len(jobs_data):
+                store_llm_analysis(cache_key, analysis)
+        
+        history_id = None
+        if save:
+            results = {'success': True, 'analysis': analysis, 'jobs_analyzed': len(apps), 'mode': 'stream'}
+            history_id = record_analysis_history('llm', results, [job['id'] for job in jobs_data], **history_fields).id
+        
+        total = time.perf_counter() - started
+        metrics.observe('llm.stream.total_seconds', total)
+        yield sse_event('done', {'first_result_seconds': first_result, 'total_seconds': total, 'history_id': history_id})
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/llm-cache/clear', methods=['POST'])
+def api_clear_llm_cache():
+    """Invalidate cached LLM analyses (all of them, or only expired ones)."""
+    expired_only = bool((request.get_json(silent=True) or {}).get('expired_only'))
+    removed = clear_llm_cache(expired_only=expired_only)
+    return jsonify({'success': True, 'removed': removed})
+
+
+@app.route('/api/analysis-jobs', methods=['POST'])
+def api_submit_analysis_job():
+    """Queue an ATS or LLM analysis; the results are written to the history.
+    
+    Takes the form fields of /api/analyze or /api/analyze-llm plus `type`
+    ('ats' or 'llm'). Returns the job id to poll at once.
+    """
+    analysis_type = request.form.get('type', 'ats')
+    if analysis_type not in ('ats', 'llm'):
+        return jsonify({'success': False, 'error': f'Unknown analysis type: {analysis_type}'}), 400
+    if analysis_type == 'llm' and llm_unavailable_reason():
+        return jsonify({'success': False, 'error': llm_unavailable_reason()}), 400
+    
+    resume = None
+    if request.form.get('resume_id', type=int):
+        resume, _, error = get_request_resume()
+        if error:
+            return jsonify({'success': False, 'error': error}), 400
+    elif not request.files.get('resume'):
+        return jsonify({'success': False, 'error': 'No resume uploaded'}), 400
+    try:
+        job_ids = [int(job_id) for job_id in json.loads(request.form.get('job_ids', '[]'))]
+    except (ValueError, TypeError):
+        job_ids = []
+    
+    params = {
+        'job_ids': job_ids,
+        'scoring': request.form.get('scoring', 'skills'),
+        'mode': request.form.get('mode', 'auto'),
+        'batch_size': request.form.get('batch_size', type=int),
+        'refresh': request.form.get('refresh') == '1',
+        'include_archived': request.form.get('include_archived') == '1'
+    }
+    # Uploaded files go to the worker as they are: it parses them, where a cancel can stop it
+    if resume is not None:
+        params.update(resume_id=resume.id, resume_name=resume.name)
+    else:
+        resume_file = request.files['resume']
+        params.update(resume_pdf=base64.b64encode(resume_file.read()).decode('ascii'),
+                      resume_name=resume_file.filename)
+    cover_letter_file = request.files.get('cover_letter')
+    if cover_letter_file:
+        params.update(cover_letter_pdf=base64.b64encode(cover_letter_file.read()).decode('ascii'),
+                      cover_letter_name=cover_letter_file.filename)
+    
+    job = AnalysisJob(analysis_type=analysis_type, params=json.dumps(params),
+                      owner=process_owner(), heartbeat_at=datetime.utcnow())
+    db.session.add(job)
+    db.session.commit()
+    analysis_queue.submit(job.id, run_analysis_job)
+    metrics.incr('analysis_jobs.submitted')
+    
+    return jsonify({
+        'success': True,
+        'job': serialize_job(job),
+        'status_url': url_for('api_analysis_job', job_id=job.id)
+    }), 202
+
+
+@app.route('/api/analysis-jobs/<int:job_id>')
+def api_analysis_job(job_id):
+    """Status and progress of an analysis job; add ?results=1 for the finished results."""
+    job = AnalysisJob.query.get_or_404(job_id)
+    response = {'success': True, 'job': serialize_job(job)}
+    if job.status == 'completed' and request.args.get('results') == '1':
+        entry = db.session.get(AnalysisHistory, job.history_id)
+        response['results'] = json.loads(entry.full_results) if entry and entry.full_results else None
+    return jsonify(response)
+
+
+@app.route('/api/analysis-jobs/<int:job_id>/cancel', methods=['POST'])
+def api_cancel_analysis_job(job_id):
+    """Cancel a queued or running analysis job, stopping its PDF parsing and LLM batches."""
+    job = AnalysisJob.query.get_or_404(job_id)
+    if job.status not in ('queued', 'running'):
+        return jsonify({'success': False, 'error': f'The job is already {job.status}'}), 400
+    
+    job.status = 'cancelled'
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+    # A job of another server process notices at its next progress report
+    analysis_queue.cancel(job_id)
+    metrics.incr('analysis_jobs.cancelled')
+    return jsonify({'success': True, 'job': serialize_job(job)})
+
+
 @app.route('/history')
 def analysis_history():
     """View analysis history."""
@@ -717,6 +1733,7 @@ def save_analysis():
         
         analysis = AnalysisHistory(
             resume_name=data.get('resume_name', 'Unknown'),
+            resume_id=data.get('resume_id'),
             cover_letter_name=data.get('cover_letter_name'),
             analysis_type=data.get('analysis_type', 'ats'),
             jobs_analyzed=data.get('jobs_analyzed', 0),
@@ -783,6 +1800,74 @@ def compare_analyses():
         return jsonify({'success': False, 'error': str(e)})
 
 
+# ============== RESUME LIBRARY ==============
+
+@app.route('/api/resumes')
+def api_resumes():
+    """List stored resumes, newest first."""
+    resumes = Resume.query.options(defer(Resume.file_data), defer(Resume.text)) \
+        .order_by(Resume.created_at.desc()).all()
+    return jsonify([serialize_resume(resume) for resume in resumes])
+
+
+@app.route('/api/resumes', methods=['POST'])
+def api_upload_resume():
+    """Store an uploaded resume once, with its text and skills extracted up front."""
+    try:
+        resume_file = request.files.get('resume')
+        if not resume_file:
+            return jsonify({'success': False, 'error': 'No resume uploaded'})
+        
+        data = resume_file.read()
+        content_hash = hashlib.sha256(data).hexdigest()
+        
+        # The same file uploaded again maps to the existing entry
+        resume = Resume.query.filter_by(content_hash=content_hash).first()
+        created = resume is None
+        if created:
+            text = extract_text_from_pdf(io.BytesIO(data))
+            if not text:
+                return jsonify({'success': False, 'error': 'Could not extract text from resume'})
+            
+            matcher = skill_taxonomy.matcher
+            resume = Resume(
+                name=resume_file.filename or 'resume.pdf',
+                content_hash=content_hash,
+                file_data=data,
+                text=text,
+                skills=json.dumps(sorted(matcher.find(text))),
+                taxonomy_version=matcher.version
+            )
+            db.session.add(resume)
+            db.session.commit()
+        
+        return jsonify({'success': True, 'created': created, 'resume': serialize_resume(resume)})
+    except Exception as e:
+        print(f"Resume upload error: {e}")
+        return jsonify({'success': False, 'error': str(e)})
+
+
+@app.route('/api/resumes/<int:id>/file')
+def download_resume(id):
+    """Return the stored PDF of a resume."""
+    resume = Resume.query.get_or_404(id)
+    return Response(
+        resume.file_data,
+        mimetype='application/pdf',
+        headers={'Content-Disposition': f'inline; filename="{resume.name}"'}
+    )
+
+
+@app.route('/api/resumes/<int:id>/delete', methods=['POST'])
+def delete_resume(id):
+    """Delete a stored resume. History entries keep their resume name."""
+    resume = Resume.query.get_or_404(id)
+    AnalysisHistory.query.filter_by(resume_id=id).update({'resume_id': None})
+    db.session.delete(resume)
+    db.session.commit()
+    return jsonify({'success': True})
+
+
 # ============== CONTACTS ==============
 
 @app.route('/application/<int:id>/contact/add', methods=['POST'])
@@ -906,18 +1991,112 @@ def export_csv():
     )
 
 
+@app.route('/api/metrics')
+def api_metrics():
+    """Return in-process counters (cache hits, timings)."""
+    return jsonify(metrics.snapshot())
+
+
+# ============== MAINTENANCE COMMANDS ==============
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Create and upgrade the database tables."""
+    init_db()
+    print("Database is up to date")
+
+
+@app.cli.command('backfill-index')
+@click.option('--all', 'reindex_all', is_flag=True, help='Re-index every application, not only stale ones.')
+@click.option('--batch-size', default=500, show_default=True, help='Applications per commit.')
+def backfill_index_command(reindex_all, batch_size):
+    """Store skills and word counts for applications that are missing or out of date."""
+    init_db()
+    version = skill_taxonomy.matcher.version
+    indexed = 0
+    last_id = 0
+    while True:
+        batch = Application.query \
+            .options(selectinload(Application.skill_index), selectinload(Application.terms),
+                     selectinload(Application.document)) \
+            .filter(Application.id > last_id) \
+            .order_by(Application.id).limit(batch_size).all()
+        if not batch:
+            break
+        
+        for app_entry in batch:
+            index = app_entry.skill_index
+            if reindex_all or index is None or app_entry.document is None:
+                index_job(app_entry)
+            elif index.taxonomy_version != version:
+                index_job_skills(app_entry)
+            else:
+                continue
+            indexed += 1
+        
+        db.session.commit()
+        last_id = batch[-1].id
+    
+    print(f"Indexed {indexed} application(s) (taxonomy {version})")
+
+
+@app.cli.command('archive-closed')
+@click.option('--days', type=int, default=None, help='Archive after this many days without updates (default ARCHIVE_AFTER_DAYS).')
+@click.option('--batch-size', type=int, default=None, help='Applications per commit (default ARCHIVE_BATCH_SIZE).')
+def archive_closed_command(days, batch_size):
+    """Move rejected and withdrawn applications that have not changed for a while to the archive."""
+    init_db()
+    moved = archive_closed_applications(days, batch_size)
+    print(f"Archived {moved} closed application(s)")
+
+
+@app.cli.command('clear-llm-cache')
+@click.option('--expired-only', is_flag=True, help='Only remove entries past their TTL.')
+def clear_llm_cache_command(expired_only):
+    """Delete cached LLM analyses."""
+    init_db()
+    removed = clear_llm_cache(expired_only=expired_only)
+    print(f"Removed {removed} cached LLM analysis result(s)")
+
+
 # ============== API FOR CHARTS ==============
 
+@app.route('/api/funnel')
+def api_funnel():
+    """Stage-to-stage conversion and average time per stage, from the status history rollups."""
+    return jsonify(funnel_metrics())
+
+
 @app.route('/api/stats')
 def api_stats():
-    """Return statistics for charts."""
+    """Return statistics for charts (?include_archived=1 adds the archive's counts)."""
     stats = get_statistics()
+    if request.args.get('include_archived') == '1':
+        stats['archived'] = archived_counts()
+        stats['archived_total'] = sum(stats['archived'].values())
     
-    # Monthly application counts (last 6 months)
-    # This is a simplified version - could be expanded
+    # Monthly application counts (last 6 months): 150 days before the 1st always lands 5 months back
+    today = date.today()
+    series = get_timeseries('month', (today.replace(day=1) - timedelta(days=150)).replace(day=1), today)
+    stats['monthly'] = dict(zip(series['buckets'], series['added']))
     
     return jsonify(stats)
 
 
+@app.route('/api/stats/timeseries')
+def api_stats_timeseries():
+    """Applications added, applications sent and status changes per day, week or month.
+    
+    ?interval= is day, week or month (default); ?start= and ?end= (YYYY-MM-DD)
+    default to the year up to today.
+    """
+    try:
+        interval, start, end = parse_range(request.args.get('interval'), request.args.get('start'),
+                                           request.args.get('end'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    return jsonify(get_timeseries(interval, start, end))
+
+
 if __name__ == '__main__':
     app.run(debug=True, port = 1453)
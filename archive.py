@@ -0,0 +1,162 @@
+"""
+Archive of closed applications.
+
+Rejected and withdrawn applications that have not been updated for a while
+are moved out of the applications table into archived_applications: one
+row per application, with its columns, contacts and updates as JSON. The
+applications table, its indexes and everything derived from it (search,
+tags, skills, word counts, statistics) then hold only active rows, so the
+hot paths never read the closed ones. Restoring an application recreates
+its rows from the JSON, under its old id: application ids are never
+reused (the table is AUTOINCREMENT), so the id is still free, and the
+application's status history, which stays behind, still applies to it.
+
+The moves run in batches, one transaction each, so a large archive run
+holds the write lock only briefly at a time.
+
+Lists, search and analyses can opt in to archived applications
+(include_archived). The archive has no search index or stored skills:
+filter_archived() reads the fields from the JSON and scans, which is fine
+for an opt-in over rows the hot paths never read, and as_application()
+gives analyses a read-only Application to score.
+"""
+
+import json
+import re
+from datetime import date, datetime
+
+from sqlalchemy import Date, DateTime
+from sqlalchemy.orm import selectinload
+
+from models import db, Application, ArchivedApplication, Contact, Update
+from tags import tag_key
+
+
+# Statuses an application is not expected to leave
+CLOSED_STATUSES = ('rejected', 'withdrawn')
+
+# Fields a search of the archive looks in: those the search index holds for active applications
+SEARCH_FIELDS = ('company', 'job_title', 'tags', 'requirements', 'notes')
+
+
+def row_to_dict(obj):
+    """Every column of a row, JSON-ready (dates as ISO strings)."""
+    values = {}
+    for column in obj.__table__.columns:
+        value = getattr(obj, column.key)
+        values[column.key] = value.isoformat() if isinstance(value, (date, datetime)) else value
+    return values
+
+
+def dict_to_row(model, values, skip=()):
+    """A new `model` row from row_to_dict() output; unknown keys are ignored."""
+    row = model()
+    for column in model.__table__.columns:
+        if column.key not in values or column.key in skip:
+            continue
+        value = values[column.key]
+        if value is not None and isinstance(column.type, DateTime):
+            value = datetime.fromisoformat(value)
+        elif value is not None and isinstance(column.type, Date):
+            value = date.fromisoformat(value)
+        setattr(row, column.key, value)
+    return row
+
+
+def closed_before(cutoff, limit):
+    """The next batch of closed applications last updated before `cutoff`, with what archiving reads."""
+    return Application.query \
+        .options(selectinload(Application.contacts), selectinload(Application.updates),
+                 selectinload(Application.terms), selectinload(Application.skill_index),
+                 selectinload(Application.document), selectinload(Application.tag_links)) \
+        .filter(Application.status.in_(CLOSED_STATUSES), Application.updated_at < cutoff) \
+        .order_by(Application.id).limit(limit).all()
+
+
+def to_archive(app_entry):
+    """The archive row of an application and its contacts and updates."""
+    return ArchivedApplication(
+        original_id=app_entry.id,
+        company=app_entry.company,
+        job_title=app_entry.job_title,
+        status=app_entry.status,
+        updated_at=app_entry.updated_at,
+        data=json.dumps(row_to_dict(app_entry)),
+        contacts=json.dumps([row_to_dict(contact) for contact in app_entry.contacts]),
+        updates=json.dumps([row_to_dict(update) for update in app_entry.updates]),
+    )
+
+
+def from_archive(archived):
+    """A new Application, with its contacts and updates, from an archive row.
+
+    Contacts and updates get new ids. The application keeps its id, unless
+    it was archived while ids were still reused and another application has
+    taken it since.
+    """
+    app_entry = dict_to_row(Application, json.loads(archived.data))
+    if db.session.get(Application, app_entry.id) is not None:
+        app_entry.id = None
+    app_entry.contacts = [dict_to_row(Contact, values, skip=('id', 'application_id'))
+                          for values in json.loads(archived.contacts or '[]')]
+    app_entry.updates = [dict_to_row(Update, values, skip=('id', 'application_id'))
+                         for values in json.loads(archived.updates or '[]')]
+    return app_entry
+
+
+def as_application(archived):
+    """A transient Application with the columns of an archive row, marked `archived`.
+
+    For reading alongside active applications only: never add it to a session.
+    """
+    app_entry = dict_to_row(Application, json.loads(archived.data))
+    app_entry.archived = True
+    return app_entry
+
+
+def archived_selection(original_ids=None):
+    """as_application() of the archived applications with these original ids, or of all of them."""
+    query = ArchivedApplication.query
+    if original_ids is not None:
+        if not original_ids:
+            return []
+        query = query.filter(ArchivedApplication.original_id.in_(original_ids))
+    return [as_application(archived) for archived in query.order_by(ArchivedApplication.id)]
+
+
+def archived_field(name):
+    """An application column of archive rows, read from their JSON."""
+    return db.func.json_extract(ArchivedApplication.data, f'$.{name}', type_=db.String)
+
+
+def like_pattern(text):
+    """LIKE pattern matching `text` anywhere, with its wildcards escaped (ESCAPE '\\')."""
+    return '%' + re.sub(r'([\\%_])', r'\\\1', text) + '%'
+
+
+def filter_archived(query, status=None, tag=None, search=None):
+    """Restrict an ArchivedApplication query the way the applications list's filters do.
+
+    A search keeps the rows with each of its words in one of SEARCH_FIELDS
+    (SQLite's LIKE ignores ASCII case).
+    """
+    if status:
+        query = query.filter(ArchivedApplication.status == status)
+    if tag:
+        # Whole tags: ',a,b,' contains ',b,'
+        tags = db.literal(',') + db.func.replace(archived_field('tags'), ', ', ',', type_=db.String) + ','
+        query = query.filter(tags.like(like_pattern(f',{tag_key(tag)},'), escape='\\'))
+    words = re.findall(r'\w+', search or '')
+    if search and search.strip() and not words:
+        # Nothing to search for, as with the search index
+        query = query.filter(db.false())
+    for word in words:
+        query = query.filter(db.or_(*(archived_field(name).like(like_pattern(word), escape='\\')
+                                      for name in SEARCH_FIELDS)))
+    return query
+
+
+def archived_counts():
+    """{status: number of archived applications}."""
+    return dict(db.session.query(ArchivedApplication.status, db.func.count(ArchivedApplication.id))
+                .group_by(ArchivedApplication.status).all())
@@ -0,0 +1,145 @@
+"""
+Benchmark: hot-path queries before and after archiving closed applications.
+
+Builds a temporary, migrated database of synthetic applications (most of
+them rejected or withdrawn long ago, as in a tracker used for a few
+seasons) with contacts, updates and tags, and times the dashboard status
+counts, the default page of the applications list, a search and the tag
+counts. It then moves the closed applications to the archive in batches,
+as the archive-closed command does (without the word-count totals, which
+the synthetic rows have none of), checks that the status history and the
+funnel rollups are unchanged, and times the same queries again.
+
+Usage (from the project root):
+    python3 -m benchmarks.archive
+    python3 -m benchmarks.archive --apps 200000 --closed 0.9
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask
+
+from archive import closed_before, to_archive
+from migrations import migrate
+from funnel import funnel_metrics
+from models import db, Application, StatusTransition
+from search import ranked_matches
+from tags import tag_counts
+
+
+OPEN_STATUSES = ['saved', 'applied', 'interviewing', 'offer']
+CLOSED_STATUSES = ['rejected', 'withdrawn']
+TAGS = ['Tech', 'Finance', 'Remote', 'Startup', 'Consulting', 'Research', 'Design', 'Data']
+WORDS = ['python', 'sql', 'excel', 'analysis', 'marketing', 'design', 'research', 'finance', 'cloud', 'data']
+
+
+def build_database(path, apps, closed_share, rng):
+    db.metadata.create_all(db.create_engine(f'sqlite:///{path}'))
+    now = datetime.utcnow()
+    rows = []
+    for i in range(1, apps + 1):
+        closed = rng.random() < closed_share
+        updated = now - timedelta(days=rng.randint(120, 900) if closed else rng.randint(0, 60))
+        rows.append((i, f'Company {i}', 'Intern', ' '.join(rng.choices(WORDS, k=30)),
+                     ', '.join(rng.sample(TAGS, 2)), rng.choice(CLOSED_STATUSES if closed else OPEN_STATUSES),
+                     updated.isoformat(' '), updated.isoformat(' '), updated.isoformat(' ')))
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        'INSERT INTO applications (id, company, job_title, requirements, tags, status, '
+        'status_changed_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', rows
+    )
+    conn.executemany(
+        'INSERT INTO contacts (application_id, name, contacted, created_at) VALUES (?, ?, 0, ?)',
+        ((rng.randint(1, apps), f'Person {i}', now.isoformat(' ')) for i in range(apps))
+    )
+    conn.executemany(
+        'INSERT INTO updates (application_id, title, update_type, created_at) VALUES (?, ?, ?, ?)',
+        ((rng.randint(1, apps), f'Update {i}', 'note', now.isoformat(' ')) for i in range(apps * 2))
+    )
+    conn.commit()
+    conn.close()
+
+
+def timed(func, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+QUERIES = [
+    ('dashboard status counts', lambda: db.session.query(Application.status, db.func.count(Application.id))
+     .group_by(Application.status).all()),
+    ('applications list page', lambda: Application.query.order_by(Application.updated_at.desc(), Application.id.desc())
+     .limit(50).all()),
+    ('search "python data"', lambda: db.session.query(ranked_matches('python data').c.application_id).all()),
+    ('tag counts', lambda: tag_counts(limit=12)),
+]
+
+
+def report(repeat):
+    for name, query in QUERIES:
+        ms = timed(query, repeat)
+        db.session.expunge_all()
+        print(f"  {name:<26} {ms:>9.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--apps', type=int, default=50000, help='synthetic applications')
+    parser.add_argument('--closed', type=float, default=0.8, help='share of them closed long ago')
+    parser.add_argument('--batch-size', type=int, default=200, help='applications archived per transaction')
+    parser.add_argument('--repeat', type=int, default=5, help='runs of each query')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, 'tracker.db')
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    db.init_app(app)
+    try:
+        with app.app_context():
+            build_database(path, args.apps, args.closed, random.Random(42))
+            # Migrations copy the tags into the tag tables and index the text for search
+            migrate(db.engine)
+            print(f"{args.apps} applications, {args.closed:.0%} closed")
+            print("Before archiving:")
+            report(args.repeat)
+
+            history = db.session.query(db.func.count(StatusTransition.id)).scalar(), funnel_metrics()
+            cutoff = datetime.utcnow() - timedelta(days=90)
+            moved = 0
+            started = time.perf_counter()
+            while True:
+                batch = closed_before(cutoff, args.batch_size)
+                if not batch:
+                    break
+                db.session.add_all([to_archive(app_entry) for app_entry in batch])
+                # archive-closed's word-count updates flush the archive rows before the deletes
+                db.session.flush()
+                for app_entry in batch:
+                    db.session.delete(app_entry)
+                db.session.commit()
+                moved += len(batch)
+            seconds = time.perf_counter() - started
+            print(f"Archived {moved} applications in {seconds:.1f}s ({moved / seconds:.0f}/s, "
+                  f"batches of {args.batch_size})")
+            # Archiving keeps the history, under the ids restoring brings back
+            if (db.session.query(db.func.count(StatusTransition.id)).scalar(), funnel_metrics()) != history:
+                raise SystemExit("Archiving changed the status history or the funnel rollups")
+            print(f"Status history ({history[0]} changes) and funnel rollups unchanged")
+            print("After archiving:")
+            report(args.repeat)
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Benchmark: mixed reads and writes from several processes, with SQLite's
+default settings vs. the ones sqlite_config.configure_sqlite() applies.
+
+Builds a temporary, migrated database of synthetic applications, then runs
+worker processes against it for a fixed time, each like a web worker
+serving a mix of dashboard reads (status counts and recent applications)
+and status changes (an UPDATE of one application, in its own transaction).
+It runs once with the rollback journal and the driver's default 5 s lock
+wait, and once in WAL mode with the tuned pragmas, and prints for each the
+reads and writes per second, the 99th-percentile latencies and the number
+of operations that failed with "database is locked". It exits non-zero if
+the tuned run had any.
+
+Usage (from the project root):
+    python3 -m benchmarks.concurrency
+    python3 -m benchmarks.concurrency --processes 8 --seconds 10 --write-ratio 0.3
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from migrations import migrate
+from models import db
+from sqlite_config import configure_sqlite
+
+
+STATUSES = ['saved', 'applied', 'interviewing', 'offer', 'rejected', 'withdrawn']
+
+READS = [
+    'SELECT status, count(id) FROM applications GROUP BY status',
+    'SELECT * FROM applications ORDER BY updated_at DESC LIMIT 5',
+]
+WRITE = 'UPDATE applications SET status = :status, updated_at = :now WHERE id = :id'
+
+
+def build_database(path, apps, rng):
+    engine = create_engine(f'sqlite:///{path}')
+    db.metadata.create_all(engine)
+    migrate(engine)
+    engine.dispose()
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        'INSERT INTO applications (id, company, job_title, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)',
+        ((i, f'Company {i}', 'Intern', rng.choice(STATUSES), datetime.utcnow().isoformat(' '),
+          datetime.utcnow().isoformat(' ')) for i in range(1, apps + 1))
+    )
+    conn.commit()
+    conn.close()
+
+
+def set_journal_mode(path, mode):
+    # WAL is stored in the file, so the default run has to switch it back
+    conn = sqlite3.connect(path)
+    conn.execute(f'PRAGMA journal_mode={mode}')
+    conn.close()
+
+
+def worker(path, tuned, apps, write_ratio, seconds, seed, start, results):
+    engine = create_engine(f'sqlite:///{path}')
+    if tuned:
+        configure_sqlite(engine)
+    rng = random.Random(seed)
+    stats = {'reads': [], 'writes': [], 'locked': 0}
+    start.wait()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        write = rng.random() < write_ratio
+        started = time.perf_counter()
+        try:
+            if write:
+                with engine.begin() as conn:
+                    conn.execute(text(WRITE), {'status': rng.choice(STATUSES), 'now': datetime.utcnow(),
+                                               'id': rng.randint(1, apps)})
+            else:
+                with engine.connect() as conn:
+                    for sql in READS:
+                        conn.execute(text(sql)).all()
+        except OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            stats['locked'] += 1
+            continue
+        stats['writes' if write else 'reads'].append(time.perf_counter() - started)
+    engine.dispose()
+    results.put(stats)
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run(path, tuned, args):
+    start = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=worker, args=(path, tuned, args.apps, args.write_ratio,
+                                                              args.seconds, seed, start, results))
+                 for seed in range(args.processes)]
+    for process in processes:
+        process.start()
+    start.set()
+    stats = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    reads = [latency for result in stats for latency in result['reads']]
+    writes = [latency for result in stats for latency in result['writes']]
+    locked = sum(result['locked'] for result in stats)
+    label = 'WAL + tuned pragmas' if tuned else 'default (rollback journal)'
+    print(f"{label:<27} {len(reads) / args.seconds:>9.0f} {percentile(reads, 0.99) * 1000:>10.1f} "
+          f"{len(writes) / args.seconds:>9.0f} {percentile(writes, 0.99) * 1000:>11.1f} {locked:>7}")
+    return locked
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--apps', type=int, default=20000, help='synthetic applications')
+    parser.add_argument('--processes', type=int, default=6, help='concurrent worker processes')
+    parser.add_argument('--seconds', type=float, default=5, help='duration of each run')
+    parser.add_argument('--write-ratio', type=float, default=0.2, help='share of operations that write')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, 'tracker.db')
+    try:
+        build_database(path, args.apps, random.Random(42))
+        print(f"{args.processes} processes, {args.write_ratio:.0%} writes, {args.seconds:g}s per run")
+        print(f"{'settings':<27} {'reads/s':>9} {'read p99':>10} {'writes/s':>9} {'write p99':>11} {'locked':>7}")
+        set_journal_mode(path, 'DELETE')
+        run(path, False, args)
+        tuned_locked = run(path, True, args)
+    finally:
+        shutil.rmtree(workdir)
+    if tuned_locked:
+        sys.exit(f"{tuned_locked} operations failed with 'database is locked' in WAL mode")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark: LLM client connection reuse and prompt caching.
+
+Starts the local stand-in Messages API (benchmarks/stub_anthropic.py) and
+runs single, batched and streamed analyses of one resume through the real
+Anthropic client against it: once with the shared, pooled client the app
+uses, and once with a new client per call as before. Reports the TCP
+connections each opened and the prompt-cache tokens written and read. No
+API key or network access is needed.
+
+Usage (from the project root):
+    python3 -m benchmarks.llm_client
+    python3 -m benchmarks.llm_client --jobs 30 --analyses 10 --latency 0.05
+"""
+
+import argparse
+import random
+import time
+
+import anthropic
+
+import metrics
+from benchmarks.llm_pipeline import SKILLS, make_jobs
+from benchmarks.stub_anthropic import StubServer
+from llm import analyze_with_llm, analyze_with_llm_batched, stream_llm_analysis
+from llm_backends import AnthropicBackend, ReplayBackend, set_backend
+
+
+class ClientPerCallBackend(AnthropicBackend):
+    """The previous behaviour: a new client (and connection pool) for every call."""
+
+    def client(self):
+        return anthropic.Anthropic(api_key=self._api_key(), base_url=self.base_url)
+
+
+def make_resume(rng, lines=120):
+    """A resume long enough for its prompt prefix to be cached."""
+    return '\n'.join(
+        f"- Built a {rng.choice(['dashboard', 'pipeline', 'model', 'service'])} with "
+        f"{', '.join(rng.sample(SKILLS, 3))} for project {i + 1}"
+        for i in range(lines)
+    )
+
+
+def run(backend, server, resume_text, jobs, args):
+    set_backend(backend)
+    metrics.reset()
+    server.counters.clear()
+    server.backend = ReplayBackend(latency=0, tokens_per_second=0)  # Empty prompt cache
+    started = time.perf_counter()
+    for _ in range(args.analyses):
+        analysis, error = analyze_with_llm(resume_text, jobs)
+        assert error is None, error
+        analysis, error = analyze_with_llm_batched(resume_text, jobs, batch_size=args.batch_size)
+        assert error is None and not analysis['failed_jobs'], error
+        assert sum(kind == 'job' for kind, _ in stream_llm_analysis(resume_text, jobs)) == len(jobs)
+    wall = time.perf_counter() - started
+    backend.close()
+    counters = metrics.snapshot()['counters']
+    return {
+        'seconds': wall,
+        'requests': server.counters.get('requests', 0),
+        'connections': server.counters.get('connections', 0),
+        'input_tokens': counters.get('llm.input_tokens', 0),
+        'cache_write_tokens': counters.get('llm.cache_write_tokens', 0),
+        'cache_read_tokens': counters.get('llm.cache_read_tokens', 0)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=20, help='jobs per analysis')
+    parser.add_argument('--analyses', type=int, default=5, help='rounds of single, batched and streamed analyses')
+    parser.add_argument('--batch-size', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.02, help='stub seconds per answer')
+    args = parser.parse_args()
+
+    server = StubServer(('127.0.0.1', 0), latency=args.latency).start()
+    rng = random.Random(42)
+    jobs = make_jobs(args.jobs, rng)
+    resume_text = make_resume(rng)
+
+    print(f"Stub API on {server.url}: {args.analyses} x (single + batched + streamed), {args.jobs} jobs")
+    print(f"{'client':<10} {'seconds':>8} {'requests':>9} {'conns':>6} {'input tok':>10} "
+          f"{'cache write':>12} {'cache read':>11}")
+    for label, backend_class in (('per call', ClientPerCallBackend), ('shared', AnthropicBackend)):
+        r = run(backend_class(api_key='stub', base_url=server.url), server, resume_text, jobs, args)
+        print(f"{label:<10} {r['seconds']:>8.2f} {r['requests']:>9} {r['connections']:>6} {r['input_tokens']:>10} "
+              f"{r['cache_write_tokens']:>12} {r['cache_read_tokens']:>11}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
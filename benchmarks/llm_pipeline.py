@@ -0,0 +1,134 @@
+"""
+Offline benchmark: end-to-end LLM analysis pipeline on the replay backend.
+
+Runs the single-prompt, batched and streamed analyses (prompt building,
+backend call, parsing, merging) against a ReplayBackend that simulates the
+model's latency and output speed, from several concurrent clients. No API
+key or network access is needed. Pass --recordings to answer from requests
+captured with LLM_BACKEND=record instead of synthetic responses.
+
+Usage (from the project root):
+    python3 -m benchmarks.llm_pipeline
+    python3 -m benchmarks.llm_pipeline --jobs 30 --requests 40 --concurrency 8 --latency 0.8 --tps 80
+"""
+
+import argparse
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from llm import analyze_with_llm, analyze_with_llm_batched, stream_llm_analysis
+from llm_backends import ReplayBackend, set_backend
+
+
+SKILLS = ['python', 'sql', 'excel', 'tableau', 'docker', 'aws', 'react', 'java', 'statistics',
+          'pandas', 'communication', 'leadership', 'git', 'linux', 'forecasting', 'valuation']
+
+
+def make_jobs(count, rng):
+    return [{
+        'id': i + 1,
+        'company': f'Company {i + 1}',
+        'job_title': rng.choice(['Data Intern', 'Software Intern', 'Analyst Intern']),
+        'requirements': 'Experience with ' + ', '.join(rng.sample(SKILLS, 6)) + '.',
+        'tags': 'internship, summer'
+    } for i in range(count)]
+
+
+def run_single(resume_text, jobs, args):
+    analysis, error = analyze_with_llm(resume_text, jobs)
+    assert error is None and len(analysis['job_analyses']) == len(jobs), error
+    return None
+
+
+def run_batched(resume_text, jobs, args):
+    analysis, error = analyze_with_llm_batched(resume_text, jobs, batch_size=args.batch_size,
+                                               max_concurrency=args.batch_concurrency)
+    assert error is None and len(analysis['job_analyses']) == len(jobs), error
+    return None
+
+
+def run_stream(resume_text, jobs, args):
+    started = time.perf_counter()
+    first_result = None
+    count = 0
+    for kind, _ in stream_llm_analysis(resume_text, jobs):
+        if kind == 'job':
+            count += 1
+            if first_result is None:
+                first_result = time.perf_counter() - started
+    assert count == len(jobs), count
+    return first_result
+
+
+MODES = {'single': run_single, 'batched': run_batched, 'stream': run_stream}
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def bench(mode, resume_text, jobs, args):
+    run = MODES[mode]
+
+    def timed(_):
+        started = time.perf_counter()
+        first_result = run(resume_text, jobs, args)
+        return time.perf_counter() - started, first_result
+
+    metrics.reset()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(timed, range(args.requests)))
+    wall = time.perf_counter() - started
+
+    latencies = [latency for latency, _ in results]
+    firsts = [first for _, first in results if first is not None]
+    counters = metrics.snapshot()['counters']
+    return {
+        'mode': mode,
+        'analyses_per_s': args.requests / wall,
+        'jobs_per_s': args.requests * len(jobs) / wall,
+        'p50': statistics.median(latencies),
+        'p95': percentile(latencies, 95),
+        'first_p50': statistics.median(firsts) if firsts else None,
+        'llm_calls': counters.get('llm.requests', 0),
+        'output_tokens': counters.get('llm.output_tokens', 0)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=20, help='jobs per analysis')
+    parser.add_argument('--requests', type=int, default=12, help='analyses per mode')
+    parser.add_argument('--concurrency', type=int, default=4, help='concurrent clients')
+    parser.add_argument('--latency', type=float, default=0.5, help='simulated seconds to first token')
+    parser.add_argument('--tps', type=float, default=400.0, help='simulated output tokens per second')
+    parser.add_argument('--output-tokens', type=int, default=None, help='fixed output tokens per call')
+    parser.add_argument('--batch-size', type=int, default=5)
+    parser.add_argument('--batch-concurrency', type=int, default=4)
+    parser.add_argument('--recordings', default=None, help='JSON Lines file written by LLM_BACKEND=record')
+    parser.add_argument('--modes', default='single,batched,stream')
+    args = parser.parse_args()
+
+    set_backend(ReplayBackend(args.recordings, latency=args.latency, tokens_per_second=args.tps,
+                              output_tokens=args.output_tokens))
+    rng = random.Random(42)
+    jobs = make_jobs(args.jobs, rng)
+    resume_text = 'Economics student. Projects in ' + ', '.join(rng.sample(SKILLS, 8)) + '.'
+
+    print(f"{args.jobs} jobs/analysis, {args.requests} analyses, {args.concurrency} clients, "
+          f"latency {args.latency:g}s, {args.tps:g} tok/s")
+    print(f"{'mode':<8} {'analyses/s':>10} {'jobs/s':>8} {'p50 s':>7} {'p95 s':>7} {'first p50':>9} {'calls':>6} {'out tok':>8}")
+    for mode in args.modes.split(','):
+        r = bench(mode, resume_text, jobs, args)
+        first = f"{r['first_p50']:.2f}" if r['first_p50'] is not None else '-'
+        print(f"{r['mode']:<8} {r['analyses_per_s']:>10.2f} {r['jobs_per_s']:>8.1f} {r['p50']:>7.2f} "
+              f"{r['p95']:>7.2f} {first:>9} {r['llm_calls']:>6} {r['output_tokens']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark: deep pages of the applications list, OFFSET vs. keyset.
+
+Builds a temporary, migrated database of synthetic applications and, for
+each sort of the applications list, times reading one page at increasing
+depths two ways: ORDER BY ... LIMIT n OFFSET k (reads and discards every
+row before the page) and pagination.keyset_page() from a cursor (seeks
+straight to the page through the sort column's index).
+
+Usage (from the project root):
+    python3 -m benchmarks.pagination
+    python3 -m benchmarks.pagination --apps 500000 --page-size 50
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from flask import Flask
+
+from migrations import migrate
+from models import db, Application
+from pagination import decode_cursor, encode_cursor, keyset_page
+
+
+# (sort name, column, nullable)
+SORTS = [
+    ('updated_at', Application.updated_at, True),
+    ('company', Application.company, False),
+    ('deadline', Application.deadline, True),
+]
+
+
+def build_database(path, apps, rng):
+    db.metadata.create_all(db.create_engine(f'sqlite:///{path}'))
+    now = datetime.utcnow()
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        'INSERT INTO applications (id, company, job_title, status, deadline, created_at, updated_at) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?)',
+        ((i, f'Company {rng.randint(1, apps // 4)}', 'Intern', 'saved',
+          (date.today() + timedelta(days=rng.randint(-200, 200))).isoformat() if rng.random() < 0.8 else None,
+          now.isoformat(' '), (now - timedelta(minutes=rng.randint(0, 10 ** 6))).isoformat(' '))
+         for i in range(1, apps + 1))
+    )
+    conn.commit()
+    conn.close()
+
+
+def timed(func, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--apps', type=int, default=200000, help='synthetic applications')
+    parser.add_argument('--page-size', type=int, default=50, help='rows per page')
+    parser.add_argument('--repeat', type=int, default=5, help='reads of each page')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, 'tracker.db')
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    db.init_app(app)
+    try:
+        with app.app_context():
+            build_database(path, args.apps, random.Random(42))
+            migrate(db.engine)
+            depths = [depth for depth in (0, 100, 1000, 10000, 100000) if depth < args.apps] + [args.apps - args.page_size]
+            print(f"{args.apps} applications, pages of {args.page_size}")
+            print(f"{'sort':<12} {'row offset':>11} {'offset ms':>10} {'keyset ms':>10}")
+
+            for name, column, nullable in SORTS:
+                for depth in depths:
+                    query = Application.query.order_by(column.desc(), Application.id.desc())
+                    # The cursor a client would hold: the key of the row before the page
+                    after = None
+                    if depth:
+                        before = db.session.query(column, Application.id) \
+                            .order_by(column.desc(), Application.id.desc()).offset(depth - 1).first()
+                        after = decode_cursor(encode_cursor(name, before), name)
+
+                    offset_ms = timed(lambda: query.offset(depth).limit(args.page_size).all(), args.repeat)
+                    keyset_ms = timed(lambda: keyset_page(Application.query, column, Application.id, after,
+                                                          args.page_size, descending=True, nullable=nullable),
+                                      args.repeat)
+                    db.session.expunge_all()
+                    print(f"{name:<12} {depth:>11} {offset_ms:>10.2f} {keyset_ms:>10.2f}")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Benchmark: query plans and timings of the hot-path queries, before and
+after the schema migrations.
+
+Builds a database the way an older version of the app left it (current
+tables, none of the indexes added by migrations, user_version 0), fills it
+with synthetic applications, contacts and updates, and prints SQLite's
+EXPLAIN QUERY PLAN and the mean time of each query. It then runs
+migrations.migrate() on the same file and prints both again. Pass --db to
+run on a copy of an existing tracker.db instead; the original is not
+touched.
+
+Usage (from the project root):
+    python3 -m benchmarks.query_plans
+    python3 -m benchmarks.query_plans --apps 50000 --repeat 50
+    python3 -m benchmarks.query_plans --db instance/tracker.db
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine, text
+
+from migrations import LATEST_VERSION, migrate
+from models import db
+
+
+STATUSES = ['saved', 'applied', 'interviewing', 'offer', 'rejected', 'withdrawn']
+
+# Indexes that only migrations add to an existing database
+MIGRATED_INDEXES = ['ix_applications_status_deadline', 'ix_applications_status_updated_at', 'ix_applications_deadline',
+                    'ix_applications_updated_at', 'ix_contacts_application_id', 'ix_updates_application_id',
+                    'ix_applications_company', 'ix_applications_created_at']
+
+# (name, SQL as the ORM issues it)
+QUERIES = [
+    ('dashboard upcoming deadlines',
+     "SELECT * FROM applications WHERE deadline >= :today AND status IN ('saved', 'applied') "
+     "ORDER BY deadline LIMIT 5"),
+    ('dashboard recent', 'SELECT * FROM applications ORDER BY updated_at DESC LIMIT 5'),
+    ('status filter', "SELECT * FROM applications WHERE status = 'interviewing' ORDER BY updated_at DESC"),
+    ('view contacts', 'SELECT * FROM contacts WHERE application_id = :app_id'),
+    ('view updates', 'SELECT * FROM updates WHERE application_id = :app_id ORDER BY created_at DESC'),
+]
+
+
+def build_old_database(path, apps, rng):
+    """A database as created before the migrations, filled with synthetic rows."""
+    engine = create_engine(f'sqlite:///{path}')
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for name in MIGRATED_INDEXES:
+            conn.execute(text(f'DROP INDEX IF EXISTS {name}'))
+        conn.execute(text('PRAGMA user_version = 0'))
+
+    now = datetime.utcnow()
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        'INSERT INTO applications (id, company, job_title, status, deadline, created_at, updated_at) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?)',
+        ((i, f'Company {i}', 'Intern', rng.choice(STATUSES),
+          (date.today() + timedelta(days=rng.randint(-200, 200))).isoformat() if rng.random() < 0.8 else None,
+          now.isoformat(' '), (now - timedelta(minutes=rng.randint(0, 10 ** 6))).isoformat(' '))
+         for i in range(1, apps + 1))
+    )
+    conn.executemany(
+        'INSERT INTO contacts (application_id, name, contacted, created_at) VALUES (?, ?, 0, ?)',
+        ((rng.randint(1, apps), f'Person {i}', now.isoformat(' ')) for i in range(apps * 2))
+    )
+    conn.executemany(
+        'INSERT INTO updates (application_id, title, update_type, created_at) VALUES (?, ?, ?, ?)',
+        ((rng.randint(1, apps), f'Update {i}', 'note', now.isoformat(' ')) for i in range(apps * 3))
+    )
+    conn.commit()
+    conn.close()
+    engine.dispose()
+
+
+def report(engine, params, repeat):
+    with engine.connect() as conn:
+        for name, sql in QUERIES:
+            plan = conn.execute(text('EXPLAIN QUERY PLAN ' + sql), params).all()
+            started = time.perf_counter()
+            for _ in range(repeat):
+                conn.execute(text(sql), params).all()
+            ms = (time.perf_counter() - started) / repeat * 1000
+            print(f"  {name:<30} {ms:>9.3f} ms")
+            for row in plan:
+                print(f"      {row[-1]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--apps', type=int, default=20000, help='synthetic applications')
+    parser.add_argument('--repeat', type=int, default=20, help='runs of each query')
+    parser.add_argument('--db', default=None, help='existing tracker.db to copy instead of synthetic data')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, 'tracker.db')
+    try:
+        if args.db:
+            shutil.copyfile(args.db, path)
+        else:
+            build_old_database(path, args.apps, random.Random(42))
+        engine = create_engine(f'sqlite:///{path}')
+        with engine.connect() as conn:
+            app_id = conn.execute(text('SELECT coalesce(max(id), 1) FROM applications')).scalar() // 2 or 1
+            version = conn.execute(text('PRAGMA user_version')).scalar()
+        params = {'today': date.today().isoformat(), 'app_id': app_id}
+
+        print(f"Before migrations (user_version {version}):")
+        report(engine, params, args.repeat)
+        started = time.perf_counter()
+        applied = migrate(engine)
+        print(f"Migrated to version {LATEST_VERSION} in {time.perf_counter() - started:.2f}s "
+              f"(applied {applied or 'none'})")
+        print("After migrations:")
+        report(engine, params, args.repeat)
+        engine.dispose()
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark: application search with LIKE scans vs. the FTS5 index.
+
+Builds a temporary database of synthetic applications, indexes it with
+the migrations, and times the old search (ilike '%q%' on company, title
+and tags: a full table scan that never looks at requirements or notes)
+against the FTS5 search over all five fields: matching, ranking the
+matches with bm25(), and snippets for the first page of results.
+
+Usage (from the project root):
+    python3 -m benchmarks.search
+    python3 -m benchmarks.search --apps 300000 --repeat 5
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from flask import Flask
+
+from migrations import migrate
+from models import db, Application
+from search import ranked_matches, search_snippets
+
+
+SKILLS = ['python', 'sql', 'excel', 'tableau', 'docker', 'aws', 'react', 'java', 'statistics', 'pandas',
+          'communication', 'leadership', 'git', 'linux', 'forecasting', 'valuation', 'marketing', 'research',
+          'design', 'figma', 'accounting', 'consulting', 'strategy', 'kubernetes', 'spark', 'hadoop']
+TITLES = ['Data Intern', 'Software Intern', 'Analyst Intern', 'Marketing Intern', 'Design Intern']
+SYLLABLES = ['ba', 'ce', 'di', 'fo', 'gu', 'ka', 'le', 'mi', 'no', 'pu', 'ra', 'se', 'ti', 'vo', 'zu']
+QUERIES = ['intern', 'python', 'kube', 'data intern', 'figma design', 'company 4217']
+
+
+def vocabulary(rng, size=5000):
+    """Skills plus made-up words, with Zipf-like weights as in real text."""
+    words = SKILLS + [''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4))) for _ in range(size)]
+    rng.shuffle(words)
+    return words, [1 / rank for rank in range(1, len(words) + 1)]
+
+
+def build_database(path, apps, rng):
+    words, weights = vocabulary(rng)
+    db.metadata.create_all(db.create_engine(f'sqlite:///{path}'))
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        'INSERT INTO applications (id, company, job_title, requirements, tags, notes, status) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?)',
+        ((i, f'Company {i}', rng.choice(TITLES),
+          ' '.join(rng.choices(words, weights, k=40)), ', '.join(rng.sample(SKILLS, 3)),
+          ' '.join(rng.choices(words, weights, k=10)) if rng.random() < 0.3 else None, 'saved')
+         for i in range(1, apps + 1))
+    )
+    conn.commit()
+    conn.close()
+
+
+def timed(func, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - started) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--apps', type=int, default=200000, help='synthetic applications')
+    parser.add_argument('--repeat', type=int, default=3, help='runs of each search')
+    parser.add_argument('--page', type=int, default=50, help='results shown with snippets')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, 'tracker.db')
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    db.init_app(app)
+    try:
+        with app.app_context():
+            build_database(path, args.apps, random.Random(42))
+            started = time.perf_counter()
+            migrate(db.engine)
+            print(f"{args.apps} applications, indexed in {time.perf_counter() - started:.1f}s")
+            print(f"{'query':<14} {'like ms':>9} {'like hits':>10} {'fts ms':>8} {'fts hits':>9} {'page+snippets ms':>17}")
+
+            for text in QUERIES:
+                def like():
+                    pattern = f'%{text}%'
+                    return db.session.query(Application.id).filter(db.or_(
+                        Application.company.ilike(pattern),
+                        Application.job_title.ilike(pattern),
+                        Application.tags.ilike(pattern)
+                    )).all()
+
+                def fts():
+                    matches = ranked_matches(text)
+                    return db.session.query(matches.c.application_id).order_by(matches.c.rank).all()
+
+                def page():
+                    matches = ranked_matches(text)
+                    ids = [app_id for app_id, in db.session.query(matches.c.application_id)
+                           .order_by(matches.c.rank).limit(args.page)]
+                    return search_snippets(text, ids)
+
+                like_ms, like_rows = timed(like, args.repeat)
+                fts_ms, fts_rows = timed(fts, args.repeat)
+                page_ms, _ = timed(page, args.repeat)
+                print(f"{text:<14} {like_ms:>9.1f} {len(like_rows):>10} {fts_ms:>8.1f} {len(fts_rows):>9} {page_ms:>17.1f}")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
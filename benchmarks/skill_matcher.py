@@ -0,0 +1,128 @@
+"""
+Microbenchmark: single-pass skill matcher vs. the old per-pattern loop.
+
+The reference is the original hard-coded skill list with one re.search
+per pattern. The same list is compiled with SkillMatcher to check that
+both agree, and the current taxonomy file (with aliases) is timed too.
+
+Usage (from the project root):
+    python3 -m benchmarks.skill_matcher
+    python3 -m benchmarks.skill_matcher --docs 2000 --words 600
+"""
+
+import argparse
+import random
+import re
+import time
+
+from skills import SkillMatcher, skill_taxonomy
+
+
+# The skill list as it was hard-coded in app.py
+SKILL_TERMS = [
+    'python', 'java', 'javascript', 'typescript', 'c++', 'c#', 'ruby', 'go',
+    'rust', 'swift', 'kotlin', 'php', 'r', 'scala', 'matlab', 'julia', 'sas',
+    'stata', 'spss', 'sql', 'nosql', 'mongodb', 'postgresql', 'mysql',
+    'pandas', 'numpy', 'scikit-learn', 'tensorflow', 'pytorch', 'keras',
+    'machine learning', 'deep learning', 'data analysis', 'data science',
+    'statistics', 'econometrics', 'causal inference', 'a/b testing',
+    'experimentation', 'regression', 'forecasting', 'time series', 'nlp',
+    'natural language', 'computer vision', 'aws', 'azure', 'gcp',
+    'google cloud', 'docker', 'kubernetes', 'ci/cd', 'git', 'linux',
+    'terraform', 'react', 'angular', 'vue', 'node.js', 'django', 'flask',
+    'fastapi', 'spring', 'rest api', 'graphql', 'excel', 'tableau',
+    'power bi', 'looker', 'financial modeling', 'financial analysis',
+    'valuation', 'accounting', 'budgeting', 'project management', 'agile',
+    'scrum', 'jira', 'communication', 'leadership', 'teamwork',
+    'presentation', 'problem solving', 'critical thinking', 'analytical',
+    'microeconomics', 'macroeconomics', 'game theory',
+    'behavioral economics', 'market research', 'pricing', 'strategy',
+    'consulting', 'cad', 'autocad', 'solidworks', 'simulation',
+    'optimization', 'operations research', 'supply chain', 'logistics',
+    'manufacturing', 'quality', 'lean', 'six sigma',
+]
+
+
+def display_name(term):
+    return term.replace('+', ' plus').replace('.', ' ').strip()
+
+
+# The original implementation: one re.search per skill pattern
+LEGACY_PATTERNS = [r'\b' + re.escape(term) + r'\b' for term in SKILL_TERMS]
+
+
+def legacy_extract_skills(text):
+    found_skills = set()
+    text_lower = text.lower()
+    for pattern in LEGACY_PATTERNS:
+        if re.search(pattern, text_lower):
+            skill = pattern.replace(r'\b', '').replace('\\', '')
+            skill = skill.replace('+', ' plus').replace('.', ' ')
+            found_skills.add(skill.strip())
+    return found_skills
+
+
+FILLER = (
+    'we are looking for a motivated intern to join our growing team and help '
+    'build reliable products for customers across the world you will partner '
+    'with engineers designers and analysts on projects with real impact '
+    'responsibilities include writing documentation reviewing designs and '
+    'supporting launches across several regions strong written skills needed'
+).split()
+
+
+def make_documents(count, words, seed=1453):
+    """Generate requirement texts mixing filler words and known skills."""
+    rng = random.Random(seed)
+    # c++ and c# are left out: the old \b-anchored patterns could not
+    # match them before punctuation, so results would differ by design.
+    skills = [t for t in SKILL_TERMS if t not in ('c++', 'c#')]
+    docs = []
+    for _ in range(count):
+        tokens = [rng.choice(FILLER) for _ in range(words)]
+        for _ in range(words // 25):
+            tokens.insert(rng.randrange(len(tokens)), rng.choice(skills) + ',')
+        docs.append(' '.join(tokens).capitalize() + '.')
+    return docs
+
+
+def run(func, docs, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for doc in docs:
+            func(doc)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--docs', type=int, default=1000, help='number of requirement texts')
+    parser.add_argument('--words', type=int, default=400, help='words per text')
+    parser.add_argument('--repeat', type=int, default=3, help='take the best of N runs')
+    args = parser.parse_args()
+
+    docs = make_documents(args.docs, args.words)
+
+    matcher = SkillMatcher({term: display_name(term) for term in SKILL_TERMS})
+    taxonomy = skill_taxonomy.matcher
+
+    # Both implementations must agree before timing means anything
+    for doc in docs:
+        assert matcher.find(doc) == legacy_extract_skills(doc), doc
+
+    legacy = run(legacy_extract_skills, docs, args.repeat)
+    single = run(matcher.find, docs, args.repeat)
+    with_aliases = run(taxonomy.find, docs, args.repeat)
+
+    print(f"{args.docs} texts x {args.words} words, {len(SKILL_TERMS)} skills")
+    print(f"  per-pattern loop : {legacy * 1000:8.1f} ms")
+    print(f"  single-pass      : {single * 1000:8.1f} ms")
+    print(f"  speedup          : {legacy / single:8.1f}x")
+    print(f"  taxonomy file    : {with_aliases * 1000:8.1f} ms "
+          f"({len(taxonomy.terms)} terms incl. aliases, version {taxonomy.version})")
+
+
+if __name__ == '__main__':
+    main()
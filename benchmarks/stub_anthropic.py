@@ -0,0 +1,135 @@
+"""
+Local stand-in for the Anthropic Messages API.
+
+Answers POST /v1/messages, streamed or not, with the replay backend's
+synthetic responses, including the prompt-cache usage the API would
+report, and counts the TCP connections it accepts so that connection reuse
+can be checked. Point the app at it with ANTHROPIC_BASE_URL.
+
+Usage (from the project root):
+    python3 -m benchmarks.stub_anthropic --port 8765 --latency 0.2
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8765 ANTHROPIC_API_KEY=stub python3 app.py
+"""
+
+import argparse
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llm_backends import ReplayBackend
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep connections open between requests
+
+    def setup(self):
+        super().setup()
+        self.server.count('connections')
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        if self.path.split('?')[0] != '/v1/messages':
+            body = {'type': 'error', 'error': {'type': 'not_found_error', 'message': self.path}}
+            return self._send(404, 'application/json', json.dumps(body).encode('utf-8'))
+
+        self.server.count('requests')
+        stream = request.pop('stream', False)
+        response = self.server.backend.respond(request)
+        self.server.count('cache_write_tokens', response.cache_write_tokens)
+        self.server.count('cache_read_tokens', response.cache_read_tokens)
+        time.sleep(self.server.latency)
+
+        message = {
+            'id': f'msg_stub_{next(self.server.ids)}',
+            'type': 'message',
+            'role': 'assistant',
+            'model': request.get('model', 'stub'),
+            'content': [{'type': 'text', 'text': response.text}],
+            'stop_reason': 'end_turn',
+            'stop_sequence': None,
+            'usage': {
+                'input_tokens': response.input_tokens,
+                'output_tokens': response.output_tokens,
+                'cache_creation_input_tokens': response.cache_write_tokens,
+                'cache_read_input_tokens': response.cache_read_tokens
+            }
+        }
+        if not stream:
+            return self._send(200, 'application/json', json.dumps(message).encode('utf-8'))
+        self._send(200, 'text/event-stream', ''.join(
+            f'event: {event["type"]}\ndata: {json.dumps(event)}\n\n' for event in stream_events(message)
+        ).encode('utf-8'))
+
+
+def stream_events(message, chunk_size=64):
+    """The server-sent events the API streams for `message`."""
+    text = message['content'][0]['text']
+    usage = message['usage']
+    yield {'type': 'message_start', 'message': dict(message, content=[], stop_reason=None,
+                                                    usage=dict(usage, output_tokens=1))}
+    yield {'type': 'content_block_start', 'index': 0, 'content_block': {'type': 'text', 'text': ''}}
+    for i in range(0, len(text), chunk_size):
+        yield {'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'text_delta', 'text': text[i:i + chunk_size]}}
+    yield {'type': 'content_block_stop', 'index': 0}
+    yield {'type': 'message_delta', 'delta': {'stop_reason': 'end_turn', 'stop_sequence': None},
+           'usage': {'output_tokens': usage['output_tokens']}}
+    yield {'type': 'message_stop'}
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0):
+        super().__init__(address, StubHandler)
+        self.latency = latency
+        self.backend = ReplayBackend(latency=0, tokens_per_second=0)
+        self.ids = itertools.count(1)
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def start(self):
+        """Serve from a daemon thread; returns self."""
+        threading.Thread(target=self.serve_forever, name='stub-anthropic', daemon=True).start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds to wait before each answer')
+    args = parser.parse_args()
+
+    server = StubServer((args.host, args.port), latency=args.latency)
+    print(f"Stub Messages API on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(json.dumps(server.counters, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+Benchmark: counts over time, bucketed in SQL vs. in Python.
+
+Builds a temporary, migrated database with a multi-year history of
+synthetic applications and status changes, prints the query plan of each
+series (which should read only an index), and times
+timeseries.application_timeseries() over the whole history for each
+interval against loading the dates and bucketing them in Python.
+
+Usage (from the project root):
+    python3 -m benchmarks.timeseries
+    python3 -m benchmarks.timeseries --apps 500000 --years 5
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+from flask import Flask
+from sqlalchemy import event
+
+from migrations import migrate
+from models import db, Application, StatusTransition
+from timeseries import application_timeseries, bucketed_counts
+
+
+STATUSES = ['saved', 'applied', 'interviewing', 'offer', 'rejected', 'withdrawn']
+
+
+def build_database(path, apps, years, rng):
+    db.metadata.create_all(db.create_engine(f'sqlite:///{path}'))
+    first = datetime.utcnow() - timedelta(days=365 * years)
+    seconds = 365 * years * 86400
+    created = [first + timedelta(seconds=rng.randint(0, seconds)) for _ in range(apps)]
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        'INSERT INTO applications (id, company, job_title, status, date_applied, created_at, updated_at) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?)',
+        ((i, f'Company {i}', 'Intern', rng.choice(STATUSES),
+          (at + timedelta(days=rng.randint(0, 20))).date().isoformat() if rng.random() < 0.7 else None,
+          at.isoformat(' '), at.isoformat(' ')) for i, at in enumerate(created, 1))
+    )
+    conn.executemany(
+        'INSERT INTO status_transitions (application_id, from_status, to_status, created_at) VALUES (?, ?, ?, ?)',
+        ((i, rng.choice(STATUSES[:3]), rng.choice(STATUSES[1:]),
+          (at + timedelta(days=rng.randint(1, 60))).isoformat(' '))
+         for i, at in enumerate(created, 1) for _ in range(rng.randint(0, 3)))
+    )
+    conn.commit()
+    conn.close()
+
+
+def python_buckets(interval, start, end):
+    """The same counts, bucketed in Python from every date in the range."""
+    def bucket(day):
+        if interval == 'week':
+            return day - timedelta(days=day.weekday())
+        return day.replace(day=1) if interval == 'month' else day
+
+    series = {}
+    for name, column in (('added', Application.created_at), ('applied', Application.date_applied)):
+        values = db.session.query(column).filter(column >= start, column < end + timedelta(days=1)).all()
+        series[name] = Counter(bucket(value if type(value) is date else value.date()) for value, in values)
+    values = db.session.query(StatusTransition.created_at, StatusTransition.to_status) \
+        .filter(StatusTransition.created_at >= start, StatusTransition.created_at < end + timedelta(days=1),
+                StatusTransition.from_status.isnot(None)).all()
+    series['status_changes'] = Counter((bucket(at.date()), status) for at, status in values)
+    return series
+
+
+def timed(func, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--apps', type=int, default=150000, help='synthetic applications')
+    parser.add_argument('--years', type=int, default=4, help='length of the history')
+    parser.add_argument('--repeat', type=int, default=3, help='runs of each query')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, 'tracker.db')
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    db.init_app(app)
+    try:
+        with app.app_context():
+            build_database(path, args.apps, args.years, random.Random(42))
+            migrate(db.engine)
+            transitions = db.session.query(db.func.count(StatusTransition.id)).scalar()
+            end = date.today()
+            start = end - timedelta(days=365 * args.years)
+            print(f"{args.apps} applications and {transitions} status changes over {args.years} years")
+
+            for name, column in (('added', Application.created_at), ('applied', Application.date_applied),
+                                 ('status changes', StatusTransition.created_at)):
+                captured = []
+                listener = lambda conn, cursor, statement, parameters, context, many: captured.append(
+                    (statement, parameters))
+                event.listen(db.engine, 'before_cursor_execute', listener)
+                group_by = StatusTransition.to_status if column is StatusTransition.created_at else None
+                bucketed_counts(column, 'week', start, end, group_by=group_by)
+                event.remove(db.engine, 'before_cursor_execute', listener)
+                statement, parameters = captured[-1]
+                plan = db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+                print(f"  plan of {name}: " + '; '.join(row[-1] for row in plan))
+
+            print(f"{'interval':<9} {'buckets':>8} {'sql ms':>8} {'python ms':>10}")
+            for interval in ('day', 'week', 'month'):
+                buckets = len(application_timeseries(interval, start, end)['buckets'])
+                sql_ms = timed(lambda: application_timeseries(interval, start, end), args.repeat)
+                python_ms = timed(lambda: python_buckets(interval, start, end), args.repeat)
+                print(f"{interval:<9} {buckets:>8} {sql_ms:>8.1f} {python_ms:>10.1f}")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,12 +6,11 @@ Usage:
     python3 seed_data.py
 
 To reset and reseed:
-    rm tracker.db
-    python3 app.py &
+    rm instance/tracker.db*
     python3 seed_data.py
 """
 
-from app import app, db
+from app import app, db, init_db
 from models import Application, Contact, Update
 from datetime import datetime, timedelta
 
@@ -230,6 +229,8 @@ applications_data = [
 
 def seed_database():
     with app.app_context():
+        # Creates and upgrades the tables, as the server does before its first request
+        init_db()
         print("\n🌱 Seeding database with demo data...\n")
         
         for app_data in applications_data:
@@ -0,0 +1,175 @@
+"""
+Status history and funnel metrics.
+
+Every status an application takes is appended to status_transitions,
+with the time spent in the status it left. Two small rollup tables are
+updated in the same transaction: status_flows counts the moves from each
+status to each other status, and stage_totals counts the entries into and
+exits from each status and sums the time spent in it. Conversion rates and
+the average time per stage are then read from a few rows, whatever the
+length of the history.
+
+Flush hooks record the changes, as tags.py does for tags, so every status
+write through the ORM is logged: the quick status toggle, the edit form,
+or anything added later. Application.status_changed_at marks when the
+current stage began, which is what the time in a stage is measured from.
+
+The history of a deleted application is deleted with it, and taken out of
+the rollups. An archived application's history stays, under its id: ids
+are never reused, and restoring the application brings the id back.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import event, inspect
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from models import db, Application, ArchivedApplication, StageTotal, StatusFlow, StatusTransition
+
+
+# Pipeline order, for listing stages
+STATUSES = ['saved', 'applied', 'interviewing', 'offer', 'rejected', 'withdrawn']
+
+
+@event.listens_for(Application.status, 'set', active_history=True)
+def load_previous_status(target, value, oldvalue, initiator):
+    """Nothing to do: listening with active_history loads the old status of an
+    expired application when a new one is set, so the flush can see it."""
+
+
+@event.listens_for(Session, 'before_flush')
+def note_status_changes(session, flush_context, instances):
+    """Stamp applications whose status changes and keep the changes, and deletions, for after the flush."""
+    now = datetime.utcnow()
+    changes = session.info['status_changes'] = []
+    deleted = {obj.id for obj in session.deleted if isinstance(obj, Application)}
+    session.info['deleted_histories'] = sorted(deleted - archived_ids(session, deleted))
+    for obj in session.new:
+        # One that already has a stage start is being restored from the archive: its history goes on
+        if isinstance(obj, Application) and obj.status_changed_at is None:
+            obj.status = obj.status or Application.__table__.c.status.default.arg
+            obj.status_changed_at = now
+            changes.append((obj, None, obj.status, None, now))
+    for obj in session.dirty:
+        if not isinstance(obj, Application) or obj in session.deleted:
+            continue
+        history = inspect(obj).attrs.status.history
+        if not history.has_changes() or not history.deleted or history.deleted[0] == obj.status:
+            continue
+        entered = obj.status_changed_at or obj.created_at
+        seconds = max((now - entered).total_seconds(), 0) if entered else None
+        obj.status_changed_at = now
+        changes.append((obj, history.deleted[0], obj.status, seconds, now))
+
+
+def archived_ids(session, app_ids):
+    """The ones of `app_ids` that have an archive row, whether or not it is flushed yet.
+
+    An application deleted with an archive row is being archived, not
+    deleted: the row may be pending in this flush or may have gone out in an
+    earlier one (an autoflush between adding it and deleting the application).
+    """
+    if not app_ids:
+        return set()
+    pending = {obj.original_id for obj in session.new if isinstance(obj, ArchivedApplication)}
+    flushed = session.connection().execute(
+        db.select(ArchivedApplication.original_id).where(ArchivedApplication.original_id.in_(app_ids - pending))
+    ).scalars()
+    return (pending & app_ids) | set(flushed)
+
+
+@event.listens_for(Session, 'after_flush')
+def record_status_changes(session, flush_context):
+    """Append the changes to the log and add them to the rollups, in the flush's transaction."""
+    deleted = session.info.pop('deleted_histories', None)
+    if deleted:
+        conn = session.connection()
+        history = StatusTransition.application_id.in_(deleted)
+        moves = conn.execute(db.select(StatusTransition.from_status, StatusTransition.to_status,
+                                       StatusTransition.seconds_in_previous).where(history)).all()
+        conn.execute(db.delete(StatusTransition).where(history))
+        add_to_rollups(conn, moves, sign=-1)
+
+    changes = session.info.pop('status_changes', None)
+    if not changes:
+        return
+    conn = session.connection()
+    conn.execute(db.insert(StatusTransition), [
+        {'application_id': obj.id, 'from_status': from_status, 'to_status': to_status,
+         'seconds_in_previous': seconds, 'created_at': at}
+        for obj, from_status, to_status, seconds, at in changes
+    ])
+    add_to_rollups(conn, [(from_status, to_status, seconds) for obj, from_status, to_status, seconds, at in changes])
+
+
+def add_to_rollups(conn, moves, sign=1):
+    """Count (from status, to status, seconds in the from status) moves into the rollups; sign=-1 takes them out."""
+    if not moves:
+        return
+    flows = {}
+    stages = {}
+    for from_status, to_status, seconds in moves:
+        flows[(from_status or '', to_status)] = flows.get((from_status or '', to_status), 0) + sign
+        stages.setdefault(to_status, [0, 0, 0.0])[0] += sign
+        if from_status:
+            stage = stages.setdefault(from_status, [0, 0, 0.0])
+            stage[1] += sign
+            stage[2] += sign * (seconds or 0.0)
+
+    stmt = sqlite_insert(StatusFlow)
+    conn.execute(stmt.on_conflict_do_update(
+        index_elements=['from_status', 'to_status'],
+        set_={'count': StatusFlow.count + stmt.excluded.count}
+    ), [{'from_status': from_status, 'to_status': to_status, 'count': count}
+        for (from_status, to_status), count in flows.items()])
+
+    stmt = sqlite_insert(StageTotal)
+    conn.execute(stmt.on_conflict_do_update(
+        index_elements=['status'],
+        set_={'entered': StageTotal.entered + stmt.excluded.entered,
+              'exited': StageTotal.exited + stmt.excluded.exited,
+              'seconds': StageTotal.seconds + stmt.excluded.seconds}
+    ), [{'status': status, 'entered': entered, 'exited': exited, 'seconds': seconds}
+        for status, (entered, exited, seconds) in stages.items()])
+    if sign < 0:
+        # As if the moves had never been counted
+        conn.execute(db.delete(StatusFlow).where(StatusFlow.count <= 0))
+        conn.execute(db.delete(StageTotal).where(StageTotal.entered <= 0, StageTotal.exited <= 0))
+
+
+def funnel_metrics():
+    """Stage counts, time per stage and stage-to-stage conversion, from the rollup tables.
+
+    A conversion rate is the share of the entries into a status that moved
+    on to the other status.
+    """
+    stages = {row.status: row for row in StageTotal.query}
+    flows = StatusFlow.query.all()
+    order = STATUSES + sorted(set(stages) - set(STATUSES))
+
+    return {
+        'stages': [{
+            'status': status,
+            'entered': stages[status].entered,
+            'exited': stages[status].exited,
+            'avg_days': round(stages[status].seconds / stages[status].exited / 86400, 2)
+            if stages[status].exited else None
+        } for status in order if status in stages],
+        'transitions': sorted(({
+            'from': flow.from_status or None,
+            'to': flow.to_status,
+            'count': flow.count,
+            'rate': round(flow.count / stages[flow.from_status].entered * 100, 1)
+            if flow.from_status in stages and stages[flow.from_status].entered else None
+        } for flow in flows if flow.count), key=lambda row: (
+            order.index(row['from']) if row['from'] in order else -1,
+            order.index(row['to']) if row['to'] in order else len(order)
+        ))
+    }
+
+
+def status_history(app_id):
+    """The status changes of one application, oldest first."""
+    return StatusTransition.query.filter_by(application_id=app_id) \
+        .order_by(StatusTransition.created_at, StatusTransition.id).all()
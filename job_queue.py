@@ -0,0 +1,198 @@
+"""
+Background analysis jobs.
+
+Analyses are submitted as AnalysisJob rows and run on a small thread pool,
+so the request that submits one returns immediately. Workers record their
+status and progress on the row, which clients poll; a finished job points
+at the AnalysisHistory entry holding its results. Threads are enough here:
+the work is mostly waiting on the LLM API and the database, and PDF parsing
+already runs in its own process pool.
+
+A job lives only in the pool of the process that queued it, which is
+recorded on the row (with a heartbeat the worker refreshes as it reports
+progress). When that process is gone, the job will never finish, and
+fail_interrupted_jobs() marks it failed; jobs of processes still running,
+such as the other workers of a multi-process server, are left alone.
+
+A job is cancelled by marking its row cancelled and setting its cancel
+event, which the work (PDF parsing, LLM batches) checks as it goes. A job
+cancelled through another process notices at its next progress report,
+when it reads the row back. Its worker never overwrites a cancelled row.
+"""
+
+import concurrent.futures
+import os
+import socket
+import threading
+from datetime import datetime, timedelta
+
+from models import db, AnalysisJob
+
+
+# A job of another host whose heartbeat is older than this has lost its process
+JOB_LEASE = timedelta(hours=1)
+
+
+class AnalysisJobError(Exception):
+    """An analysis job could not produce results."""
+
+
+def process_owner():
+    """This process, as recorded on the jobs it queues: 'host:pid'."""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def owner_running(owner):
+    """Whether the process `owner` still runs: True, False, or None when this host cannot tell."""
+    host, _, pid = (owner or '').rpartition(':')
+    # os.kill() terminates the process on Windows rather than probing it
+    if host != socket.gethostname() or not pid.isdigit() or os.name == 'nt':
+        return None
+    if owner == process_owner():
+        # A restarted server that got its old pid back: it has queued nothing yet
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # Running, as another user
+    return True
+
+
+class AnalysisJobCancelled(AnalysisJobError):
+    """The job was cancelled while it ran."""
+
+
+class JobQueue:
+    """Runs AnalysisJob rows on a thread pool inside the Flask app context."""
+
+    def __init__(self, app, workers=2):
+        self.app = app
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._executor = None
+        self._cancel_events = {}
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix='analysis-job'
+                )
+            return self._executor
+
+    def submit(self, job_id, func):
+        """Run func(job, report, cancel_event) for the committed job `job_id` in the background.
+
+        `func` returns the id of the AnalysisHistory entry it wrote and may
+        call report(progress, message) along the way, which raises
+        AnalysisJobCancelled once the job is cancelled; `cancel_event` is a
+        threading.Event set on cancel(). Raising marks the job failed with
+        the exception's message, unless it was cancelled.
+        """
+        return self._pool().submit(self._run, job_id, func)
+
+    def cancel(self, job_id):
+        """Stop the job `job_id` if it runs in this process. Mark its row cancelled first."""
+        with self._lock:
+            cancel_event = self._cancel_events.get(job_id)
+        if cancel_event is not None:
+            cancel_event.set()
+
+    def _run(self, job_id, func):
+        cancel_event = threading.Event()
+        with self._lock:
+            self._cancel_events[job_id] = cancel_event
+        with self.app.app_context():
+            try:
+                now = datetime.utcnow()
+                # Unless it was cancelled while queued
+                started = AnalysisJob.query.filter_by(id=job_id, status='queued').update({
+                    'status': 'running', 'owner': process_owner(), 'started_at': now, 'heartbeat_at': now
+                }, synchronize_session=False)
+                db.session.commit()
+                if not started:
+                    return
+                job = db.session.get(AnalysisJob, job_id)
+
+                def report(progress, message=None):
+                    job.progress = int(progress)
+                    job.message = message
+                    job.heartbeat_at = datetime.utcnow()
+                    db.session.commit()
+                    # The commit expired the row, so this reads a cancel made through any process
+                    if job.status == 'cancelled':
+                        cancel_event.set()
+                    if cancel_event.is_set():
+                        raise AnalysisJobCancelled('Analysis job cancelled')
+
+                try:
+                    history_id = func(job, report, cancel_event)
+                except Exception as e:
+                    db.session.rollback()
+                    if cancel_event.is_set():
+                        print(f"Analysis job {job_id} cancelled")
+                        return
+                    print(f"Analysis job {job_id} failed: {e}")
+                    outcome = {'status': 'failed', 'error': str(e)}
+                else:
+                    outcome = {'status': 'completed', 'progress': 100, 'message': None, 'history_id': history_id}
+                outcome['finished_at'] = datetime.utcnow()
+                # A job cancelled meanwhile stays cancelled
+                AnalysisJob.query.filter_by(id=job_id, status='running').update(outcome, synchronize_session=False)
+                db.session.commit()
+            finally:
+                db.session.remove()
+                with self._lock:
+                    self._cancel_events.pop(job_id, None)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def fail_interrupted_jobs(lease=JOB_LEASE):
+    """Mark jobs left queued or running by a process that has gone as failed; returns how many.
+
+    The owner is checked directly when it ran on this host; a job of another
+    host is taken as interrupted once its heartbeat is older than `lease`.
+    Jobs recorded before owners were (no owner) are interrupted.
+    """
+    now = datetime.utcnow()
+    unfinished = AnalysisJob.query.filter(AnalysisJob.status.in_(('queued', 'running'))) \
+        .with_entities(AnalysisJob.id, AnalysisJob.owner, AnalysisJob.heartbeat_at, AnalysisJob.created_at).all()
+    interrupted = []
+    for job_id, owner, heartbeat_at, created_at in unfinished:
+        running = owner_running(owner) if owner else False
+        if running is None:
+            running = (heartbeat_at or created_at or now) > now - lease
+        if not running:
+            interrupted.append(job_id)
+    if interrupted:
+        AnalysisJob.query.filter(AnalysisJob.id.in_(interrupted),
+                                 AnalysisJob.status.in_(('queued', 'running'))).update({
+            'status': 'failed',
+            'error': 'Interrupted by a server restart',
+            'finished_at': now
+        }, synchronize_session=False)
+        db.session.commit()
+    return len(interrupted)
+
+
+def serialize_job(job):
+    return {
+        'id': job.id,
+        'analysis_type': job.analysis_type,
+        'status': job.status,
+        'progress': job.progress,
+        'message': job.message,
+        'error': job.error,
+        'history_id': job.history_id,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None
+    }
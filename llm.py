@@ -0,0 +1,511 @@
+"""
+Resume analysis with Claude.
+
+analyze_with_llm sends every selected job in one prompt. For larger
+selections analyze_with_llm_batched splits the jobs into batches that are
+sent concurrently (with a concurrency limit and per-batch retries) and
+merges the per-job results back into the same response shape.
+stream_llm_analysis asks for one JSON line per job and yields each job
+analysis as soon as its line has been generated; a selection too large for
+one prompt is streamed from consecutive prompts, one after the other. Requests go through the
+backend from llm_backends (the Anthropic API unless LLM_BACKEND says
+otherwise).
+
+Prompts are built within token budgets (see prompt_packing): the resume's
+whitespace is normalized and it is cut to RESUME_TOKEN_BUDGET, requirement passages shared
+by several jobs are written once, and batches are packed so that each
+prompt stays under INPUT_TOKEN_BUDGET.
+
+Every prompt starts with the same system prefix, the instructions followed
+by the resume, marked for the API's prompt caching; only the jobs and the
+response format come after it. Batches of one analysis, and re-runs with
+the same resume, then read the prefix from the cache instead of paying for
+it as fresh input.
+"""
+
+import asyncio
+import json
+import os
+import random
+from collections import Counter
+
+import anthropic  # pip install anthropic
+
+from llm_backends import get_backend
+from prompt_packing import estimate_tokens, format_jobs, normalize_text, pack_jobs, truncate_to_tokens
+
+
+LLM_MODEL = "claude-sonnet-4-20250514"
+LLM_PROMPT_VERSION = 4  # Bump when a prompt template changes, to skip old cached results
+
+# Token budgets (estimated) per prompt
+INPUT_TOKEN_BUDGET = int(os.environ.get('LLM_INPUT_TOKEN_BUDGET', 12000))
+RESUME_TOKEN_BUDGET = int(os.environ.get('LLM_RESUME_TOKEN_BUDGET', 2000))
+SINGLE_MAX_TOKENS = 16000  # Output limit of the single and streamed prompts
+BATCH_MAX_TOKENS = 8000  # Output limit of one batch
+OUTPUT_TOKENS_PER_JOB = 250  # Expected size of one job analysis
+OUTPUT_TOKENS_OVERVIEW = 450  # Expected size of the resume-wide fields
+
+
+MATCH_LEVEL_GUIDE = ('"Excellent Match" (80+), "Strong Match" (60-79), '
+                     '"Moderate Match" (40-59), "Weak Match" (<40)')
+
+
+def prepare_resume(resume_text):
+    """Resume text as it goes into a prompt: whitespace normalized and cut to the resume budget."""
+    return truncate_to_tokens(normalize_text(resume_text), RESUME_TOKEN_BUDGET)
+
+
+def build_jobs_summary(jobs_data, start=1):
+    """Markdown list of the jobs for a prompt, numbered from `start`."""
+    return format_jobs(jobs_data, start)
+
+
+def build_system_prompt(resume_text):
+    """The cached prefix shared by every prompt about this resume: instructions, then the resume."""
+    return f"""You are an expert career advisor and ATS (Applicant Tracking System) analyst.
+You analyze how well the resume below matches the job positions you are given.
+
+IMPORTANT:
+- Match scores should be 0-100 based on realistic ATS scoring
+- Be specific and actionable in recommendations
+- Identify transferable skills the ATS might miss
+- Consider both hard skills and soft skills
+- Match level should be: {MATCH_LEVEL_GUIDE}
+
+## RESUME:
+{prepare_resume(resume_text)}
+"""
+
+
+def llm_request(system_prompt, prompt, max_tokens):
+    """Messages API arguments, with the system prompt marked for prompt caching."""
+    return {
+        'model': LLM_MODEL,
+        'max_tokens': max_tokens,
+        'temperature': 0.5,  # (lower = more consistent)
+        'system': [{'type': 'text', 'text': system_prompt, 'cache_control': {'type': 'ephemeral'}}],
+        'messages': [{"role": "user", "content": prompt}]
+    }
+
+
+def build_prompt(jobs_data):
+    """Prompt asking for the full analysis of all jobs at once."""
+    return f"""Analyze how well the resume matches the following job positions.
+
+## JOB POSITIONS TO ANALYZE:
+{build_jobs_summary(jobs_data)}
+
+## YOUR TASK:
+Provide a comprehensive analysis in the following JSON format (respond ONLY with valid JSON, no markdown):
+
+{{
+    "overall_summary": "2-3 sentence overview of the candidate's fit across all positions",
+    "resume_strengths": ["strength1", "strength2", "strength3"],
+    "resume_weaknesses": ["weakness1", "weakness2"],
+    "top_skills_from_resume": ["skill1", "skill2", "skill3", "skill4", "skill5"],
+    "job_analyses": [
+        {{
+            "company": "Company Name",
+            "job_title": "Job Title",
+            "match_score": 75,
+            "match_level": "Strong Match",
+            "matched_skills": ["skill1", "skill2"],
+            "missing_skills": ["skill1", "skill2"],
+            "transferable_skills": ["skill from resume that applies but wasn't explicitly listed"],
+            "recommendations": "Specific advice to improve match for this role",
+            "key_insight": "One unique observation about fit"
+        }}
+    ],
+    "general_recommendations": [
+        "Actionable advice 1 to improve resume",
+        "Actionable advice 2",
+        "Actionable advice 3"
+    ],
+    "skills_to_learn": ["High-priority skill 1", "Skill 2", "Skill 3"],
+    "strongest_match": {{
+        "company": "Best matching company",
+        "job_title": "Best matching job",
+        "why": "Brief explanation"
+    }}
+}}
+"""
+
+
+def build_batch_prompt(jobs_data, include_resume_review):
+    """Prompt for one batch of jobs.
+
+    Only one batch (`include_resume_review`) is asked for the resume-wide
+    fields; the summary and strongest match are computed after merging.
+    """
+    resume_review = """
+    "resume_strengths": ["strength1", "strength2", "strength3"],
+    "resume_weaknesses": ["weakness1", "weakness2"],
+    "top_skills_from_resume": ["skill1", "skill2", "skill3", "skill4", "skill5"],
+    "general_recommendations": [
+        "Actionable advice 1 to improve resume",
+        "Actionable advice 2",
+        "Actionable advice 3"
+    ],""" if include_resume_review else ""
+
+    return f"""Analyze how well the resume matches the following job positions.
+
+## JOB POSITIONS TO ANALYZE:
+{build_jobs_summary(jobs_data)}
+
+## YOUR TASK:
+Respond ONLY with valid JSON (no markdown) in this format, with exactly one
+entry in "job_analyses" per job above, in the same order:
+
+{{{resume_review}
+    "job_analyses": [
+        {{
+            "company": "Company Name",
+            "job_title": "Job Title",
+            "match_score": 75,
+            "match_level": "Strong Match",
+            "matched_skills": ["skill1", "skill2"],
+            "missing_skills": ["skill1", "skill2"],
+            "transferable_skills": ["skill from resume that applies but wasn't explicitly listed"],
+            "recommendations": "Specific advice to improve match for this role",
+            "key_insight": "One unique observation about fit"
+        }}
+    ],
+    "skills_to_learn": ["High-priority skill 1", "Skill 2", "Skill 3"]
+}}
+"""
+
+
+def parse_llm_json(response_text):
+    """Parse the JSON body of a model response, tolerating a markdown fence."""
+    response_text = response_text.strip()
+    if response_text.startswith("```"):
+        response_text = response_text.split("```")[1]
+        if response_text.startswith("json"):
+            response_text = response_text[4:]
+    return json.loads(response_text)
+
+
+def llm_unavailable_reason():
+    """Why LLM analyses cannot run right now (e.g. no API key), or None."""
+    return get_backend().unavailable_reason()
+
+
+def analyze_with_llm(resume_text, jobs_data):
+    """
+    Use Claude to analyze resume against jobs.
+    Returns detailed analysis with semantic matching.
+    """
+    backend = get_backend()
+    reason = backend.unavailable_reason()
+    if reason:
+        return None, reason
+
+    request = llm_request(build_system_prompt(resume_text), build_prompt(jobs_data), SINGLE_MAX_TOKENS)
+
+    try:
+        response = backend.complete(request)
+
+        analysis = parse_llm_json(response.text)
+        return analysis, None
+
+    except anthropic.APIError as e:
+        return None, f"API Error: {str(e)}"
+    except json.JSONDecodeError as e:
+        return None, f"Failed to parse response: {str(e)}"
+    except Exception as e:
+        return None, f"Error: {str(e)}"
+
+
+# ============== STREAMED ANALYSIS ==============
+
+SUMMARY_FIELDS = ('overall_summary', 'resume_strengths', 'resume_weaknesses', 'top_skills_from_resume',
+                  'general_recommendations', 'skills_to_learn', 'strongest_match')
+
+
+def build_stream_prompt(jobs_data, start=1, include_overview=True):
+    """Prompt asking for the analysis as JSON Lines, one job per line.
+
+    Jobs are numbered from `start`; only one prompt of an analysis
+    (`include_overview`) is asked for the final resume-wide line.
+    """
+    overview = """
+Then one final line with the overall review, in this format:
+{"overall_summary": "2-3 sentence overview of the candidate's fit across all positions", "resume_strengths": ["strength1", "strength2", "strength3"], "resume_weaknesses": ["weakness1", "weakness2"], "top_skills_from_resume": ["skill1", "skill2", "skill3", "skill4", "skill5"], "general_recommendations": ["Actionable advice 1 to improve resume", "Actionable advice 2", "Actionable advice 3"], "skills_to_learn": ["High-priority skill 1", "Skill 2", "Skill 3"], "strongest_match": {"company": "Best matching company", "job_title": "Best matching job", "why": "Brief explanation"}}
+""" if include_overview else ""
+
+    return f"""Analyze how well the resume matches the following job positions.
+
+## JOB POSITIONS TO ANALYZE:
+{build_jobs_summary(jobs_data, start)}
+
+## YOUR TASK:
+Respond ONLY with JSON Lines: one complete JSON object per line, no markdown, no other text.
+
+{'First, one' if include_overview else 'One'} line per job above, in the same order, each in this format:
+{{"job": {start}, "company": "Company Name", "job_title": "Job Title", "match_score": 75, "match_level": "Strong Match", "matched_skills": ["skill1", "skill2"], "missing_skills": ["skill1", "skill2"], "transferable_skills": ["skill from resume that applies but wasn't explicitly listed"], "recommendations": "Specific advice to improve match for this role", "key_insight": "One unique observation about fit"}}
+{overview}"""
+
+
+def iter_json_lines(chunks):
+    """Yield each JSON object from a stream of text chunks as soon as its line is complete."""
+    buffer = ''
+    for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split('\n')
+        for line in lines:
+            line = line.strip()
+            # Tolerate a markdown fence around the lines
+            if line and not line.startswith('```'):
+                yield json.loads(line)
+    line = buffer.strip()
+    if line and not line.startswith('```'):
+        yield json.loads(line)
+
+
+def split_stream_batches(resume_text, jobs_data):
+    """Pack jobs into the consecutive prompts of a streamed analysis, each within the budgets."""
+    return pack_jobs(
+        jobs_data,
+        job_tokens=lambda job: estimate_tokens(build_jobs_summary([job])),
+        fixed_tokens=(estimate_tokens(build_system_prompt(resume_text))
+                      + estimate_tokens(build_stream_prompt([]))),
+        input_budget=INPUT_TOKEN_BUDGET,
+        output_budget=SINGLE_MAX_TOKENS - OUTPUT_TOKENS_OVERVIEW,
+        output_tokens_per_job=OUTPUT_TOKENS_PER_JOB
+    )
+
+
+def stream_llm_analysis(resume_text, jobs_data, max_tokens=SINGLE_MAX_TOKENS):
+    """
+    Stream the analysis of the jobs, from one prompt or, for a selection
+    over the token budgets, from consecutive prompts.
+    Yields ('job', job_analysis) for each job as its line completes (with
+    the job's `id` filled in), then ('summary', fields) for the resume-wide
+    fields. Raises anthropic.APIError or ValueError on failure.
+    """
+    batches = split_stream_batches(resume_text, jobs_data)
+    system_prompt = build_system_prompt(resume_text)
+    summary = None
+    job_analyses = []
+    start = 0
+    for i, batch in enumerate(batches):
+        chunks = get_backend().stream(
+            llm_request(system_prompt, build_stream_prompt(batch, start + 1, include_overview=i == 0), max_tokens)
+        )
+        position = 0
+        for item in iter_json_lines(chunks):
+            if 'overall_summary' in item:
+                summary = {key: item.get(key) for key in SUMMARY_FIELDS}
+                continue
+            # Jobs are numbered from start + 1 in the prompt; fall back to arrival order
+            number = item.pop('job', None)
+            index = number - start - 1 if isinstance(number, int) and start < number <= start + len(batch) else position
+            position += 1
+            if index < len(batch):
+                item['id'] = batch[index]['id']
+            job_analyses.append(item)
+            yield 'job', item
+        start += len(batch)
+
+    if summary is not None:
+        if len(batches) > 1:
+            # The overview only saw the first prompt's jobs; sum up and rank all of them
+            merged = dict(summary, job_analyses=job_analyses)
+            summarize_job_analyses(merged)
+            summary.update(overall_summary=merged['overall_summary'], strongest_match=merged['strongest_match'])
+        yield 'summary', summary
+
+
+# ============== BATCHED ANALYSIS ==============
+
+def split_batches(resume_text, jobs_data, batch_size=None, input_budget=None):
+    """Pack jobs into batches whose prompts fit the input and output budgets.
+
+    `batch_size` caps the number of jobs in a batch.
+    """
+    return pack_jobs(
+        jobs_data,
+        job_tokens=lambda job: estimate_tokens(build_jobs_summary([job])),
+        fixed_tokens=(estimate_tokens(build_system_prompt(resume_text))
+                      + estimate_tokens(build_batch_prompt([], True))),
+        input_budget=input_budget or INPUT_TOKEN_BUDGET,
+        output_budget=BATCH_MAX_TOKENS - OUTPUT_TOKENS_OVERVIEW,
+        output_tokens_per_job=OUTPUT_TOKENS_PER_JOB,
+        max_jobs=batch_size
+    )
+
+
+def fits_single_prompt(resume_text, jobs_data):
+    """Whether one prompt for all jobs stays within the input and output budgets."""
+    prompt_tokens = estimate_tokens(build_system_prompt(resume_text)) + estimate_tokens(build_prompt(jobs_data))
+    return (prompt_tokens <= INPUT_TOKEN_BUDGET
+            and len(jobs_data) * OUTPUT_TOKENS_PER_JOB + OUTPUT_TOKENS_OVERVIEW <= SINGLE_MAX_TOKENS)
+
+
+def estimate_llm_tokens(resume_text, jobs_data, mode='single', batch_size=None):
+    """Estimated input and output tokens of an analysis in the given mode.
+
+    `prefix_tokens` of each prompt's input is the cacheable system prefix.
+    """
+    if mode == 'batched':
+        batches = split_batches(resume_text, jobs_data, batch_size)
+        prompts = [build_batch_prompt(batch, i == 0) for i, batch in enumerate(batches)]
+        max_tokens = BATCH_MAX_TOKENS
+    elif mode == 'stream':
+        batches = split_stream_batches(resume_text, jobs_data)
+        starts = [sum(len(batch) for batch in batches[:i]) + 1 for i in range(len(batches))]
+        prompts = [build_stream_prompt(batch, start, i == 0) for i, (batch, start) in enumerate(zip(batches, starts))]
+        max_tokens = SINGLE_MAX_TOKENS
+    else:
+        batches = [jobs_data]
+        prompts = [build_prompt(jobs_data)]
+        max_tokens = SINGLE_MAX_TOKENS
+    prefix_tokens = estimate_tokens(build_system_prompt(resume_text))
+    input_tokens = [prefix_tokens + estimate_tokens(prompt) for prompt in prompts]
+    # The resume-wide fields are asked of the first prompt only
+    output_tokens = [len(batch) * OUTPUT_TOKENS_PER_JOB + (OUTPUT_TOKENS_OVERVIEW if i == 0 else 0)
+                     for i, batch in enumerate(batches)]
+    return {
+        'prompts': len(prompts),
+        'input_tokens': sum(input_tokens),
+        'prefix_tokens': prefix_tokens,
+        'output_tokens': sum(output_tokens),
+        # A prompt over either budget gets truncated input or output
+        'over_budget': max(input_tokens) > INPUT_TOKEN_BUDGET or max(output_tokens) > max_tokens
+    }
+
+
+def match_level(score):
+    if score >= 80:
+        return "Excellent Match"
+    if score >= 60:
+        return "Strong Match"
+    if score >= 40:
+        return "Moderate Match"
+    return "Weak Match"
+
+
+async def _analyze_batch(session, semaphore, system_prompt, batch, include_resume_review,
+                         max_tokens, max_retries):
+    """Analyze one batch, retrying it on its own if the call or parsing fails."""
+    request = llm_request(system_prompt, build_batch_prompt(batch, include_resume_review), max_tokens)
+    last_error = None
+    for attempt in range(max_retries + 1):
+        if attempt:
+            # Exponential backoff with jitter before the retry
+            await asyncio.sleep(min(2 ** attempt, 20) * (0.5 + random.random()))
+        try:
+            async with semaphore:
+                response = await session.complete(request)
+            result = parse_llm_json(response.text)
+            if len(result.get('job_analyses', [])) != len(batch):
+                raise ValueError(f"expected {len(batch)} job analyses, got {len(result.get('job_analyses', []))}")
+            return result, None
+        except anthropic.APIError as e:
+            last_error = f"API Error: {str(e)}"
+        except (json.JSONDecodeError, ValueError) as e:
+            last_error = f"Failed to parse response: {str(e)}"
+    return None, last_error
+
+
+def merge_batch_results(jobs_data, batches, results):
+    """Combine per-batch results into the single-prompt response shape."""
+    analysis = {
+        'resume_strengths': [],
+        'resume_weaknesses': [],
+        'top_skills_from_resume': [],
+        'job_analyses': [],
+        'general_recommendations': [],
+        'skills_to_learn': [],
+        'failed_jobs': []
+    }
+    skills_to_learn = Counter()
+
+    for batch, (result, error) in zip(batches, results):
+        if result is None:
+            analysis['failed_jobs'].extend(
+                {'id': job['id'], 'company': job['company'], 'job_title': job['job_title'], 'error': error}
+                for job in batch
+            )
+            continue
+        for job, job_analysis in zip(batch, result['job_analyses']):
+            job_analysis['id'] = job['id']
+            analysis['job_analyses'].append(job_analysis)
+        for key in ('resume_strengths', 'resume_weaknesses', 'top_skills_from_resume', 'general_recommendations'):
+            analysis[key].extend(result.get(key, []))
+        skills_to_learn.update(result.get('skills_to_learn', []))
+
+    analysis['skills_to_learn'] = [skill for skill, _ in skills_to_learn.most_common(5)]
+    summarize_job_analyses(analysis)
+    return analysis
+
+
+def summarize_job_analyses(analysis):
+    """Fill in overall_summary and strongest_match from the merged job analyses."""
+    job_analyses = analysis['job_analyses']
+    if not job_analyses:
+        analysis['overall_summary'] = "None of the positions could be analyzed."
+        analysis['strongest_match'] = None
+        return
+
+    scores = [job.get('match_score', 0) for job in job_analyses]
+    best = max(job_analyses, key=lambda job: job.get('match_score', 0))
+    strong = sum(1 for score in scores if score >= 60)
+    avg = round(sum(scores) / len(scores))
+
+    analysis['overall_summary'] = (
+        f"Across {len(job_analyses)} positions the resume averages a {avg}% match "
+        f"({match_level(avg)}), with {strong} strong or excellent match{'es' if strong != 1 else ''}. "
+        f"The best fit is {best.get('company')} - {best.get('job_title')} at {best.get('match_score', 0)}%."
+    )
+    analysis['strongest_match'] = {
+        'company': best.get('company'),
+        'job_title': best.get('job_title'),
+        'why': best.get('key_insight') or best.get('recommendations', '')
+    }
+
+
+async def analyze_batches_async(resume_text, jobs_data, batch_size, max_concurrency,
+                                max_retries, max_tokens, on_progress=None):
+    semaphore = asyncio.Semaphore(max_concurrency)
+    batches = split_batches(resume_text, jobs_data, batch_size)
+    system_prompt = build_system_prompt(resume_text)
+    done = 0
+
+    async with get_backend().async_session() as session:
+        async def run(i, batch):
+            nonlocal done
+            result = await _analyze_batch(session, semaphore, system_prompt, batch, i == 0, max_tokens, max_retries)
+            done += 1
+            if on_progress is not None:
+                on_progress(done, len(batches))
+            return result
+
+        results = await asyncio.gather(*(run(i, batch) for i, batch in enumerate(batches)))
+    return batches, results
+
+
+def analyze_with_llm_batched(resume_text, jobs_data, batch_size=5, max_concurrency=4,
+                             max_retries=2, max_tokens=BATCH_MAX_TOKENS, on_progress=None):
+    """
+    Analyze jobs in concurrent batches of at most `batch_size` jobs, packed
+    to stay within the token budgets.
+    Returns (analysis, error) like analyze_with_llm; jobs whose batch kept
+    failing are listed in analysis['failed_jobs']. `on_progress(done, total)`
+    is called each time a batch finishes.
+    """
+    reason = get_backend().unavailable_reason()
+    if reason:
+        return None, reason
+
+    try:
+        batches, results = asyncio.run(analyze_batches_async(
+            resume_text, jobs_data, batch_size, max_concurrency, max_retries, max_tokens, on_progress
+        ))
+    except Exception as e:
+        return None, f"Error: {str(e)}"
+
+    if all(result is None for result, _ in results):
+        return None, results[0][1]
+    return merge_batch_results(jobs_data, batches, results), None
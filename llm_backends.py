@@ -0,0 +1,427 @@
+"""
+Pluggable LLM backends.
+
+Every request llm.py makes goes through the backend selected with the
+LLM_BACKEND environment variable:
+
+    anthropic  the Anthropic API (default)
+    record     the Anthropic API, appending each request/response pair
+               to LLM_RECORD_FILE
+    replay     no network: answers requests recorded in LLM_RECORD_FILE
+               and synthesizes well-formed answers for any others, with
+               simulated latency (LLM_REPLAY_LATENCY seconds before the
+               first token, then LLM_REPLAY_TOKENS_PER_SECOND)
+
+Requests are dicts of Messages API arguments (model, max_tokens,
+temperature, system, messages); responses are LlmResponse tuples, which
+include the prompt-cache tokens written and read by the call.
+
+The Anthropic backend keeps one client, and so one pool of keep-alive
+connections, for the whole process. ANTHROPIC_BASE_URL points it at
+another server, e.g. the local stand-in in benchmarks/stub_anthropic.py.
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+import anthropic  # pip install anthropic
+import httpx
+
+import metrics
+from prompt_packing import estimate_tokens
+
+
+# input_tokens excludes the prompt-cache tokens, as in the API's usage
+LlmResponse = namedtuple('LlmResponse', 'text input_tokens output_tokens cache_write_tokens cache_read_tokens',
+                         defaults=(0, 0))
+
+# Connection pool of the shared Anthropic client
+HTTP_MAX_CONNECTIONS = int(os.environ.get('LLM_HTTP_MAX_CONNECTIONS', 20))
+HTTP_KEEPALIVE_SECONDS = float(os.environ.get('LLM_HTTP_KEEPALIVE_SECONDS', 60))
+
+# Prompt caching as the API does it: prefixes shorter than this are not
+# cached, and a cached prefix expires after this many seconds unused
+PROMPT_CACHE_MIN_TOKENS = 1024
+PROMPT_CACHE_TTL = 300
+
+
+def request_key(request):
+    """Stable hash of a request, used to match recordings on replay."""
+    return hashlib.sha256(json.dumps(request, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def request_text(request):
+    """All the prompt text of a request: system blocks, then messages."""
+    system = request.get('system') or []
+    if isinstance(system, str):
+        system = [{'text': system}]
+    parts = [block['text'] for block in system]
+    for message in request['messages']:
+        content = message['content']
+        parts.extend([content] if isinstance(content, str) else [block.get('text', '') for block in content])
+    return '\n\n'.join(parts)
+
+
+def cached_prefix(request):
+    """Text of the system blocks up to the last one marked with cache_control."""
+    system = request.get('system') or []
+    if isinstance(system, str):
+        return ''
+    marked = [i for i, block in enumerate(system) if block.get('cache_control')]
+    return '\n\n'.join(block['text'] for block in system[:marked[-1] + 1]) if marked else ''
+
+
+def record_usage(response):
+    metrics.incr('llm.requests')
+    metrics.incr('llm.input_tokens', response.input_tokens)
+    metrics.incr('llm.output_tokens', response.output_tokens)
+    metrics.incr('llm.cache_write_tokens', response.cache_write_tokens)
+    metrics.incr('llm.cache_read_tokens', response.cache_read_tokens)
+    if response.cache_read_tokens:
+        metrics.incr('llm.cache_hits')
+    elif response.cache_write_tokens:
+        metrics.incr('llm.cache_misses')
+
+
+class AsyncSession:
+    """What async_session() yields: `await session.complete(request)`."""
+
+    def __init__(self, complete):
+        self.complete = complete
+
+
+class AnthropicBackend:
+    """Sends requests to the Anthropic API through one shared, pooled client.
+
+    The async session runs the same client's calls in worker threads, so
+    batches reuse the pool too (an async client would be tied to the event
+    loop of one analysis).
+    """
+
+    name = 'anthropic'
+    offline = False
+
+    def __init__(self, api_key=None, base_url=None):
+        self.api_key = api_key
+        self.base_url = base_url
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    def _api_key(self):
+        return self.api_key or os.environ.get('ANTHROPIC_API_KEY')
+
+    def unavailable_reason(self):
+        """Why requests cannot be sent, or None if they can."""
+        if not self._api_key():
+            return "ANTHROPIC_API_KEY environment variable not set"
+        return None
+
+    def client(self):
+        """The process-wide client, created on first use."""
+        with self._client_lock:
+            if self._client is None:
+                self._client = anthropic.Anthropic(
+                    api_key=self._api_key(),
+                    base_url=self.base_url,  # None: ANTHROPIC_BASE_URL or the API
+                    http_client=anthropic.DefaultHttpxClient(limits=httpx.Limits(
+                        max_connections=HTTP_MAX_CONNECTIONS,
+                        max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+                        keepalive_expiry=HTTP_KEEPALIVE_SECONDS
+                    ))
+                )
+            return self._client
+
+    def close(self):
+        with self._client_lock:
+            client, self._client = self._client, None
+        if client is not None:
+            client.close()
+
+    @staticmethod
+    def _response(message):
+        usage = message.usage
+        return LlmResponse(message.content[0].text, usage.input_tokens, usage.output_tokens,
+                           getattr(usage, 'cache_creation_input_tokens', None) or 0,
+                           getattr(usage, 'cache_read_input_tokens', None) or 0)
+
+    def complete(self, request):
+        response = self._response(self.client().messages.create(**request))
+        record_usage(response)
+        return response
+
+    @contextlib.asynccontextmanager
+    async def async_session(self):
+        async def complete(request):
+            return await asyncio.to_thread(self.complete, request)
+
+        yield AsyncSession(complete)
+
+    def stream(self, request):
+        """Yield the response text in chunks as it is generated."""
+        with self.client().messages.stream(**request) as stream:
+            yield from stream.text_stream
+            record_usage(self._response(stream.get_final_message()))
+
+
+class RecordingBackend:
+    """Wraps another backend and appends every exchange to a JSON Lines file."""
+
+    name = 'record'
+    offline = False
+
+    def __init__(self, inner, path):
+        self.inner = inner
+        self.path = path
+        self._lock = threading.Lock()
+
+    def unavailable_reason(self):
+        return self.inner.unavailable_reason()
+
+    def _record(self, request, response, seconds):
+        entry = {
+            'key': request_key(request),
+            'request': request,
+            'text': response.text,
+            'input_tokens': response.input_tokens,
+            'output_tokens': response.output_tokens,
+            'cache_write_tokens': response.cache_write_tokens,
+            'cache_read_tokens': response.cache_read_tokens,
+            'seconds': round(seconds, 3),
+            'recorded_at': datetime.utcnow().isoformat()
+        }
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+
+    def complete(self, request):
+        started = time.perf_counter()
+        response = self.inner.complete(request)
+        self._record(request, response, time.perf_counter() - started)
+        return response
+
+    @contextlib.asynccontextmanager
+    async def async_session(self):
+        async with self.inner.async_session() as session:
+            async def complete(request):
+                started = time.perf_counter()
+                response = await session.complete(request)
+                self._record(request, response, time.perf_counter() - started)
+                return response
+
+            yield AsyncSession(complete)
+
+    def stream(self, request):
+        started = time.perf_counter()
+        chunks = []
+        for chunk in self.inner.stream(request):
+            chunks.append(chunk)
+            yield chunk
+        text = ''.join(chunks)
+        self._record(request, LlmResponse(text, estimate_tokens(request_text(request)), estimate_tokens(text)),
+                     time.perf_counter() - started)
+
+
+class ReplayBackend:
+    """Answers locally: recorded responses where available, synthetic ones otherwise.
+
+    Each answer waits `latency` seconds, then streams its output tokens at
+    `tokens_per_second`. `output_tokens` overrides the token count used for
+    both the pacing and the reported usage. Synthetic answers report the
+    prompt-cache tokens the API would: a cached prefix is written on first
+    use and read by later requests until it expires.
+    """
+
+    name = 'replay'
+    offline = True
+
+    def __init__(self, path=None, latency=1.0, tokens_per_second=50.0, output_tokens=None):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.output_tokens = output_tokens
+        self.recordings = {}
+        self._prompt_cache = {}  # prefix hash -> last used (monotonic)
+        self._prompt_cache_lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.recordings[entry['key']] = entry
+
+    def unavailable_reason(self):
+        return None
+
+    def _cache_usage(self, request):
+        """(tokens written, tokens read) of the request's cached prefix."""
+        prefix = cached_prefix(request)
+        tokens = estimate_tokens(prefix) if prefix else 0
+        if tokens < PROMPT_CACHE_MIN_TOKENS:
+            return 0, 0
+        key = hashlib.sha256(prefix.encode('utf-8')).hexdigest()
+        now = time.monotonic()
+        with self._prompt_cache_lock:
+            last_used = self._prompt_cache.get(key)
+            self._prompt_cache[key] = now
+        if last_used is not None and now - last_used < PROMPT_CACHE_TTL:
+            return 0, tokens
+        return tokens, 0
+
+    def respond(self, request):
+        """The answer to `request`, without the simulated delay or usage metrics."""
+        entry = self.recordings.get(request_key(request))
+        if entry is not None:
+            metrics.incr('llm.replay.hits')
+            response = LlmResponse(entry['text'], entry['input_tokens'], entry['output_tokens'],
+                                   entry.get('cache_write_tokens', 0), entry.get('cache_read_tokens', 0))
+        else:
+            metrics.incr('llm.replay.synthesized')
+            prompt = request_text(request)
+            text = synthesize_response(prompt)
+            cache_write, cache_read = self._cache_usage(request)
+            response = LlmResponse(text, estimate_tokens(prompt) - cache_write - cache_read, estimate_tokens(text),
+                                   cache_write, cache_read)
+        if self.output_tokens:
+            response = response._replace(output_tokens=self.output_tokens)
+        return response
+
+    def _generation_seconds(self, response):
+        return response.output_tokens / self.tokens_per_second if self.tokens_per_second else 0.0
+
+    def complete(self, request):
+        response = self.respond(request)
+        time.sleep(self.latency + self._generation_seconds(response))
+        record_usage(response)
+        return response
+
+    @contextlib.asynccontextmanager
+    async def async_session(self):
+        async def complete(request):
+            response = self.respond(request)
+            await asyncio.sleep(self.latency + self._generation_seconds(response))
+            record_usage(response)
+            return response
+
+        yield AsyncSession(complete)
+
+    def stream(self, request, chunk_size=64):
+        response = self.respond(request)
+        chunks = [response.text[i:i + chunk_size] for i in range(0, len(response.text), chunk_size)]
+        pause = self._generation_seconds(response) / max(len(chunks), 1)
+        time.sleep(self.latency)
+        for chunk in chunks:
+            time.sleep(pause)
+            yield chunk
+        record_usage(response)
+
+
+# ============== SYNTHETIC RESPONSES ==============
+
+_JOB_BLOCK = re.compile(r'^### Job (\d+): (.*?) - (.*?)\nRequirements: (.*?)\nTags: (.*?)\n---', re.M | re.S)
+_SHARED = re.compile(r'^\[S(\d+)\] (.*)$', re.M)
+_WORD = re.compile(r'[a-z][a-z0-9+#.]{2,}')
+
+
+def _synthesize_job(resume_words, number, company, job_title, requirements):
+    wanted = list(dict.fromkeys(_WORD.findall(requirements.lower())))
+    matched = [word for word in wanted if word in resume_words]
+    missing = [word for word in wanted if word not in resume_words]
+    score = int(len(matched) / len(wanted) * 100) if wanted else 50
+    level = ("Excellent Match" if score >= 80 else "Strong Match" if score >= 60
+             else "Moderate Match" if score >= 40 else "Weak Match")
+    return {
+        'job': number,
+        'company': company,
+        'job_title': job_title,
+        'match_score': score,
+        'match_level': level,
+        'matched_skills': matched[:5],
+        'missing_skills': missing[:5],
+        'transferable_skills': [],
+        'recommendations': f"Highlight experience with {', '.join(missing[:2]) or 'the listed requirements'}.",
+        'key_insight': f"{len(matched)} of {len(wanted)} requirement keywords appear in the resume."
+    }
+
+
+def synthesize_response(prompt):
+    """Build a response in the format the prompt asks for, scored by keyword overlap."""
+    resume = re.split(r'^## ', prompt.split('## RESUME:', 1)[-1], maxsplit=1, flags=re.M)[0]
+    resume_words = set(_WORD.findall(resume.lower()))
+    # Expand references to requirement passages shared between jobs
+    shared = dict(_SHARED.findall(prompt))
+    jobs = [_synthesize_job(resume_words, int(number), company, job_title,
+                            re.sub(r'\[S(\d+)\]', lambda m: shared.get(m.group(1), ''), requirements))
+            for number, company, job_title, requirements, _ in _JOB_BLOCK.findall(prompt)]
+    review = {
+        'resume_strengths': ["Relevant technical coursework", "Clear project descriptions"],
+        'resume_weaknesses': ["Few quantified results"],
+        'top_skills_from_resume': sorted(resume_words)[:5],
+        'general_recommendations': ["Quantify the impact of each project", "Mirror the wording of the postings"],
+        'skills_to_learn': list(dict.fromkeys(skill for job in jobs for skill in job['missing_skills']))[:3]
+    }
+    best = max(jobs, key=lambda job: job['match_score'], default=None)
+    overview = {
+        'overall_summary': f"Synthetic analysis of {len(jobs)} positions.",
+        **review,
+        'strongest_match': {'company': best['company'], 'job_title': best['job_title'],
+                            'why': best['key_insight']} if best else None
+    }
+
+    if 'JSON Lines' in prompt:
+        lines = jobs + [overview] if '"overall_summary"' in prompt else jobs
+        return '\n'.join(json.dumps(line) for line in lines)
+    for job in jobs:
+        del job['job']
+    if 'entry in "job_analyses"' in prompt:
+        batch = {'job_analyses': jobs, 'skills_to_learn': review['skills_to_learn']}
+        if '"resume_strengths"' in prompt:
+            batch.update(review)
+        return json.dumps(batch)
+    return json.dumps(dict(overview, job_analyses=jobs))
+
+
+# ============== SELECTION ==============
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def backend_from_env():
+    """Build the backend named by LLM_BACKEND."""
+    name = os.environ.get('LLM_BACKEND', 'anthropic')
+    path = os.environ.get('LLM_RECORD_FILE', 'llm_recordings.jsonl')
+    if name == 'anthropic':
+        return AnthropicBackend()
+    if name == 'record':
+        return RecordingBackend(AnthropicBackend(), path)
+    if name == 'replay':
+        output_tokens = os.environ.get('LLM_REPLAY_OUTPUT_TOKENS')
+        return ReplayBackend(
+            path,
+            latency=float(os.environ.get('LLM_REPLAY_LATENCY', 1.0)),
+            tokens_per_second=float(os.environ.get('LLM_REPLAY_TOKENS_PER_SECOND', 50)),
+            output_tokens=int(output_tokens) if output_tokens else None
+        )
+    raise ValueError(f"Unknown LLM_BACKEND: {name} (expected anthropic, record or replay)")
+
+
+def get_backend():
+    """The backend in use, created from the environment on first use."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = backend_from_env()
+        return _backend
+
+
+def set_backend(backend):
+    """Use `backend` for all further requests (e.g. a ReplayBackend in benchmarks)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
@@ -0,0 +1,48 @@
+"""
+In-process counters and timings, exposed as JSON at /api/metrics.
+
+Counts are per process and reset on restart; they are meant for watching
+cache hit rates and latencies while developing or benchmarking.
+"""
+
+import threading
+from collections import Counter
+
+
+_lock = threading.Lock()
+_counters = Counter()
+_timings = {}
+
+
+def incr(name, amount=1):
+    """Add `amount` to the counter `name`."""
+    with _lock:
+        _counters[name] += amount
+
+
+def observe(name, value):
+    """Record one measurement (e.g. seconds) under `name`."""
+    with _lock:
+        stats = _timings.setdefault(name, {'count': 0, 'total': 0.0, 'max': 0.0})
+        stats['count'] += 1
+        stats['total'] += value
+        stats['max'] = max(stats['max'], value)
+
+
+def snapshot():
+    """Return a copy of all counters and timing summaries."""
+    with _lock:
+        return {
+            'counters': dict(_counters),
+            'timings': {
+                name: dict(stats, avg=stats['total'] / stats['count'])
+                for name, stats in _timings.items()
+            }
+        }
+
+
+def reset():
+    """Clear all counters and timings."""
+    with _lock:
+        _counters.clear()
+        _timings.clear()
@@ -0,0 +1,235 @@
+"""
+Versioned schema migrations for the SQLite database.
+
+db.create_all() creates missing tables but never changes existing ones,
+so each change to an existing table is a numbered migration here. SQLite's
+PRAGMA user_version records the last migration applied to a database, and
+migrate() applies the newer ones in order, recording each as it finishes.
+Migrations are idempotent, so one interrupted halfway can simply run again,
+and on a database that create_all() has just built from the current models
+(which already has their changes) they do nothing.
+
+To change an existing table, update the model and append a migration with
+the next version number; never edit or renumber one that has shipped.
+"""
+
+import re
+
+from sqlalchemy import text
+
+
+def columns(conn, table):
+    return {row[1] for row in conn.execute(text(f'PRAGMA table_info({table})'))}
+
+
+def add_history_resume_id(conn):
+    if 'resume_id' not in columns(conn, 'analysis_history'):
+        conn.execute(text('ALTER TABLE analysis_history ADD COLUMN resume_id INTEGER REFERENCES resumes(id)'))
+
+
+def add_hot_path_indexes(conn):
+    # Names match the ones create_all() gives the indexes declared in models.py
+    for statement in (
+        # Status filters, and the dashboard's upcoming deadlines (status IN (...) by deadline)
+        'CREATE INDEX IF NOT EXISTS ix_applications_status_deadline ON applications (status, deadline)',
+        # Status filters on the applications list, sorted by last update (the default)
+        'CREATE INDEX IF NOT EXISTS ix_applications_status_updated_at ON applications (status, updated_at)',
+        'CREATE INDEX IF NOT EXISTS ix_applications_deadline ON applications (deadline)',
+        'CREATE INDEX IF NOT EXISTS ix_applications_updated_at ON applications (updated_at)',
+        'CREATE INDEX IF NOT EXISTS ix_contacts_application_id ON contacts (application_id)',
+        'CREATE INDEX IF NOT EXISTS ix_updates_application_id ON updates (application_id)',
+    ):
+        conn.execute(text(statement))
+    conn.execute(text('ANALYZE'))
+
+
+def add_application_search(conn):
+    # External content: the index reads the text back from applications
+    conn.execute(text(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS applications_fts USING fts5("
+        "company, job_title, tags, requirements, notes, "
+        "content='applications', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    ))
+    columns = 'company, job_title, tags, requirements, notes'
+    new_values = 'new.id, new.company, new.job_title, new.tags, new.requirements, new.notes'
+    old_values = "'delete', old.id, old.company, old.job_title, old.tags, old.requirements, old.notes"
+    for statement in (
+        f"""CREATE TRIGGER IF NOT EXISTS applications_fts_insert AFTER INSERT ON applications BEGIN
+            INSERT INTO applications_fts (rowid, {columns}) VALUES ({new_values});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS applications_fts_delete AFTER DELETE ON applications BEGIN
+            INSERT INTO applications_fts (applications_fts, rowid, {columns}) VALUES ({old_values});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS applications_fts_update AFTER UPDATE OF {columns} ON applications BEGIN
+            INSERT INTO applications_fts (applications_fts, rowid, {columns}) VALUES ({old_values});
+            INSERT INTO applications_fts (rowid, {columns}) VALUES ({new_values});
+        END""",
+    ):
+        conn.execute(text(statement))
+    # Index the applications that already exist
+    conn.execute(text("INSERT INTO applications_fts (applications_fts) VALUES ('rebuild')"))
+
+
+def add_normalized_tags(conn):
+    # create_all() has created the (new) tables; copy the tags strings into them
+    keys = {key: tag_id for tag_id, key in conn.execute(text('SELECT id, "key" FROM tags'))}
+    rows = conn.execute(text("SELECT id, tags FROM applications WHERE tags IS NOT NULL AND tags != ''")).all()
+    for app_id, tags in rows:
+        position = 0
+        seen = set()
+        for name in tags.split(','):
+            name = ' '.join(name.split())
+            key = name.lower()
+            if not name or key in seen:
+                continue
+            seen.add(key)
+            if key not in keys:
+                keys[key] = conn.execute(text('INSERT INTO tags (name, "key") VALUES (:name, :key)'),
+                                         {'name': name, 'key': key}).lastrowid
+            conn.execute(text('INSERT OR IGNORE INTO application_tags (application_id, tag_id, position) '
+                              'VALUES (:app_id, :tag_id, :position)'),
+                         {'app_id': app_id, 'tag_id': keys[key], 'position': position})
+            position += 1
+
+
+def add_sort_indexes(conn):
+    # The remaining sort columns of the applications list, for keyset pagination
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_applications_company ON applications (company)'))
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_applications_created_at ON applications (created_at)'))
+
+
+def add_status_history(conn):
+    # create_all() has created the (new) history and rollup tables
+    if 'status_changed_at' not in columns(conn, 'applications'):
+        conn.execute(text('ALTER TABLE applications ADD COLUMN status_changed_at DATETIME'))
+    # When an application reached its status was never recorded; its last update is the best guess
+    conn.execute(text('UPDATE applications SET status_changed_at = coalesce(updated_at, created_at) '
+                      'WHERE status_changed_at IS NULL'))
+    # Start each application's history, and the rollups, at its current status
+    conn.execute(text(
+        "INSERT INTO status_transitions (application_id, from_status, to_status, created_at) "
+        "SELECT id, NULL, coalesce(status, 'saved'), status_changed_at FROM applications "
+        "WHERE id NOT IN (SELECT application_id FROM status_transitions)"
+    ))
+    rebuild_status_rollups(conn)
+
+
+def rebuild_status_rollups(conn):
+    conn.execute(text('DELETE FROM status_flows'))
+    conn.execute(text('DELETE FROM stage_totals'))
+    conn.execute(text(
+        "INSERT INTO status_flows (from_status, to_status, count) "
+        "SELECT coalesce(from_status, ''), to_status, count(*) FROM status_transitions "
+        "GROUP BY coalesce(from_status, ''), to_status"
+    ))
+    conn.execute(text(
+        "INSERT INTO stage_totals (status, entered, exited, seconds) "
+        "SELECT status, sum(entered), sum(exited), sum(seconds) FROM ("
+        "  SELECT to_status AS status, 1 AS entered, 0 AS exited, 0.0 AS seconds FROM status_transitions"
+        "  UNION ALL"
+        "  SELECT from_status, 0, 1, coalesce(seconds_in_previous, 0) FROM status_transitions"
+        "  WHERE from_status IS NOT NULL"
+        ") GROUP BY status"
+    ))
+
+
+def add_timeseries_indexes(conn):
+    # Date ranges bucketed with strftime(), read from the indexes alone
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_applications_date_applied ON applications (date_applied)'))
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_status_transitions_created_at_to_status '
+                      'ON status_transitions (created_at, to_status, from_status)'))
+    # Superseded by the one above
+    conn.execute(text('DROP INDEX IF EXISTS ix_status_transitions_created_at'))
+
+
+def add_job_owner(conn):
+    existing = columns(conn, 'analysis_jobs')
+    if 'owner' not in existing:
+        conn.execute(text('ALTER TABLE analysis_jobs ADD COLUMN owner VARCHAR(255)'))
+    if 'heartbeat_at' not in existing:
+        conn.execute(text('ALTER TABLE analysis_jobs ADD COLUMN heartbeat_at DATETIME'))
+
+
+def add_application_id_sequence(conn):
+    # Archive rows get ids of their own, and keep the application's alongside
+    if 'original_id' not in columns(conn, 'archived_applications'):
+        conn.execute(text('ALTER TABLE archived_applications ADD COLUMN original_id INTEGER'))
+        conn.execute(text('UPDATE archived_applications SET original_id = id'))
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_archived_applications_original_id '
+                      'ON archived_applications (original_id)'))
+
+    # SQLite cannot add AUTOINCREMENT to a table, so copy the rows into one that has it
+    table_sql = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'applications'")).scalar()
+    if 'AUTOINCREMENT' not in table_sql.upper():
+        new_sql, with_key = re.subn(r'\bid INTEGER NOT NULL,', 'id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,',
+                                    table_sql, count=1)
+        new_sql, without_key = re.subn(r',\s*PRIMARY KEY \(id\)', '', new_sql)
+        if not (with_key and without_key):
+            raise RuntimeError('Unexpected definition of the applications table')
+        # Indexes and the search triggers go with the old table; recreate them on the new one
+        dependents = conn.execute(text("SELECT sql FROM sqlite_master WHERE tbl_name = 'applications' "
+                                       "AND type IN ('index', 'trigger') AND sql IS NOT NULL")).scalars().all()
+        conn.exec_driver_sql(new_sql.replace('CREATE TABLE applications', 'CREATE TABLE applications_new', 1))
+        conn.execute(text('INSERT INTO applications_new SELECT * FROM applications'))
+        conn.execute(text('DROP TABLE applications'))
+        conn.execute(text('ALTER TABLE applications_new RENAME TO applications'))
+        for statement in dependents:
+            conn.exec_driver_sql(statement)
+
+    # Continue after every id handed out so far, including the ones only the archive and the history remember
+    last_id = conn.execute(text(
+        "SELECT max(id) FROM ("
+        "  SELECT max(id) AS id FROM applications"
+        "  UNION ALL SELECT max(original_id) FROM archived_applications"
+        "  UNION ALL SELECT max(application_id) FROM status_transitions"
+        "  UNION ALL SELECT max(seq) FROM sqlite_sequence WHERE name = 'applications'"
+        ")"
+    )).scalar()
+    conn.execute(text("DELETE FROM sqlite_sequence WHERE name = 'applications'"))
+    conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES ('applications', :seq)"), {'seq': last_id or 0})
+
+
+def drop_orphaned_status_history(conn):
+    # History left behind by applications deleted before it was deleted with them
+    conn.execute(text(
+        "DELETE FROM status_transitions WHERE application_id NOT IN (SELECT id FROM applications) "
+        "AND application_id NOT IN (SELECT original_id FROM archived_applications WHERE original_id IS NOT NULL)"
+    ))
+    # The rollups are counts over the history; count again what is left
+    rebuild_status_rollups(conn)
+
+
+# (version, description, function(connection)), in order
+MIGRATIONS = [
+    (1, 'Add analysis_history.resume_id', add_history_resume_id),
+    (2, 'Index applications by status, deadline and updated_at, contacts and updates by application', add_hot_path_indexes),
+    (3, 'Add the applications_fts full-text index', add_application_search),
+    (4, 'Copy application tags into the tags and application_tags tables', add_normalized_tags),
+    (5, 'Index applications by company and created_at', add_sort_indexes),
+    (6, 'Add applications.status_changed_at and start the status history', add_status_history),
+    (7, 'Index applications by date_applied and status changes by date', add_timeseries_indexes),
+    (8, 'Add analysis_jobs.owner and heartbeat_at', add_job_owner),
+    (9, 'Never reuse application ids; give archive rows ids of their own', add_application_id_sequence),
+    (10, 'Delete the status history of deleted applications', drop_orphaned_status_history),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn):
+    return conn.execute(text('PRAGMA user_version')).scalar()
+
+
+def migrate(engine):
+    """Apply the migrations newer than the database's version; returns their versions."""
+    applied = []
+    for version, description, upgrade in MIGRATIONS:
+        with engine.begin() as conn:
+            if schema_version(conn) >= version:
+                continue
+            upgrade(conn)
+            conn.execute(text(f'PRAGMA user_version = {version:d}'))
+        print(f"Applied migration {version}: {description}")
+        applied.append(version)
+    return applied
@@ -1,5 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+import json
 
 db = SQLAlchemy()
 
@@ -8,11 +9,19 @@ class Application(db.Model):
     """Main application model storing job/internship applications."""
     
     __tablename__ = 'applications'
+    __table_args__ = (
+        # Status filters, and upcoming deadlines of saved/applied applications
+        db.Index('ix_applications_status_deadline', 'status', 'deadline'),
+        # Status filters on the applications list, sorted by last update
+        db.Index('ix_applications_status_updated_at', 'status', 'updated_at'),
+        # Ids are never reused: the archive and the status history still know deleted and archived ones
+        {'sqlite_autoincrement': True},
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     
     # Company Info
-    company = db.Column(db.String(200), nullable=False)
+    company = db.Column(db.String(200), nullable=False, index=True)
     company_website = db.Column(db.String(500))
     location = db.Column(db.String(200))
     
@@ -28,11 +37,12 @@ class Application(db.Model):
     # Application Details
     job_posting_url = db.Column(db.String(500))
     salary_range = db.Column(db.String(100))
-    deadline = db.Column(db.Date)
-    date_applied = db.Column(db.Date)
+    deadline = db.Column(db.Date, index=True)
+    date_applied = db.Column(db.Date, index=True)
     
     # Status
     status = db.Column(db.String(50), default='saved')  # saved, applied, interviewing, offer, rejected, withdrawn
+    status_changed_at = db.Column(db.DateTime)  # When the application entered its current status
     
     # Tags (stored as comma-separated string)
     tags = db.Column(db.String(500))
@@ -41,15 +51,19 @@ class Application(db.Model):
     notes = db.Column(db.Text)
     
     # Timestamps
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     # Relationships
     contacts = db.relationship('Contact', backref='application', lazy=True, cascade='all, delete-orphan')
     updates = db.relationship('Update', backref='application', lazy=True, cascade='all, delete-orphan', order_by='desc(Update.created_at)')
+    skill_index = db.relationship('JobSkills', backref='application', uselist=False, lazy=True, cascade='all, delete-orphan')
+    terms = db.relationship('JobTerm', lazy=True, cascade='all, delete-orphan')
+    document = db.relationship('JobDocument', uselist=False, lazy=True, cascade='all, delete-orphan')
+    tag_links = db.relationship('ApplicationTag', lazy=True, cascade='all, delete-orphan', order_by='ApplicationTag.position')
     
     def get_tags_list(self):
-        """Return tags as a list."""
+        """Return tags as a list (from the tags string, without a query)."""
         if self.tags:
             return [tag.strip() for tag in self.tags.split(',') if tag.strip()]
         return []
@@ -61,6 +75,219 @@ class Application(db.Model):
     def __repr__(self):
         return f'<Application {self.company} - {self.job_title}>'
 
+
+class Tag(db.Model):
+    """A distinct tag, shared by every application that has it."""
+    
+    __tablename__ = 'tags'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)  # As first entered
+    key = db.Column(db.String(100), unique=True, nullable=False)  # Lowercase, for exact lookups
+    
+    def __repr__(self):
+        return f'<Tag {self.name}>'
+
+
+class ApplicationTag(db.Model):
+    """Link between an application and one of its tags, kept in step with Application.tags."""
+    
+    __tablename__ = 'application_tags'
+    __table_args__ = (
+        # Applications with a tag, and per-tag counts (covers the whole row)
+        db.Index('ix_application_tags_tag', 'tag_id', 'application_id'),
+    )
+    
+    application_id = db.Column(db.Integer, db.ForeignKey('applications.id'), primary_key=True)
+    tag_id = db.Column(db.Integer, db.ForeignKey('tags.id'), primary_key=True)
+    position = db.Column(db.Integer, nullable=False, default=0)  # Order in the tags string
+    
+    tag = db.relationship('Tag', lazy='joined')
+    
+    def __repr__(self):
+        return f'<ApplicationTag {self.application_id} -> {self.tag_id}>'
+
+
+class JobSkills(db.Model):
+    """Skills extracted from an application's requirements, stored on write."""
+    
+    __tablename__ = 'job_skills'
+    
+    application_id = db.Column(db.Integer, db.ForeignKey('applications.id'), primary_key=True)
+    
+    # Version of the skill taxonomy the skills were extracted with
+    taxonomy_version = db.Column(db.String(64), nullable=False)
+    skills = db.Column(db.Text)  # JSON list of canonical skill names
+    
+    indexed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def get_skills(self):
+        """Return skills as a set."""
+        return set(json.loads(self.skills)) if self.skills else set()
+    
+    def __repr__(self):
+        return f'<JobSkills {self.application_id} ({self.taxonomy_version})>'
+
+
+class JobTerm(db.Model):
+    """Word counts of an application's job text, used for the word cloud."""
+    
+    __tablename__ = 'job_terms'
+    __table_args__ = (
+        # Posting-list lookups by term for relevance ranking (covers the whole row)
+        db.Index('ix_job_terms_term', 'term', 'application_id', 'count'),
+    )
+    
+    application_id = db.Column(db.Integer, db.ForeignKey('applications.id'), primary_key=True)
+    term = db.Column(db.String(100), primary_key=True)
+    count = db.Column(db.Integer, nullable=False)
+    
+    def __repr__(self):
+        return f'<JobTerm {self.application_id} {self.term}={self.count}>'
+
+
+class JobDocument(db.Model):
+    """Length (in words) of an application's job text, for relevance ranking."""
+    
+    __tablename__ = 'job_documents'
+    
+    application_id = db.Column(db.Integer, db.ForeignKey('applications.id'), primary_key=True)
+    length = db.Column(db.Integer, nullable=False)
+    
+    def __repr__(self):
+        return f'<JobDocument {self.application_id} ({self.length} words)>'
+
+
+class TermTotal(db.Model):
+    """Word counts summed over every application, kept up to date on write."""
+    
+    __tablename__ = 'term_totals'
+    
+    term = db.Column(db.String(100), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f'<TermTotal {self.term}={self.count}>'
+
+
+class StatusTransition(db.Model):
+    """One change of an application's status. Rows are only ever appended."""
+    
+    __tablename__ = 'status_transitions'
+    __table_args__ = (
+        # Status changes over time, bucketed by date (covers the whole query)
+        db.Index('ix_status_transitions_created_at_to_status', 'created_at', 'to_status', 'from_status'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    # No foreign key: the history outlives deleted applications
+    application_id = db.Column(db.Integer, nullable=False, index=True)
+    from_status = db.Column(db.String(50))  # None when the application was added
+    to_status = db.Column(db.String(50), nullable=False)
+    seconds_in_previous = db.Column(db.Float)  # Time spent in from_status
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<StatusTransition {self.application_id}: {self.from_status} -> {self.to_status}>'
+
+
+class StatusFlow(db.Model):
+    """Number of status changes from one status to another, kept up to date on write."""
+    
+    __tablename__ = 'status_flows'
+    
+    from_status = db.Column(db.String(50), primary_key=True)  # '' for applications added with to_status
+    to_status = db.Column(db.String(50), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<StatusFlow {self.from_status or "new"} -> {self.to_status}={self.count}>'
+
+
+class StageTotal(db.Model):
+    """Entries into and exits from a status, and the time spent in it, kept up to date on write."""
+    
+    __tablename__ = 'stage_totals'
+    
+    status = db.Column(db.String(50), primary_key=True)
+    entered = db.Column(db.Integer, nullable=False, default=0)
+    exited = db.Column(db.Integer, nullable=False, default=0)
+    seconds = db.Column(db.Float, nullable=False, default=0)  # Time in the status, summed over the exits
+    
+    def __repr__(self):
+        return f'<StageTotal {self.status}: {self.entered} in, {self.exited} out>'
+
+
+class DataGeneration(db.Model):
+    """A counter bumped by every transaction that changes a kind of data, so caches in any process can tell."""
+    
+    __tablename__ = 'data_generations'
+    
+    name = db.Column(db.String(50), primary_key=True)  # e.g. 'applications'
+    generation = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<DataGeneration {self.name}: {self.generation}>'
+
+
+class PdfTextCache(db.Model):
+    """Text extracted from uploaded PDFs, keyed by a hash of the file bytes."""
+    
+    __tablename__ = 'pdf_text_cache'
+    
+    content_hash = db.Column(db.String(64), primary_key=True)  # SHA-256 of the PDF
+    text = db.Column(db.Text, nullable=False)
+    size = db.Column(db.Integer, nullable=False)  # len(text), for the size bound
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f'<PdfTextCache {self.content_hash[:12]} ({self.size} chars)>'
+
+
+class LlmCache(db.Model):
+    """LLM analysis results keyed by a hash of everything sent in the prompt."""
+    
+    __tablename__ = 'llm_cache'
+    
+    cache_key = db.Column(db.String(64), primary_key=True)  # SHA-256 of the prompt inputs
+    model = db.Column(db.String(100))
+    prompt_version = db.Column(db.Integer)
+    response = db.Column(db.Text, nullable=False)  # JSON analysis
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, index=True)
+    
+    def __repr__(self):
+        return f'<LlmCache {self.cache_key[:12]} ({self.model})>'
+
+
+class Resume(db.Model):
+    """A stored resume version, with its text and skills extracted once."""
+    
+    __tablename__ = 'resumes'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(255), nullable=False)  # Original file name
+    content_hash = db.Column(db.String(64), unique=True, nullable=False)  # SHA-256 of the PDF
+    file_data = db.Column(db.LargeBinary, nullable=False)
+    
+    # Extracted once on upload
+    text = db.Column(db.Text)
+    skills = db.Column(db.Text)  # JSON list of canonical skill names
+    taxonomy_version = db.Column(db.String(64))
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def get_skills(self):
+        """Return skills as a set."""
+        return set(json.loads(self.skills)) if self.skills else set()
+    
+    def __repr__(self):
+        return f'<Resume {self.id} - {self.name}>'
+
+
 class AnalysisHistory(db.Model):
     """Store analysis results for history tracking."""
     __tablename__ = 'analysis_history'
@@ -70,6 +297,7 @@ class AnalysisHistory(db.Model):
     
     # What was analyzed
     resume_name = db.Column(db.String(255))
+    resume_id = db.Column(db.Integer, db.ForeignKey('resumes.id'))  # Exact resume version, if stored
     cover_letter_name = db.Column(db.String(255))
     analysis_type = db.Column(db.String(50))  # 'ats' or 'llm'
     jobs_analyzed = db.Column(db.Integer)
@@ -92,13 +320,46 @@ class AnalysisHistory(db.Model):
         return f'<Analysis {self.id} - {self.resume_name} - {self.created_at}>'
 
 
+class AnalysisJob(db.Model):
+    """An analysis submitted to the background worker pool."""
+    
+    __tablename__ = 'analysis_jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    analysis_type = db.Column(db.String(50), nullable=False)  # 'ats' or 'llm'
+    params = db.Column(db.Text, nullable=False)  # JSON inputs (resume, job ids, options)
+    
+    # queued, running, completed, failed
+    status = db.Column(db.String(20), default='queued', nullable=False, index=True)
+    progress = db.Column(db.Integer, default=0)  # Percent
+    message = db.Column(db.String(255))
+    error = db.Column(db.Text)
+    
+    # Where the finished results were written
+    history_id = db.Column(db.Integer, db.ForeignKey('analysis_history.id'))
+    
+    # The process whose pool holds the job ('host:pid'), and when it last reported
+    owner = db.Column(db.String(255))
+    heartbeat_at = db.Column(db.DateTime)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    def get_params(self):
+        return json.loads(self.params) if self.params else {}
+    
+    def __repr__(self):
+        return f'<AnalysisJob {self.id} ({self.analysis_type}, {self.status})>'
+
+
 class Contact(db.Model):
     """People to connect with for each application."""
     
     __tablename__ = 'contacts'
     
     id = db.Column(db.Integer, primary_key=True)
-    application_id = db.Column(db.Integer, db.ForeignKey('applications.id'), nullable=False)
+    application_id = db.Column(db.Integer, db.ForeignKey('applications.id'), nullable=False, index=True)
     
     name = db.Column(db.String(200), nullable=False)
     title = db.Column(db.String(200))  # Their job title
@@ -123,7 +384,7 @@ class Update(db.Model):
     __tablename__ = 'updates'
     
     id = db.Column(db.Integer, primary_key=True)
-    application_id = db.Column(db.Integer, db.ForeignKey('applications.id'), nullable=False)
+    application_id = db.Column(db.Integer, db.ForeignKey('applications.id'), nullable=False, index=True)
     
     title = db.Column(db.String(200), nullable=False)  # e.g., "Phone Screen Scheduled"
     content = db.Column(db.Text)  # Details about the update
@@ -133,3 +394,27 @@ class Update(db.Model):
     
     def __repr__(self):
         return f'<Update {self.title}>'
+
+
+class ArchivedApplication(db.Model):
+    """A closed application moved out of the applications table, with its contacts and updates."""
+    
+    __tablename__ = 'archived_applications'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    original_id = db.Column(db.Integer, index=True)  # The application's id, which it gets back on restore
+    
+    # Shown in the archive list without decoding the JSON
+    company = db.Column(db.String(200), nullable=False)
+    job_title = db.Column(db.String(200), nullable=False)
+    status = db.Column(db.String(50), index=True)
+    updated_at = db.Column(db.DateTime)  # Last update before it was archived
+    
+    data = db.Column(db.Text, nullable=False)  # JSON of every application column
+    contacts = db.Column(db.Text)  # JSON list of its contacts
+    updates = db.Column(db.Text)  # JSON list of its updates
+    
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f'<ArchivedApplication {self.company} - {self.job_title}>'
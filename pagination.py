@@ -0,0 +1,93 @@
+"""
+Keyset (cursor) pagination.
+
+A page is read with WHERE (sort value, id) > (last value, last id)
+ORDER BY sort value, id LIMIT n. With an index on the sort column (SQLite
+indexes end with the rowid, so they cover the id tiebreaker too) every
+page costs the same however deep it is, where OFFSET would read and throw
+away every row before the page. The cursor handed to clients is an opaque
+token holding the sort key of the last row served.
+
+NULL sort values cannot be compared, so rows with one come after all the
+others (in either direction), in id order, from a second indexed query
+once the non-NULL rows run out.
+"""
+
+import base64
+import json
+from datetime import date, datetime
+
+from models import db
+
+
+class InvalidCursor(ValueError):
+    """A cursor token that is malformed or was made for another sort order."""
+
+
+def encode_cursor(sort, key):
+    """Opaque token for the sort key (value, id) of the last row of a page."""
+    values = [value.isoformat() if isinstance(value, (date, datetime)) else value for value in key]
+    payload = json.dumps([sort, values], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, sort):
+    """The sort key in a token made by encode_cursor for the same `sort`."""
+    try:
+        cursor_sort, key = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except (ValueError, TypeError):
+        raise InvalidCursor("Malformed cursor")
+    if cursor_sort != sort or not isinstance(key, list) or len(key) != 2:
+        raise InvalidCursor("Cursor does not match the sort order")
+    return key
+
+
+def _from_json(column, value):
+    """Turn a cursor value back into what the column compares against."""
+    if value is None:
+        return None
+    try:
+        python_type = column.type.python_type
+    except (AttributeError, NotImplementedError):
+        python_type = None
+    try:
+        if python_type is datetime:
+            return datetime.fromisoformat(value)
+        if python_type is date:
+            return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise InvalidCursor("Malformed cursor")
+    return value
+
+
+def keyset_page(query, column, id_column, after=None, page_size=50, descending=False, nullable=False):
+    """One page of `query` (which must not be ordered) by `column`, then id.
+
+    `after` is the key from decode_cursor, or None for the first page.
+    Returns (rows, key of the last row, or None if this is the last page).
+    """
+    rows = []
+    value, last_id = (_from_json(column, after[0]), after[1]) if after else (None, None)
+
+    # Rows with a sort value, unless the cursor is already past them
+    if after is None or value is not None:
+        page = query.add_columns(column, id_column)
+        if nullable:
+            page = page.filter(column.isnot(None))
+        if after is not None:
+            key = db.tuple_(column, id_column)
+            page = page.filter(key < (value, last_id) if descending else key > (value, last_id))
+        order = (column.desc(), id_column.desc()) if descending else (column.asc(), id_column.asc())
+        rows = page.order_by(*order).limit(page_size + 1).all()
+
+    # Then rows without one, by id
+    if nullable and len(rows) <= page_size:
+        page = query.add_columns(column, id_column).filter(column.is_(None))
+        if after is not None and value is None:
+            page = page.filter(id_column > last_id)
+        rows += page.order_by(id_column.asc()).limit(page_size + 1 - len(rows)).all()
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    next_key = (rows[-1][-2], rows[-1][-1]) if has_more else None
+    return [row[0] for row in rows], next_key
@@ -0,0 +1,196 @@
+"""
+PDF text extraction in a pool of worker processes.
+
+Parsing runs outside the web process, so a long or malformed PDF cannot
+hold the GIL while other requests are served. Each document gets a
+deadline and a page cap, larger documents are split into page ranges
+that are parsed in parallel, and a caller can cancel its extraction.
+
+The pool is a set of worker processes this module manages itself, each
+fed page ranges over a pipe, rather than a ProcessPoolExecutor: an
+executor cannot stop one of its tasks, and killing one of its workers
+breaks every other task in it. Here a document that times out or is
+cancelled has the workers parsing it killed and replaced; the other
+documents being parsed carry on.
+"""
+
+import io
+import multiprocessing
+import multiprocessing.connection
+import threading
+import time
+
+import PyPDF2  # pip install PyPDF2
+
+
+# Seconds between checks of the deadline and the cancel event while waiting
+POLL_INTERVAL = 0.25
+
+
+class PdfExtractionError(Exception):
+    """The PDF could not be parsed."""
+
+
+class PdfTimeoutError(PdfExtractionError):
+    """Parsing did not finish before the deadline."""
+
+
+class PdfCancelledError(PdfExtractionError):
+    """The caller cancelled the extraction."""
+
+
+def _extract_pages(data, start, stop):
+    """Return (page count, texts of pages start..stop-1)."""
+    reader = PyPDF2.PdfReader(io.BytesIO(data))
+    page_count = len(reader.pages)
+    return page_count, [reader.pages[i].extract_text() or '' for i in range(start, min(stop, page_count))]
+
+
+def _serve(conn):
+    """Worker process: parse the (data, start, stop) ranges sent over `conn` until it closes."""
+    while True:
+        try:
+            data, start, stop = conn.recv()
+        except EOFError:
+            return
+        try:
+            conn.send((True, _extract_pages(data, start, stop)))
+        except Exception as e:
+            conn.send((False, f'{type(e).__name__}: {e}'))
+
+
+class _Worker:
+    """A worker process and the pipe it is fed over."""
+
+    def __init__(self, context):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+
+    def kill(self):
+        self.conn.close()
+        self.process.terminate()
+        self.process.join(1)
+
+
+class PdfExtractor:
+    """Extracts PDF text in worker processes with a per-document deadline.
+
+    The first range parses the first `pages_per_task` pages and reports
+    the page count; the remaining pages (up to `max_pages`) are split
+    into ranges parsed in parallel on as many of the `workers` as are
+    free. A document always gets at least one worker, waiting for one
+    if need be.
+    """
+
+    def __init__(self, workers=2, timeout=20.0, max_pages=50, pages_per_task=10):
+        self.workers = workers
+        self.timeout = timeout
+        self.max_pages = max_pages
+        self.pages_per_task = pages_per_task
+        self._context = multiprocessing.get_context('spawn')
+        self._slots = threading.BoundedSemaphore(workers)
+        self._lock = threading.Lock()
+        self._idle = []
+
+    def _check(self, deadline, cancel_event):
+        if cancel_event is not None and cancel_event.is_set():
+            raise PdfCancelledError('PDF extraction cancelled')
+        if time.monotonic() >= deadline:
+            raise PdfTimeoutError(f'PDF extraction took longer than {self.timeout:g}s')
+
+    def _acquire(self, deadline, cancel_event, wait=True):
+        """A worker of one of the free slots (started if need be), or None when none is free and not `wait`."""
+        if wait:
+            while not self._slots.acquire(timeout=POLL_INTERVAL):
+                self._check(deadline, cancel_event)
+        elif not self._slots.acquire(blocking=False):
+            return None
+        try:
+            with self._lock:
+                worker = self._idle.pop() if self._idle else None
+            if worker is not None and not worker.process.is_alive():
+                worker.kill()
+                worker = None
+            return worker or _Worker(self._context)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _release(self, worker, healthy):
+        """Give a worker's slot back; a worker that is not `healthy` is killed rather than reused."""
+        if healthy:
+            with self._lock:
+                self._idle.append(worker)
+        else:
+            worker.kill()
+        self._slots.release()
+
+    def _run(self, data, ranges, deadline, cancel_event):
+        """Parse the (start, stop) page ranges of `data`; returns their results in order."""
+        results = [None] * len(ranges)
+        pending = list(enumerate(ranges))
+        busy = {}  # Pipe -> (worker, index of its range)
+        try:
+            while pending or busy:
+                # Hand out ranges to free workers, waiting for one only when none works for this document
+                while pending:
+                    worker = self._acquire(deadline, cancel_event, wait=not busy)
+                    if worker is None:
+                        break
+                    index, (start, stop) = pending.pop(0)
+                    busy[worker.conn] = (worker, index)
+                    worker.conn.send((data, start, stop))
+
+                self._check(deadline, cancel_event)
+                remaining = deadline - time.monotonic()
+                for conn in multiprocessing.connection.wait(list(busy), timeout=min(remaining, POLL_INTERVAL)):
+                    worker, index = busy.pop(conn)
+                    try:
+                        ok, value = conn.recv()
+                    except (EOFError, OSError):
+                        self._release(worker, healthy=False)
+                        raise PdfExtractionError('PDF worker crashed')
+                    self._release(worker, healthy=True)
+                    if not ok:
+                        raise PdfExtractionError(value)
+                    results[index] = value
+            return results
+        finally:
+            # Workers still parsing this document (timed out, cancelled or failed) are
+            # stopped; workers busy with other documents are not touched
+            for worker, _ in busy.values():
+                self._release(worker, healthy=False)
+
+    def extract(self, data, cancel_event=None):
+        """Extract the text of the PDF in `data` (bytes).
+
+        Returns (text, page_count) with pages separated by newlines. Only
+        the first `max_pages` pages are read. Setting `cancel_event` (a
+        threading.Event) stops the extraction. Raises PdfTimeoutError,
+        PdfCancelledError or PdfExtractionError.
+        """
+        deadline = time.monotonic() + self.timeout
+        try:
+            [(page_count, texts)] = self._run(data, [(0, min(self.pages_per_task, self.max_pages))],
+                                              deadline, cancel_event)
+
+            last_page = min(page_count, self.max_pages)
+            ranges = [(start, min(start + self.pages_per_task, last_page))
+                      for start in range(self.pages_per_task, last_page, self.pages_per_task)]
+            for _, more in self._run(data, ranges, deadline, cancel_event):
+                texts.extend(more)
+
+            return '\n'.join(texts), page_count
+        except PdfExtractionError:
+            raise
+        except Exception as e:
+            raise PdfExtractionError(str(e)) from e
+
+    def shutdown(self):
+        """Stop the idle workers; workers still parsing stop when their extraction ends."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.kill()
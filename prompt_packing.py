@@ -0,0 +1,160 @@
+"""
+Token budgeting for the LLM prompts.
+
+Job postings copied from the same company or job board repeat whole
+paragraphs (benefits, equal-opportunity statements, "about us" text), and
+resumes extracted from PDFs carry runs of whitespace. Before text goes
+into a prompt its whitespace and bullets are normalized; job requirements
+also lose their boilerplate and repeated lines, and passages shared by
+several jobs are written once in a shared section that the jobs refer to.
+Resumes keep every line: a line that looks like boilerplate or repeats
+(a skill listed under two roles, say) is still real content there. Token counts are estimated at about four
+characters per token, which is close enough for budgeting.
+"""
+
+import re
+
+
+CHARS_PER_TOKEN = 4
+
+# Lines that carry no signal about the skills a job needs
+BOILERPLATE = re.compile(
+    r'equal (employment )?opportunity|affirmative action|without regard to (race|age|sex)'
+    r'|reasonable accommodation|apply (now|today|here)|click (here|apply)|privacy (policy|notice)'
+    r'|all rights reserved|e-verify',
+    re.I
+)
+
+# Shorter passages are cheaper to repeat than to reference
+MIN_SHARED_CHARS = 40
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token)."""
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def normalize_lines(text):
+    """The non-empty lines of text, with whitespace collapsed and bullets unified."""
+    lines = []
+    for line in (text or '').splitlines():
+        line = re.sub(r'[ \t ]+', ' ', line).strip()
+        line = re.sub(r'^[•●▪*\-–]+\s*', '- ', line)
+        if line:
+            lines.append(line)
+    return lines
+
+
+def normalize_text(text):
+    """Collapse whitespace and unify bullets, keeping every line (for resumes)."""
+    return '\n'.join(normalize_lines(text))
+
+
+def compact_text(text):
+    """Normalize text and drop boilerplate and repeated lines (for job postings)."""
+    lines = []
+    seen = set()
+    for line in normalize_lines(text):
+        key = line.lower()
+        if key in seen or BOILERPLATE.search(line):
+            continue
+        seen.add(key)
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def truncate_to_tokens(text, max_tokens):
+    """Cut text to about `max_tokens` tokens, at a line or word boundary if possible."""
+    limit = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    boundary = max(cut.rfind('\n'), cut.rfind(' '))
+    return cut[:boundary] if boundary > limit // 2 else cut
+
+
+def _passages(text):
+    """Split compacted requirements into lines, and long lines into sentences."""
+    passages = []
+    for line in text.splitlines():
+        passages.extend(p.strip() for p in re.split(r'(?<=[.;!?])\s+(?=[A-Z])', line) if p.strip())
+    return passages
+
+
+def _key(passage):
+    return re.sub(r'\W+', ' ', passage.lower()).strip()
+
+
+def pack_requirements(jobs_data):
+    """Compact the jobs' requirements and factor out passages shared by several jobs.
+
+    Returns (shared passages, per-job list of (own text, indexes into shared)).
+    """
+    job_passages = [_passages(compact_text(job['requirements'])) for job in jobs_data]
+
+    counts = {}
+    for passages in job_passages:
+        for key in {_key(p) for p in passages if len(p) >= MIN_SHARED_CHARS}:
+            counts[key] = counts.get(key, 0) + 1
+
+    shared, shared_index, packed = [], {}, []
+    for passages in job_passages:
+        own, refs = [], []
+        for passage in passages:
+            key = _key(passage)
+            if counts.get(key, 0) < 2:
+                own.append(passage)
+                continue
+            if key not in shared_index:
+                shared_index[key] = len(shared)
+                shared.append(passage)
+            if shared_index[key] not in refs:
+                refs.append(shared_index[key])
+        packed.append((' '.join(own), refs))
+    return shared, packed
+
+
+def format_jobs(jobs_data, start=1):
+    """Markdown list of the jobs for a prompt, numbered from `start`, with shared passages written once."""
+    shared, packed = pack_requirements(jobs_data)
+    text = ""
+    if shared:
+        text += "\nShared requirements, referenced by the jobs below as [S1], [S2], ...:\n"
+        text += ''.join(f"[S{i}] {passage}\n" for i, passage in enumerate(shared, 1))
+    for i, (job, (own, refs)) in enumerate(zip(jobs_data, packed), start):
+        requirements = own
+        if refs:
+            requirements += (' ' if own else '') + 'Also ' + ', '.join(f'[S{r + 1}]' for r in refs)
+        text += f"""
+### Job {i}: {job['company']} - {job['job_title']}
+Requirements: {requirements}
+Tags: {compact_text(job['tags'])}
+---
+"""
+    return text
+
+
+def pack_jobs(jobs_data, job_tokens, fixed_tokens, input_budget, output_budget,
+              output_tokens_per_job, max_jobs=None):
+    """Split jobs into consecutive batches that each fit the token budgets.
+
+    `job_tokens(job)` estimates one job's prompt tokens; `fixed_tokens` is
+    what every prompt costs besides its jobs. A job that does not fit even
+    alone still gets a batch of its own.
+    """
+    batches, batch, used = [], [], fixed_tokens
+    for job in jobs_data:
+        cost = job_tokens(job)
+        full = batch and (
+            used + cost > input_budget
+            or (len(batch) + 1) * output_tokens_per_job > output_budget
+            or (max_jobs and len(batch) >= max_jobs)
+        )
+        if full:
+            batches.append(batch)
+            batch, used = [], fixed_tokens
+        batch.append(job)
+        used += cost
+    if batch:
+        batches.append(batch)
+    return batches
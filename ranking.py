@@ -0,0 +1,71 @@
+"""
+BM25 relevance ranking of applications against free text (e.g. a resume).
+
+The inverted index is the job_terms table: one (term, application, count)
+row per word of each application's job text, kept up to date when
+applications are added, edited or deleted. Scoring a query only reads the
+posting rows of the query's terms, so cost grows with how many jobs share
+words with the resume rather than with the size of the table.
+"""
+
+import math
+
+from models import db, JobTerm, JobDocument
+
+
+# Standard BM25 parameters: term-frequency saturation and length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def corpus_stats():
+    """Return (number of indexed applications, average job text length)."""
+    count, total_length = db.session.query(
+        db.func.count(JobDocument.application_id),
+        db.func.coalesce(db.func.sum(JobDocument.length), 0)
+    ).one()
+    return count, (total_length / count if count else 0)
+
+
+def bm25_scores(query_terms, app_ids=None, k1=BM25_K1, b=BM25_B):
+    """Score applications against a list of query terms.
+
+    Returns {application_id: score} for every application (restricted to
+    `app_ids` if given) that shares at least one term with the query;
+    applications that share none score 0 and are left out.
+    """
+    terms = sorted(set(query_terms))
+    if not terms:
+        return {}
+
+    doc_count, avg_length = corpus_stats()
+    if not doc_count:
+        return {}
+
+    # Posting lists for the query terms, read from the term index
+    postings = db.session.query(JobTerm.term, JobTerm.application_id, JobTerm.count) \
+        .filter(JobTerm.term.in_(terms)).all()
+
+    doc_freq = {}
+    for term, _, _ in postings:
+        doc_freq[term] = doc_freq.get(term, 0) + 1
+
+    if app_ids is not None:
+        wanted = set(app_ids)
+        postings = [p for p in postings if p[1] in wanted]
+
+    candidates = {app_id for _, app_id, _ in postings}
+    if not candidates:
+        return {}
+    lengths = dict(
+        db.session.query(JobDocument.application_id, JobDocument.length)
+        .filter(JobDocument.application_id.in_(candidates)).all()
+    )
+
+    scores = {}
+    for term, app_id, tf in postings:
+        df = doc_freq[term]
+        idf = math.log((doc_count - df + 0.5) / (df + 0.5) + 1)
+        norm = k1 * (1 - b + b * lengths.get(app_id, avg_length) / (avg_length or 1))
+        scores[app_id] = scores.get(app_id, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+    return scores
@@ -0,0 +1,87 @@
+"""
+Full-text search over applications with SQLite FTS5.
+
+applications_fts is an external-content FTS5 index of each application's
+company, job title, tags, requirements and notes: it stores only the index
+and reads the text back from the applications table. Triggers created by
+migration 3 keep it in step with every insert, update and delete, however
+the row is written. A search matches every word of the query as a prefix
+(or a "quoted phrase" as a phrase), ranks with FTS5's bm25() weighting the
+short fields above the long free-text ones, and highlights the matches in a
+snippet of the best-matching field.
+"""
+
+import re
+
+from markupsafe import Markup, escape
+
+from models import db
+
+
+# bm25() weight of a match in each indexed column, in table order:
+# company, job_title, tags, requirements, notes
+FTS_WEIGHTS = (10.0, 8.0, 4.0, 1.0, 1.0)
+
+SNIPPET_TOKENS = 16
+MAX_SNIPPETS = 200  # Per page of results
+
+# Snippet highlight markers, turned into <mark> after the text is escaped
+MARK_START, MARK_END = '\x02', '\x03'
+
+
+def match_expression(text):
+    """FTS5 query for free text, or None if it has no words to search for.
+
+    Words are quoted, so FTS5 operators typed by the user are searched as
+    plain words and never cause a syntax error.
+    """
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', text or ''):
+        if phrase:
+            tokens = re.findall(r'\w+', phrase)
+            if tokens:
+                terms.append('"' + ' '.join(tokens) + '"')
+        else:
+            terms.extend(f'"{token}"*' for token in re.findall(r'\w+', word))
+    return ' '.join(terms) or None
+
+
+def ranked_matches(text):
+    """Subquery of (application_id, rank) for the applications matching `text`.
+
+    Lower rank is a better match. Returns None if `text` has no words.
+    """
+    match = match_expression(text)
+    if match is None:
+        return None
+    weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+    return db.text(
+        f"SELECT rowid AS application_id, bm25(applications_fts, {weights}) AS rank "
+        f"FROM applications_fts WHERE applications_fts MATCH :match"
+    ).bindparams(match=match).columns(application_id=db.Integer, rank=db.Float).subquery('fts')
+
+
+def highlight(snippet):
+    """Snippet as HTML-safe markup with the matched words in <mark>."""
+    html = str(escape(snippet or ''))
+    return Markup(html.replace(MARK_START, '<mark>').replace(MARK_END, '</mark>'))
+
+
+def search_snippets(text, app_ids):
+    """{application_id: highlighted snippet} for those of `app_ids` that match `text`.
+
+    Only the first MAX_SNIPPETS ids get a snippet.
+    """
+    match = match_expression(text)
+    if match is None or not app_ids:
+        return {}
+    rows = db.session.execute(
+        db.text(
+            "SELECT rowid, snippet(applications_fts, -1, :mark_start, :mark_end, '…', :tokens) "
+            # "+rowid": one pass over the matches, not a full-text lookup per id
+            "FROM applications_fts WHERE applications_fts MATCH :match AND +rowid IN :ids"
+        ).bindparams(db.bindparam('ids', expanding=True)),
+        {'match': match, 'mark_start': MARK_START, 'mark_end': MARK_END,
+         'tokens': SNIPPET_TOKENS, 'ids': list(app_ids[:MAX_SNIPPETS])}
+    )
+    return {app_id: highlight(snippet) for app_id, snippet in rows}
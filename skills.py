@@ -0,0 +1,211 @@
+"""
+Skill taxonomy and the single-pass matcher used by the resume analysis.
+
+The taxonomy lives in data/skills.json (categories, canonical names and
+aliases). It is compiled into one trie-shaped regular expression, so a
+requirements text is scanned once instead of once per skill, and is
+recompiled when the file changes. score_matrix() scores several resumes
+against many jobs at once with NumPy.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+import numpy as np  # pip install numpy
+
+
+SKILLS_FILE = os.environ.get(
+    'SKILL_TAXONOMY_FILE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'skills.json')
+)
+
+
+def _is_word_char(ch):
+    return re.match(r'\w', ch) is not None
+
+
+def _trie_regex(terms):
+    """Build a regex source matching any of `terms`, preferring the longest."""
+    trie = {}
+    for term in terms:
+        node = trie
+        for ch in term:
+            node = node.setdefault(ch, {})
+        node[''] = True
+
+    def render(node):
+        is_end = '' in node
+        branches = [re.escape(ch) + render(child)
+                    for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        if len(branches) == 1:
+            body = branches[0]
+        else:
+            body = '(?:' + '|'.join(branches) + ')'
+        if is_end:
+            # Optional tail: the greedy try keeps the longest term, and
+            # backtracking falls back to the shorter one.
+            return '(?:' + body + ')?'
+        return body
+
+    return render(trie)
+
+
+class SkillMatcher:
+    """Finds every known skill in a text with a single regex scan.
+
+    `terms` maps a lowercase search term to the canonical skill name it
+    should be reported as. A term only matches as a whole word: it may not
+    be directly preceded or followed by a word character. `categories`
+    optionally maps canonical names to their category.
+    """
+
+    def __init__(self, terms, categories=None):
+        self.terms = dict(terms)
+        self.categories = dict(categories or {})
+        self._passes = []
+
+        # Stored extractions carry this stamp so they can be redone when
+        # the taxonomy changes
+        digest = hashlib.sha1(repr(sorted(self.terms.items())).encode('utf-8'))
+        self.version = digest.hexdigest()[:12]
+
+        # At a given start position the regex reports one term only (the
+        # longest). A term that is a whole-word prefix of another skill's
+        # term, e.g. 'power' and 'power bi', would be hidden whenever the
+        # longer term is present, so such terms get their own, smaller pass.
+        remaining = set(self.terms)
+        while remaining:
+            pattern = r'(?<!\w)(?=(' + _trie_regex(remaining) + r')(?!\w))'
+            self._passes.append(re.compile(pattern))
+            remaining = {
+                term for term in remaining
+                if any(other != term and other.startswith(term)
+                       and not _is_word_char(other[len(term)])
+                       and self.terms[other] != self.terms[term]
+                       for other in remaining)
+            }
+
+    def find(self, text):
+        """Return the set of canonical skill names found in `text`."""
+        text_lower = text.lower()
+        terms = self.terms
+        found = set()
+        for compiled in self._passes:
+            for match in compiled.finditer(text_lower):
+                found.add(terms[match.group(1)])
+        return found
+
+
+def load_taxonomy(path):
+    """Read a taxonomy file and compile it into a SkillMatcher."""
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+
+    terms = {}
+    categories = {}
+    for category, skills in data['categories'].items():
+        for name, aliases in skills.items():
+            name = name.strip().lower()
+            categories[name] = category
+            for term in [name] + list(aliases):
+                term = term.strip().lower()
+                if terms.get(term, name) != name:
+                    raise ValueError(f"'{term}' is listed under both '{terms[term]}' and '{name}'")
+                terms[term] = name
+
+    return SkillMatcher(terms, categories)
+
+
+class SkillTaxonomy:
+    """The current SkillMatcher, recompiled when the taxonomy file changes.
+
+    Readers take `matcher` once and use that object for the whole
+    operation; a reload only swaps the reference, so a request never sees
+    a half-built taxonomy. The file is checked at most once every
+    `check_interval` seconds.
+    """
+
+    def __init__(self, path, check_interval=2.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked_at = time.monotonic()
+        self._matcher = None
+        self.reload()
+
+    @property
+    def matcher(self):
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except OSError:
+                mtime = self._mtime
+            if mtime != self._mtime:
+                self.reload()
+        return self._matcher
+
+    def reload(self):
+        """Recompile the taxonomy file. A broken file keeps the old matcher."""
+        with self._lock:
+            mtime = os.stat(self.path).st_mtime_ns
+            try:
+                matcher = load_taxonomy(self.path)
+            except (OSError, ValueError, KeyError, AttributeError) as e:
+                if self._matcher is None:
+                    raise
+                print(f"Skill taxonomy reload failed, keeping version {self._matcher.version}: {e}")
+                self._mtime = mtime
+                return
+            self._matcher = matcher
+            self._mtime = mtime
+
+
+# Compiled once at startup and shared by every request
+skill_taxonomy = SkillTaxonomy(SKILLS_FILE)
+
+
+def score_matrix(resume_skill_sets, job_skill_sets):
+    """Score K resumes against N jobs with one matrix product.
+
+    Resumes and jobs become rows of boolean matrices over the skills they
+    mention (K x V and N x V), so the matched skills of every pair are
+    counted at once by resumes @ jobs.T, and the scores follow from the
+    job sizes in one more array step. Returns a K x N list of
+    (score, matched, missing) tuples scored like calculate_match_score.
+    """
+    vocabulary = sorted(set().union(*resume_skill_sets, *job_skill_sets))
+    column = {skill: i for i, skill in enumerate(vocabulary)}
+    names = np.array(vocabulary, dtype=object)
+
+    def encode(skill_sets):
+        rows = np.zeros((len(skill_sets), len(vocabulary)), dtype=bool)
+        for i, skills in enumerate(skill_sets):
+            rows[i, [column[skill] for skill in skills]] = True
+        return rows
+
+    resumes = encode(resume_skill_sets)
+    jobs = encode(job_skill_sets)
+    # A float product runs on BLAS, and counts are exact far past any vocabulary size
+    matched_counts = resumes.astype(np.float64) @ jobs.T.astype(np.float64)
+    sizes = jobs.sum(axis=1)
+    # Divide, then scale and truncate, in the order calculate_match_score does
+    scores = (np.divide(matched_counts, sizes, out=np.zeros(matched_counts.shape), where=sizes > 0) * 100) \
+        .astype(int).tolist()
+
+    matrix = []
+    for resume, row_scores in zip(resumes, scores):
+        # The matched and missing skills of this resume against every job, as N x V masks
+        matched = jobs & resume
+        missing = jobs & ~resume
+        matrix.append([(score, names[hit].tolist(), names[miss].tolist())
+                       for score, hit, miss in zip(row_scores, matched, missing)])
+    return matrix
@@ -0,0 +1,54 @@
+"""
+SQLite connection settings for concurrent use.
+
+SQLite's default rollback journal lets a writer lock readers out, and a
+connection that finds the database locked gives up with "database is
+locked" after a short wait. configure_sqlite() sets every new connection
+of an engine to:
+
+- busy_timeout: a writer waits this long for the one write lock instead of
+  failing at once.
+- journal_mode=WAL: readers keep reading the last committed state while
+  one writer appends to the write-ahead log, so dashboard reads and status
+  writes from different processes no longer block each other.
+- synchronous=NORMAL: WAL only syncs at checkpoints; a power loss can drop
+  the last commits but never corrupts the database.
+- cache_size and mmap_size: a larger page cache per connection, and reads
+  through a memory map of the file instead of read() copies.
+
+WAL mode is stored in the database file; the other settings last only as
+long as the connection, which is why they are applied on connect.
+"""
+
+from sqlalchemy import event
+
+
+# Pragmas reported by sqlite_settings(), in the order they are applied
+PRAGMAS = ('busy_timeout', 'journal_mode', 'synchronous', 'cache_size', 'mmap_size', 'temp_store')
+
+
+def configure_sqlite(engine, busy_timeout_ms=15000, cache_size_kb=16384, mmap_size=256 * 1024 * 1024):
+    """Apply the concurrency pragmas to every connection `engine` opens from now on."""
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            # First, so that switching a database to WAL also waits out other writers
+            cursor.execute(f'PRAGMA busy_timeout={int(busy_timeout_ms)}')
+            # In-memory databases stay in 'memory' mode; that is fine
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('PRAGMA synchronous=NORMAL')
+            # Negative: size in KiB rather than in pages
+            cursor.execute(f'PRAGMA cache_size={-int(cache_size_kb)}')
+            cursor.execute(f'PRAGMA mmap_size={int(mmap_size)}')
+            cursor.execute('PRAGMA temp_store=MEMORY')
+        finally:
+            cursor.close()
+
+
+def sqlite_settings(conn):
+    """{pragma: value} of a connection, to check what configure_sqlite() applied."""
+    return {name: conn.exec_driver_sql(f'PRAGMA {name}').scalar() for name in PRAGMAS}
@@ -0,0 +1,84 @@
+"""
+Normalized application tags.
+
+Application.tags keeps the tags as typed ("Tech, Startup"), which is what
+the forms, the CSV export, the full-text index and the LLM prompts read.
+The tags and application_tags tables hold the same tags normalized, one
+row per distinct tag and one link per (application, tag), for exact
+indexed filtering and per-tag counts. A before_flush hook rebuilds an
+application's links whenever its tags string is written, so the tables
+follow every change however it is made.
+"""
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from models import db, Application, ApplicationTag, Tag
+
+
+def tag_key(name):
+    """What two tags must share to be the same tag: case and spacing are ignored."""
+    return ' '.join(name.lower().split())
+
+
+def parse_tags(text):
+    """Tag names from a comma-separated string, without blanks or duplicates."""
+    names = {}
+    for name in (text or '').split(','):
+        name = ' '.join(name.split())
+        if name and tag_key(name) not in names:
+            names[tag_key(name)] = name
+    return list(names.values())
+
+
+def sync_tag_links(session, app_entry):
+    """Point the application's tag links at the tags in its tags string."""
+    names = parse_tags(app_entry.tags)
+    keys = [tag_key(name) for name in names]
+    with session.no_autoflush:
+        existing = {tag.key: tag for tag in session.query(Tag).filter(Tag.key.in_(keys))} if keys else {}
+        # Tags created for other applications in the same flush are not in the table yet
+        existing.update({obj.key: obj for obj in session.new if isinstance(obj, Tag) and obj.key in keys})
+        tags = []
+        for key, name in zip(keys, names):
+            if key not in existing:
+                existing[key] = Tag(name=name, key=key)
+                session.add(existing[key])
+            tags.append(existing[key])
+
+        links = {link.tag_id: link for link in app_entry.tag_links if link.tag_id is not None}
+        new_links = []
+        for position, tag in enumerate(tags):
+            link = links.get(tag.id) if tag.id is not None else None
+            if link is None:
+                link = ApplicationTag(tag=tag)
+            link.position = position
+            new_links.append(link)
+        app_entry.tag_links = new_links
+
+
+@event.listens_for(Session, 'before_flush')
+def sync_changed_tags(session, flush_context, instances):
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Application) and (obj in session.new or inspect(obj).attrs.tags.history.has_changes()):
+            sync_tag_links(session, obj)
+
+
+def filter_by_tag(query, name):
+    """Restrict an Application query to applications with exactly this tag."""
+    return query.join(ApplicationTag, ApplicationTag.application_id == Application.id) \
+        .join(Tag, Tag.id == ApplicationTag.tag_id) \
+        .filter(Tag.key == tag_key(name))
+
+
+def tag_counts(status=None, limit=None):
+    """[(tag name, number of applications)] from one aggregate query, most used first."""
+    count = db.func.count(ApplicationTag.application_id)
+    query = db.session.query(Tag.name, count).join(ApplicationTag, ApplicationTag.tag_id == Tag.id)
+    if status:
+        query = query.join(Application, Application.id == ApplicationTag.application_id) \
+            .filter(Application.status == status)
+    query = query.group_by(Tag.id).order_by(count.desc(), Tag.name)
+    if limit:
+        query = query.limit(limit)
+    return query.all()
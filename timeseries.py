@@ -0,0 +1,107 @@
+"""
+Application counts over time, bucketed by day, week or month in SQL.
+
+Each series is one query over a range of an indexed date column
+(applications.created_at, applications.date_applied, and
+status_transitions.created_at for status changes). SQLite reads only the
+index entries in the range, never the table rows, counts them per day, and
+groups the days into buckets with strftime(), returning one row per
+bucket. Buckets
+are labelled with the date they start on (weeks start on Monday); the
+first and last ones count only the days inside the range. Timestamps are
+in UTC, as stored.
+"""
+
+from datetime import date, timedelta
+
+from models import db, Application, StatusTransition
+
+
+# strftime() arguments giving the first day of the bucket a timestamp falls in
+BUCKET_FORMATS = {
+    'day': ('%Y-%m-%d',),
+    # 'weekday 0' moves forward to Sunday (or stays on one), then back to its Monday
+    'week': ('%Y-%m-%d', 'weekday 0', '-6 days'),
+    'month': ('%Y-%m-01',),
+}
+
+MAX_BUCKETS = 1500  # About four years of days
+
+
+def bucket_starts(interval, start, end):
+    """Start dates of the buckets from the one holding `start` to the one holding `end`."""
+    if interval == 'day':
+        first, step = start, lambda day: day + timedelta(days=1)
+    elif interval == 'week':
+        first, step = start - timedelta(days=start.weekday()), lambda day: day + timedelta(days=7)
+    else:
+        first = start.replace(day=1)
+        step = lambda day: (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    starts = []
+    day = first
+    while day <= end:
+        starts.append(day)
+        day = step(day)
+    return starts
+
+
+def bucketed_counts(column, interval, start, end, group_by=None, criteria=()):
+    """{bucket start 'YYYY-MM-DD': count} (or {(bucket, group): count}) of rows with `column` in [start, end]."""
+    # Count per day first: the date is a prefix of the stored ISO text, which
+    # is half the cost of parsing every timestamp with strftime()
+    day = db.func.substr(column, 1, 10).label('day')
+    groups = [group_by.label('grp')] if group_by is not None else []
+    # Date columns compare as ISO strings, so the range is an index range
+    daily = db.session.query(day, *groups, db.func.count().label('rows')) \
+        .filter(column >= start, column < end + timedelta(days=1), *criteria) \
+        .group_by(day, *groups).subquery()
+
+    # Then bucket the (at most a few thousand) days
+    bucket_format, *modifiers = BUCKET_FORMATS[interval]
+    keys = [db.func.strftime(bucket_format, daily.c.day, *modifiers)] + ([daily.c.grp] if groups else [])
+    rows = db.session.query(*keys, db.func.sum(daily.c.rows)).group_by(*keys).all()
+    if group_by is None:
+        return {key: count for key, count in rows}
+    return {(key, group): count for key, group, count in rows}
+
+
+def application_timeseries(interval, start, end):
+    """Counts per bucket of applications added, applications sent and status changes (by new status)."""
+    buckets = [day.isoformat() for day in bucket_starts(interval, start, end)]
+    added = bucketed_counts(Application.created_at, interval, start, end)
+    applied = bucketed_counts(Application.date_applied, interval, start, end)
+    # Changes only: the entries that started an application's history are not moves
+    changes = bucketed_counts(StatusTransition.created_at, interval, start, end, group_by=StatusTransition.to_status,
+                              criteria=[StatusTransition.from_status.isnot(None)])
+    statuses = sorted({status for _, status in changes})
+
+    return {
+        'interval': interval,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'buckets': buckets,
+        'added': [added.get(bucket, 0) for bucket in buckets],
+        'applied': [applied.get(bucket, 0) for bucket in buckets],
+        'status_changes': {status: [changes.get((bucket, status), 0) for bucket in buckets] for status in statuses},
+    }
+
+
+def parse_range(interval, start, end, today=None):
+    """Validate the query arguments; returns (interval, start date, end date).
+
+    The range defaults to the year up to today. Raises ValueError.
+    """
+    interval = interval or 'month'
+    if interval not in BUCKET_FORMATS:
+        raise ValueError(f"interval must be one of {', '.join(BUCKET_FORMATS)}")
+    today = today or date.today()
+    try:
+        end = date.fromisoformat(end) if end else today
+        start = date.fromisoformat(start) if start else end - timedelta(days=364)
+    except ValueError:
+        raise ValueError("start and end must be dates (YYYY-MM-DD)")
+    if start > end:
+        raise ValueError("start must not be after end")
+    if len(bucket_starts(interval, start, end)) > MAX_BUCKETS:
+        raise ValueError(f"Too many {interval}s in the range (at most {MAX_BUCKETS}); use a longer interval")
+    return interval, start, end